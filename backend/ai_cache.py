@@ -0,0 +1,244 @@
+"""
+AI Advice Response Cache
+Serves repeated advisor prompts without another completion. The exact tier
+is keyed on the normalized prompt from AIService._build_advice_prompt plus
+the user's location and role; the optional similarity tier matches chat
+messages in the same location/role bucket by character trigram overlap.
+
+Entries are held in a per-process TTL/LRU map. Stored answers and their hit
+counts are persisted to ai_response_cache on a background thread.
+
+Configuration:
+    AI_CACHE_ENABLED     true/false (default true)
+    AI_CACHE_MAX_ENTRIES LRU size per worker (default 512)
+    AI_CACHE_TTL         seconds an answer is reused (default 3600)
+    AI_CACHE_SIMILARITY  trigram Jaccard threshold for the similarity tier,
+                         0 disables it (default 0.85)
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from database.config import get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r'[^\w\s]+', re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return _WHITESPACE.sub(' ', _PUNCTUATION.sub(' ', (text or '').lower())).strip()
+
+def trigram_signature(text):
+    """Character trigram set of normalized text, padded so short words count"""
+    padded = f'  {normalize_text(text)} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) when the API reports no usage"""
+    return max(1, len(text or '') // 4)
+
+class AdviceCacheEntry:
+    __slots__ = ('key', 'bucket', 'signature', 'response', 'tokens', 'expires_at', 'hits')
+
+    def __init__(self, key, bucket, signature, response, tokens, expires_at):
+        self.key = key
+        self.bucket = bucket
+        self.signature = signature
+        self.response = response
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.hits = 0
+
+class AdviceCache:
+    """Exact + similarity cache for advisor completions"""
+
+    def __init__(self, max_entries=512, ttl=3600, similarity_threshold=0.85, persist=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.persist = persist
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-cache') if persist else None
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(prompt, location, role):
+        """Exact-tier key and similarity bucket for a prompt"""
+        bucket = f"{normalize_text(location)}|{normalize_text(role)}"
+        digest = hashlib.sha1(f"{bucket}|{normalize_text(prompt)}".encode('utf-8')).hexdigest()
+        return digest, bucket
+
+    def lookup(self, prompt, location='', role='', message=None):
+        """
+        Find a cached answer for the prompt
+        `message` (the raw chat text) enables the similarity tier
+        Returns: (response_text, tier) with tier 'exact' or 'similar', or (None, None)
+        """
+        key, bucket = self.make_key(prompt, location, role)
+        now = time.time()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            tier = 'exact' if entry is not None else None
+
+            if entry is None and message and self.similarity_threshold > 0:
+                entry = self._most_similar(bucket, trigram_signature(message), now)
+                tier = 'similar' if entry is not None else None
+
+            if entry is None:
+                self.misses += 1
+                return None, None
+
+            self._entries.move_to_end(entry.key)
+            entry.hits += 1
+            self.saved_tokens += entry.tokens
+            if tier == 'exact':
+                self.exact_hits += 1
+            else:
+                self.similar_hits += 1
+            response, hit_key = entry.response, entry.key
+
+        self._persist_hit(hit_key)
+        return response, tier
+
+    def store(self, prompt, response, location='', role='', message=None, tokens=None):
+        """Cache a completed answer; `tokens` is the completion's total token usage"""
+        if not response:
+            return
+        key, bucket = self.make_key(prompt, location, role)
+        tokens = tokens or estimate_tokens(prompt) + estimate_tokens(response)
+        entry = AdviceCacheEntry(
+            key, bucket,
+            trigram_signature(message) if message else None,
+            response, tokens, time.time() + self.ttl
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+        self._persist_entry(entry, location, role, message or prompt)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                'similarityThreshold': self.similarity_threshold,
+                'exactHits': self.exact_hits,
+                'similarHits': self.similar_hits,
+                'misses': self.misses,
+                'hitRatio': round(hits / lookups, 4) if lookups else 0.0,
+                'savedTokens': self.saved_tokens,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _live_entry(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _most_similar(self, bucket, signature, now):
+        best, best_score = None, self.similarity_threshold
+        for key in list(self._buckets.get(bucket, ())):
+            entry = self._live_entry(key, now)
+            if entry is None or entry.signature is None:
+                continue
+            # Jaccard can't reach the threshold when set sizes differ too much
+            small, large = sorted((len(signature), len(entry.signature)))
+            if not large or small / large < best_score:
+                continue
+            score = jaccard(signature, entry.signature)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._buckets.get(entry.bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[entry.bucket]
+
+    def _persist_entry(self, entry, location, role, prompt):
+        if self._writer is None:
+            return
+        self._writer.submit(self._write, """
+            INSERT INTO ai_response_cache (cache_key, location, role, prompt, response, tokens, hit_count, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, 0, LOCALTIMESTAMP)
+            ON CONFLICT (cache_key) DO UPDATE
+            SET response = EXCLUDED.response,
+                tokens = EXCLUDED.tokens,
+                created_at = EXCLUDED.created_at
+        """, (entry.key, location or '', role or '', prompt, entry.response, entry.tokens))
+
+    def _persist_hit(self, key):
+        if self._writer is None:
+            return
+        self._writer.submit(self._write, """
+            UPDATE ai_response_cache
+            SET hit_count = hit_count + 1,
+                last_hit_at = LOCALTIMESTAMP
+            WHERE cache_key = %s
+        """, (key,))
+
+    def _write(self, query, params):
+        try:
+            with get_db_cursor() as (cur, conn):
+                cur.execute(query, params)
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Could not persist AI cache entry: {e}")
+
+def _build_advice_cache():
+    if os.getenv('AI_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return AdviceCache(
+        max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '512')),
+        ttl=int(os.getenv('AI_CACHE_TTL', '3600')),
+        similarity_threshold=float(os.getenv('AI_CACHE_SIMILARITY', '0.85'))
+    )
+
+advice_cache = _build_advice_cache()
+
+def get_advice_cache_stats():
+    """Hit ratio and saved tokens for this worker process"""
+    if advice_cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **advice_cache.stats()}
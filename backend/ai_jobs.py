@@ -0,0 +1,361 @@
+"""
+AI Chat Job Queue
+Runs advice completions on a bounded worker pool so slow LLM round trips do
+not pin request workers. Clients poll a job or stream its tokens as
+server-sent events; ai_interactions rows are written off the request path.
+
+Jobs run in the worker process that accepted them, which publishes each
+state change (queued, running, then the finished answer) to a shared job
+store so a poll landing on any worker can answer. The store is the
+ai_chat_jobs table by default (AI_JOB_STORE=postgres), Redis with
+AI_JOB_STORE=redis, or nothing with AI_JOB_STORE=memory (polls then only
+work on the accepting worker: for a single-worker deployment).
+
+Partial text is only available on the accepting worker. A job stream
+(/chat/jobs/<id>/stream) served there relays tokens as they arrive and
+keeps that sync worker thread busy for the whole completion; served by
+another worker it waits on the store and sends the finished answer as a
+single event.
+
+A completion that fails after producing text ends FAILED (the partial text
+stays in the snapshot) and is not logged to ai_interactions.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+from database.config import get_db_cursor
+from database.ai_jobs import install_ai_chat_jobs, upsert_chat_job, read_chat_job, purge_expired_chat_jobs
+from database.async_pool import get_async_pool
+from cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+class QueueFull(Exception):
+    """Raised when the job queue has reached its pending limit"""
+
+class InteractionLogger:
+    """Writes ai_interactions rows on a background thread"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-log')
+
+    def log(self, user_id, interaction_type, prompt, response, carbon_savings_estimate=None):
+        return self._executor.submit(
+            self._insert, user_id, interaction_type, prompt, response, carbon_savings_estimate
+        )
+
+    @staticmethod
+    def _insert(user_id, interaction_type, prompt, response, carbon_savings_estimate):
+        try:
+            with get_db_cursor() as (cur, conn):
+                cur.execute("""
+                    INSERT INTO ai_interactions (user_id, interaction_type, prompt, response, carbon_savings_estimate)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (user_id, interaction_type, prompt, response, carbon_savings_estimate))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to log AI interaction for user {user_id}: {e}")
+
+class AsyncInteractionLogger:
+    """Writes ai_interactions rows from background tasks on the event loop (async serving mode)"""
+
+    def __init__(self):
+        self._tasks = set()
+
+    def log(self, user_id, interaction_type, prompt, response, carbon_savings_estimate=None):
+        task = asyncio.get_running_loop().create_task(
+            self._insert(user_id, interaction_type, prompt, response, carbon_savings_estimate)
+        )
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self):
+        """Wait for pending writes (lifespan shutdown)"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _insert(user_id, interaction_type, prompt, response, carbon_savings_estimate):
+        try:
+            pool = await get_async_pool()
+            await pool.execute("""
+                INSERT INTO ai_interactions (user_id, interaction_type, prompt, response, carbon_savings_estimate)
+                VALUES ($1, $2, $3, $4, $5)
+            """, user_id, interaction_type, prompt, response, carbon_savings_estimate)
+        except Exception as e:
+            logger.error(f"Failed to log AI interaction for user {user_id}: {e}")
+
+class PostgresJobStore:
+    """
+    Job snapshots in the ai_chat_jobs table, shared by every worker and node
+    Same get/set interface as cache.RedisCache
+    purge_interval: seconds between deletions of expired rows (done on write)
+    """
+
+    def __init__(self, purge_interval=300):
+        self.purge_interval = purge_interval
+        self._purged_at = time.time()
+
+    def get(self, job_id):
+        try:
+            with get_db_cursor() as (cur, conn):
+                found = read_chat_job(cur, job_id)
+        except psycopg2.errors.UndefinedTable:
+            # No job has been published yet
+            return None
+        if found is None:
+            return None
+        user_id, snapshot = found
+        return {'userId': user_id, 'snapshot': snapshot}
+
+    def set(self, job_id, value, ttl):
+        try:
+            self._set(job_id, value, ttl)
+        except psycopg2.errors.UndefinedTable:
+            # First job before 'python migrate.py ai-jobs' ran
+            install_ai_chat_jobs()
+            self._set(job_id, value, ttl)
+
+    def _set(self, job_id, value, ttl):
+        purge = time.time() - self._purged_at >= self.purge_interval
+        with get_db_cursor() as (cur, conn):
+            upsert_chat_job(cur, job_id, value['userId'], value['snapshot'], ttl)
+            if purge:
+                purge_expired_chat_jobs(cur)
+            conn.commit()
+        if purge:
+            self._purged_at = time.time()
+
+class ChatJob:
+    """A single queued chat completion"""
+
+    __slots__ = ('id', 'user_id', 'user_input', 'state', 'tokens', 'result', 'error',
+                 'created_at', 'started_at', 'finished_at', 'changed')
+
+    def __init__(self, user_id, user_input):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.user_input = user_input
+        self.state = QUEUED
+        self.tokens = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in (COMPLETED, FAILED)
+
+    def snapshot(self):
+        """JSON-serializable view for polling"""
+        data = {
+            'jobId': self.id,
+            'state': self.state,
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at
+        }
+        if self.done:
+            data['response'] = (self.result or {}).get('advice', '')
+            data['emojis'] = (self.result or {}).get('emojis', [])
+            if self.error:
+                data['error'] = self.error
+                data['partial'] = ''.join(self.tokens)
+        else:
+            data['partial'] = ''.join(self.tokens)
+        return data
+
+class ChatJobQueue:
+    """Bounded worker pool for AI chat completions"""
+
+    def __init__(self, ai_service, interaction_logger, max_workers=4, max_pending=100, job_ttl=600, store=None):
+        self.ai_service = ai_service
+        self.interaction_logger = interaction_logger
+        # Shared store for job snapshots (None: jobs are only visible to this worker)
+        self.store = store
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-chat')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def submit(self, user_id, user_input):
+        """Enqueue a chat completion; raises QueueFull when too many are pending"""
+        self._expire_jobs()
+        job = ChatJob(user_id, user_input)
+        with self._lock:
+            pending = sum(1 for existing in self._jobs.values() if not existing.done)
+            if pending >= self.max_pending:
+                raise QueueFull(f'{pending} AI chat jobs already pending')
+            self._jobs[job.id] = job
+        # Published before the client gets the job id, so its first poll can land anywhere
+        self._publish(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_snapshot(self, job_id):
+        """
+        Poll a job: local jobs first, then snapshots published by other workers
+        Returns: (user_id, snapshot) or (None, None)
+        """
+        job = self.get(job_id)
+        if job is not None:
+            with job.changed:
+                return job.user_id, job.snapshot()
+        if self.store is not None:
+            try:
+                published = self.store.get(job_id)
+                if published is not None:
+                    return published['userId'], published['snapshot']
+            except Exception as e:
+                logger.warning(f"Could not read published AI job {job_id}: {e}")
+        return None, None
+
+    def follow_published(self, job_id, interval=1.0, heartbeat=15.0):
+        """
+        Wait on the shared store for a job running on another worker
+        Yields ('ping', None) every `heartbeat` seconds, then ('done', snapshot),
+        or ('lost', None) if the job's snapshot expires first
+        """
+        waited = 0.0
+        while True:
+            _, snapshot = self.get_snapshot(job_id)
+            if snapshot is None:
+                yield 'lost', None
+                return
+            if snapshot['state'] in (COMPLETED, FAILED):
+                yield 'done', snapshot
+                return
+            time.sleep(interval)
+            waited += interval
+            if waited >= heartbeat:
+                waited = 0.0
+                yield 'ping', None
+
+    def stream(self, job, heartbeat=15.0):
+        """
+        Yield ('token', text) as the job produces output, then ('done', snapshot)
+        Emits ('ping', None) every `heartbeat` seconds while waiting
+        """
+        sent = 0
+        while True:
+            with job.changed:
+                while sent >= len(job.tokens) and not job.done:
+                    if not job.changed.wait(heartbeat):
+                        break
+                new_tokens = job.tokens[sent:]
+                done = job.done
+                snapshot = job.snapshot() if done else None
+            if not new_tokens and not done:
+                yield 'ping', None
+                continue
+            for token in new_tokens:
+                yield 'token', token
+            sent += len(new_tokens)
+            if done:
+                yield 'done', snapshot
+                return
+
+    def _run(self, job):
+        with job.changed:
+            job.state = RUNNING
+            job.started_at = time.time()
+            job.changed.notify_all()
+        self._publish(job)
+        try:
+            for text in self.ai_service.stream_renewable_energy_advice(job.user_input):
+                with job.changed:
+                    job.tokens.append(text)
+                    job.changed.notify_all()
+            result = self.ai_service.build_advice_result(job.user_input, ''.join(job.tokens))
+            with job.changed:
+                job.result = result
+                job.state = COMPLETED
+        except Exception as e:
+            logger.error(f"AI chat job {job.id} failed: {e}")
+            with job.changed:
+                job.error = str(e)
+                job.state = FAILED
+        finally:
+            with job.changed:
+                job.finished_at = time.time()
+                job.changed.notify_all()
+            self._publish(job)
+
+        if job.state == COMPLETED:
+            self.interaction_logger.log(
+                job.user_id, 'chat', job.user_input.get('message', ''),
+                job.result['advice'], job.result.get('carbon_savings_estimate')
+            )
+
+    def _publish(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.set(
+                job.id,
+                {'userId': job.user_id, 'snapshot': job.snapshot()},
+                self.job_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Could not publish AI job {job.id}: {e}")
+
+    def _expire_jobs(self):
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+def _build_job_store():
+    """
+    Store named by AI_JOB_STORE: postgres (default; the ai_chat_jobs table),
+    redis (a store of its own, not the response cache, so jobs and cached
+    responses never evict each other) or memory (no shared store)
+    """
+    backend = os.getenv('AI_JOB_STORE', 'postgres').lower()
+    if backend == 'memory':
+        return None
+    if backend != 'redis':
+        return PostgresJobStore()
+    url = os.getenv('AI_JOB_REDIS_URL') or os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    try:
+        return RedisCache(url, prefix='ecohub:ai-job:')
+    except Exception as e:
+        logger.warning(f"Redis AI job store unavailable ({e}); publishing chat jobs to Postgres")
+        return PostgresJobStore()
+
+def create_chat_job_queue(ai_service, interaction_logger):
+    """Job queue sized from AI_CHAT_WORKERS / AI_CHAT_MAX_PENDING / AI_CHAT_JOB_TTL, shared through AI_JOB_STORE"""
+    return ChatJobQueue(
+        ai_service,
+        interaction_logger,
+        max_workers=int(os.getenv('AI_CHAT_WORKERS', '4')),
+        max_pending=int(os.getenv('AI_CHAT_MAX_PENDING', '100')),
+        job_ttl=int(os.getenv('AI_CHAT_JOB_TTL', '600')),
+        store=_build_job_store()
+    )
@@ -1,29 +1,52 @@
 import os
 import requests
 import openai
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import json
+from math import radians, cos, sin, asin, sqrt
+from ai_cache import advice_cache as default_advice_cache
+
+try:
+    from seller_ranking import SellerRankingEngine
+except ImportError:  # NumPy not installed: rank with the per-listing loop
+    SellerRankingEngine = None
+
+ADVISOR_SYSTEM_PROMPT = "You are an expert renewable energy advisor for EcoPower Hub, an AI-powered renewable energy platform. Provide personalized, actionable advice for transitioning to clean energy. Always include relevant emojis to make the advice engaging and climate-focused. Focus on SDG 13 (Climate Action) and emphasize environmental impact."
+
+class AdviceStreamInterrupted(Exception):
+    """The completion stream failed after some advice text was already yielded"""
 
 class AIService:
     """Service class for AI integrations with OpenAI and Carbon Interface"""
     
-    def __init__(self):
+    def __init__(self, openai_client=None, advice_cache=None):
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.carbon_interface_api_key = os.getenv('CARBON_INTERFACE_API_KEY')
         self.carbon_interface_base_url = "https://www.carboninterface.com/api/v1"
         
-        # Initialize OpenAI client
-        if self.openai_api_key:
-            try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=self.openai_api_key)
-                print("✅ OpenAI client initialized successfully")
-            except Exception as e:
-                print(f"Warning: OpenAI client initialization failed: {e}")
-                self.openai_client = None
-        else:
+        # Initialize OpenAI client (an injected or fake client stands in for tests and benchmarks)
+        self.openai_client = openai_client if openai_client is not None else self._create_openai_client()
+        
+        # Reuse answers for repeated prompts (None when AI_CACHE_ENABLED=false)
+        self.advice_cache = advice_cache if advice_cache is not None else default_advice_cache
+    
+    def _create_openai_client(self):
+        """OpenAI client from the environment (AI_FAKE_LLM selects the local fake)"""
+        if os.getenv('AI_FAKE_LLM', '').lower() in ('1', 'true', 'yes'):
+            from fake_llm import FakeLLMClient
+            print("✅ Using local fake LLM client")
+            return FakeLLMClient.from_env()
+        if not self.openai_api_key:
             print("Warning: OpenAI API key not found")
-            self.openai_client = None
+            return None
+        try:
+            from openai import OpenAI
+            client = OpenAI(api_key=self.openai_api_key)
+            print("✅ OpenAI client initialized successfully")
+            return client
+        except Exception as e:
+            print(f"Warning: OpenAI client initialization failed: {e}")
+            return None
     
     def get_renewable_energy_advice(self, user_input: Dict) -> Dict:
         """
@@ -36,8 +59,12 @@ class AIService:
             Dictionary with AI advice, carbon savings estimate, and emojis
         """
         try:
-            # Construct the prompt for OpenAI
             prompt = self._build_advice_prompt(user_input)
+            cached, tier = self._lookup_cached_advice(user_input, prompt)
+            if cached is not None:
+                result = self.build_advice_result(user_input, cached)
+                result['metadata']['cache'] = tier
+                return result
             
             # Call OpenAI API
             if not self.openai_client:
@@ -45,57 +72,108 @@ class AIService:
                 
             response = self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert renewable energy advisor for EcoPower Hub, an AI-powered renewable energy platform. Provide personalized, actionable advice for transitioning to clean energy. Always include relevant emojis to make the advice engaging and climate-focused. Focus on SDG 13 (Climate Action) and emphasize environmental impact."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._build_advice_messages(prompt),
                 max_tokens=600,
                 temperature=0.7
             )
             
             ai_response = response.choices[0].message.content
+            usage = getattr(response, 'usage', None)
+            self._store_cached_advice(user_input, prompt, ai_response, getattr(usage, 'total_tokens', None))
             
-            # Get carbon savings estimate
-            carbon_savings = self._estimate_carbon_savings(user_input)
+            return self.build_advice_result(user_input, ai_response)
             
-            # Extract emojis from response
-            emojis = self._extract_emojis(ai_response)
+        except Exception as e:
+            return self._advice_error_result(user_input, e)
+    
+    def stream_renewable_energy_advice(self, user_input: Dict) -> Iterator[str]:
+        """
+        Stream renewable energy advice as text chunks while the completion is generated
+        
+        Callers join the chunks and pass the full text to build_advice_result()
+        once the stream ends. A failure before any text yields the fallback advice
+        instead; a failure after it raises AdviceStreamInterrupted.
+        """
+        produced = False
+        try:
+            prompt = self._build_advice_prompt(user_input)
+            cached, _ = self._lookup_cached_advice(user_input, prompt)
+            if cached is not None:
+                produced = True
+                yield cached
+                return
+            
+            if not self.openai_client:
+                raise Exception("OpenAI client not initialized")
+            
+            stream = self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=self._build_advice_messages(prompt),
+                max_tokens=600,
+                temperature=0.7,
+                stream=True
+            )
             
+            chunks = []
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    produced = True
+                    chunks.append(text)
+                    yield text
+            self._store_cached_advice(user_input, prompt, ''.join(chunks))
+        except Exception as e:
+            if produced:
+                # The text so far is a truncated answer; callers must not treat it as complete
+                raise AdviceStreamInterrupted(str(e)) from e
+            yield self._advice_error_result(user_input, e)['advice']
+    
+    def build_advice_result(self, user_input: Dict, ai_response: str) -> Dict:
+        """Assemble the advice payload (carbon estimate, emojis, metadata) from the full response text"""
+        # Get carbon savings estimate
+        carbon_savings = self._estimate_carbon_savings(user_input)
+        
+        # Extract emojis from response
+        emojis = self._extract_emojis(ai_response)
+        
+        return {
+            'advice': ai_response,
+            'carbon_savings_estimate': carbon_savings,
+            'emojis': emojis,
+            'metadata': {
+                'location': user_input.get('location'),
+                'roof_size': user_input.get('roof_size'),
+                'energy_usage': user_input.get('energy_usage'),
+                'budget': user_input.get('budget')
+            }
+        }
+    
+    def _advice_error_result(self, user_input: Dict, error: Exception) -> Dict:
+        """Fallback advice payload when the completion fails"""
+        error_msg = str(error)
+        if "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
+            print("OpenAI quota exceeded - using fallback response")
             return {
-                'advice': ai_response,
-                'carbon_savings_estimate': carbon_savings,
-                'emojis': emojis,
+                'advice': "I'm currently experiencing high demand. Here's some general renewable energy advice: Consider solar panels for your roof, they can reduce your electricity bill by 50-90%. Wind energy is great for open areas. Check our marketplace for local suppliers!",
+                'carbon_savings_estimate': 500,
+                'emojis': ['☀️', '💡', '🌱'],
                 'metadata': {
                     'location': user_input.get('location'),
                     'roof_size': user_input.get('roof_size'),
                     'energy_usage': user_input.get('energy_usage'),
-                    'budget': user_input.get('budget')
+                    'budget': user_input.get('budget'),
+                    'fallback': True
                 }
             }
-            
-        except Exception as e:
-            error_msg = str(e)
-            if "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
-                print("OpenAI quota exceeded - using fallback response")
-                return {
-                    'advice': "I'm currently experiencing high demand. Here's some general renewable energy advice: Consider solar panels for your roof, they can reduce your electricity bill by 50-90%. Wind energy is great for open areas. Check our marketplace for local suppliers!",
-                    'carbon_savings_estimate': 500,
-                    'emojis': ['☀️', '💡', '🌱'],
-                    'metadata': {
-                        'location': user_input.get('location'),
-                        'roof_size': user_input.get('roof_size'),
-                        'energy_usage': user_input.get('energy_usage'),
-                        'budget': user_input.get('budget'),
-                        'fallback': True
-                    }
-                }
-            else:
-                return {
-                    'error': f"AI service error: {str(e)}",
-                    'advice': "I'm sorry, I'm having trouble providing advice right now. Please try again later. 🌱",
-                    'carbon_savings_estimate': 0,
-                    'emojis': ['🌱']
-                }
+        else:
+            return {
+                'error': f"AI service error: {error_msg}",
+                'advice': "I'm sorry, I'm having trouble providing advice right now. Please try again later. 🌱",
+                'carbon_savings_estimate': 0,
+                'emojis': ['🌱']
+            }
     
     def generate_listing_content(self, listing_data: Dict) -> Dict:
         """
@@ -158,23 +236,30 @@ class AIService:
                     'emojis': ['🌱', '🌍']
                 }
     
-    def rank_nearby_sellers(self, user_location: Tuple[float, float], listings: List[Dict]) -> List[Dict]:
+    def rank_nearby_sellers(self, user_location: Tuple[float, float], listings: List[Dict],
+                            top_k: Optional[int] = None, weights: Optional[Dict] = None) -> List[Dict]:
         """
         AI-powered ranking of nearby energy sellers
         
         Args:
             user_location: Tuple of (latitude, longitude)
             listings: List of listing dictionaries
+            top_k: Only return the best k listings (default: all)
+            weights: Override score weights (price, availability, energy_type, distance)
         
         Returns:
             List of ranked listings with AI scores
         """
         try:
+            if SellerRankingEngine is not None:
+                return SellerRankingEngine(weights).rank(user_location, listings, top_k)
+            
             # Calculate distance and other factors
             ranked_listings = []
+            score_weights = {'price': 0.4, 'availability': 0.3, 'energy_type': 0.3, **(weights or {})}
             
             for listing in listings:
-                # Calculate distance (simple Euclidean distance for MVP)
+                # Calculate distance (haversine)
                 distance = self._calculate_distance(user_location, (listing['latitude'], listing['longitude']))
                 
                 # AI scoring factors
@@ -183,7 +268,7 @@ class AIService:
                 energy_type_score = self._calculate_energy_type_score(listing['energy_type'])
                 
                 # Combined AI score
-                ai_score = (price_score * 0.4 + availability_score * 0.3 + energy_type_score * 0.3)
+                ai_score = (price_score * score_weights['price'] + availability_score * score_weights['availability'] + energy_type_score * score_weights['energy_type'])
                 
                 ranked_listing = {
                     **listing,
@@ -199,11 +284,12 @@ class AIService:
             # Sort by AI score (highest first)
             ranked_listings.sort(key=lambda x: x['ai_score'], reverse=True)
             
-            return ranked_listings
+            return ranked_listings[:top_k] if top_k is not None else ranked_listings
             
         except Exception as e:
             # Fallback to distance-based ranking
-            return self._fallback_distance_ranking(user_location, listings)
+            ranked_listings = self._fallback_distance_ranking(user_location, listings)
+            return ranked_listings[:top_k] if top_k is not None else ranked_listings
     
     def get_carbon_footprint_data(self, location: str, energy_type: str = "solar") -> Dict:
         """
@@ -242,6 +328,36 @@ class AIService:
         except Exception as e:
             return {'error': f'Carbon Interface service error: {str(e)}'}
     
+    def _build_advice_messages(self, prompt: str) -> List[Dict]:
+        """Chat messages for an advice completion"""
+        return [
+            {"role": "system", "content": ADVISOR_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _lookup_cached_advice(self, user_input: Dict, prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """Cached answer and tier ('exact' or 'similar') for this prompt, if any"""
+        if not self.advice_cache:
+            return None, None
+        return self.advice_cache.lookup(
+            prompt,
+            location=user_input.get('location', ''),
+            role=user_input.get('role', ''),
+            message=user_input.get('message')
+        )
+    
+    def _store_cached_advice(self, user_input: Dict, prompt: str, ai_response: str, tokens: Optional[int] = None):
+        if not self.advice_cache:
+            return
+        self.advice_cache.store(
+            prompt,
+            ai_response,
+            location=user_input.get('location', ''),
+            role=user_input.get('role', ''),
+            message=user_input.get('message'),
+            tokens=tokens
+        )
+    
     def _build_advice_prompt(self, user_input: Dict) -> str:
         """Build the prompt for renewable energy advice with climate action focus"""
         # Check if this is a chat message or structured advice request
@@ -358,8 +474,6 @@ class AIService:
     
     def _calculate_distance(self, point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
         """Calculate distance between two points in kilometers"""
-        from math import radians, cos, sin, asin, sqrt
-        
         lat1, lon1 = point1
         lat2, lon2 = point2
         
@@ -443,3 +557,94 @@ class AIService:
         
         ranked_listings.sort(key=lambda x: x['ai_score'], reverse=True)
         return ranked_listings
+
+class AsyncAIService(AIService):
+    """
+    AIService for the event loop (async serving mode)
+    Advice completions go through openai.AsyncOpenAI, so a slow completion
+    suspends the request instead of blocking a worker thread. Prompt building,
+    the advice cache and result assembly are shared with AIService.
+    """
+    
+    def _create_openai_client(self):
+        if os.getenv('AI_FAKE_LLM', '').lower() in ('1', 'true', 'yes'):
+            from fake_llm import AsyncFakeLLMClient
+            print("✅ Using local async fake LLM client")
+            return AsyncFakeLLMClient.from_env()
+        if not self.openai_api_key:
+            print("Warning: OpenAI API key not found")
+            return None
+        try:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=self.openai_api_key)
+            print("✅ Async OpenAI client initialized successfully")
+            return client
+        except Exception as e:
+            print(f"Warning: Async OpenAI client initialization failed: {e}")
+            return None
+    
+    async def get_renewable_energy_advice(self, user_input: Dict) -> Dict:
+        """Async get_renewable_energy_advice(): same result, awaited completion"""
+        try:
+            prompt = self._build_advice_prompt(user_input)
+            cached, tier = self._lookup_cached_advice(user_input, prompt)
+            if cached is not None:
+                result = self.build_advice_result(user_input, cached)
+                result['metadata']['cache'] = tier
+                return result
+            
+            if not self.openai_client:
+                raise Exception("OpenAI client not initialized")
+            
+            response = await self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=self._build_advice_messages(prompt),
+                max_tokens=600,
+                temperature=0.7
+            )
+            
+            ai_response = response.choices[0].message.content
+            usage = getattr(response, 'usage', None)
+            self._store_cached_advice(user_input, prompt, ai_response, getattr(usage, 'total_tokens', None))
+            
+            return self.build_advice_result(user_input, ai_response)
+            
+        except Exception as e:
+            return self._advice_error_result(user_input, e)
+    
+    async def stream_renewable_energy_advice(self, user_input: Dict) -> AsyncIterator[str]:
+        """Async stream_renewable_energy_advice(): text chunks as they arrive"""
+        produced = False
+        try:
+            prompt = self._build_advice_prompt(user_input)
+            cached, _ = self._lookup_cached_advice(user_input, prompt)
+            if cached is not None:
+                produced = True
+                yield cached
+                return
+            
+            if not self.openai_client:
+                raise Exception("OpenAI client not initialized")
+            
+            stream = await self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=self._build_advice_messages(prompt),
+                max_tokens=600,
+                temperature=0.7,
+                stream=True
+            )
+            
+            chunks = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    produced = True
+                    chunks.append(text)
+                    yield text
+            self._store_cached_advice(user_input, prompt, ''.join(chunks))
+        except Exception as e:
+            if produced:
+                raise AdviceStreamInterrupted(str(e)) from e
+            yield self._advice_error_result(user_input, e)['advice']
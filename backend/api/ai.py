@@ -3,10 +3,15 @@ AI Auto-fill API Endpoints
 This module provides AI-powered auto-fill functionality for forms
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database.config import get_db_cursor
-from ai_service import AIService
+from ai_service import AIService, AdviceStreamInterrupted
+from ai_jobs import InteractionLogger, QueueFull, create_chat_job_queue, FAILED
+from cache import cached_response
+from api.conditional import conditional_get
+from user_context import get_user_role_location
+import json
 import logging
 import random
 
@@ -20,11 +25,121 @@ logger = logging.getLogger(__name__)
 # Initialize AI Service
 ai_service = AIService()
 
+# Background interaction logging and the chat job worker pool
+interaction_logger = InteractionLogger()
+chat_jobs = create_chat_job_queue(ai_service, interaction_logger)
+
+# Returned when the AI service fails outright
+CHAT_FALLBACK_RESPONSE = {
+    'status': 'success',
+    'response': "I'm your AI Renewable Energy Advisor! 🌱⚡ I can help you with solar energy advice, cost savings, and finding local energy suppliers. What would you like to know about renewable energy?",
+    'emojis': ['🌱', '⚡', '🌍']
+}
+
+def build_chat_input(user_id, user_message):
+    """Chat input for the AI service, with the user's location and role for context"""
+    user_location = ''
+    user_role = 'consumer'
+    try:
+        # Token claims or the per-worker user context cache; the database only on a miss
+        user = get_user_role_location(user_id)
+        if user:
+            user_location = user['location'] or ''
+            user_role = user['role'] or 'consumer'
+    except Exception as db_error:
+        logger.warning(f"Could not fetch user data: {str(db_error)}")
+    
+    return {
+        'message': user_message,
+        'location': user_location,
+        'role': user_role
+    }
+
+def submit_chat_job(user_id, user_input):
+    """Queue a chat on the job worker pool; 202 with poll/stream URLs, or 503 when full"""
+    try:
+        job = chat_jobs.submit(user_id, user_input)
+    except QueueFull as e:
+        logger.warning(f"AI chat queue full: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'AI advisor is busy, please try again shortly'
+        }), 503
+    
+    return jsonify({
+        'status': 'success',
+        'jobId': job.id,
+        'state': job.state,
+        'statusUrl': f'/api/ai/chat/jobs/{job.id}',
+        'streamUrl': f'/api/ai/chat/jobs/{job.id}/stream'
+    }), 202
+
+def wants_event_stream():
+    """True when the client asked for server-sent events (mode=stream or Accept header)"""
+    data = request.get_json(silent=True) or {}
+    if (data.get('mode') or request.args.get('mode')) == 'stream':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'text/event-stream'])
+    return best == 'text/event-stream'
+
+def stream_chat_events(user_id, user_input):
+    """
+    Relay advice tokens as `token` events while the completion streams in
+    Emojis are extracted and the interaction logged once, at stream end;
+    a stream that fails midway ends with an `error` event instead of `done`
+    """
+    chunks = []
+    try:
+        for text in ai_service.stream_renewable_energy_advice(user_input):
+            chunks.append(text)
+            yield format_sse('token', {'text': text})
+    except AdviceStreamInterrupted as e:
+        # Truncated advice is neither logged nor presented as a finished answer
+        logger.error(f"AI chat stream for user {user_id} interrupted: {e}")
+        yield format_sse('error', {
+            'message': 'The answer was interrupted, please try again',
+            'partial': ''.join(chunks)
+        })
+        return
+    
+    ai_response = ai_service.build_advice_result(user_input, ''.join(chunks))
+    interaction_logger.log(
+        user_id,
+        'chat',
+        user_input.get('message', ''),
+        ai_response['advice'],
+        ai_response.get('carbon_savings_estimate')
+    )
+    yield format_sse('done', {
+        'response': ai_response['advice'],
+        'emojis': ai_response['emojis']
+    })
+
+def format_sse(event, data):
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Event streams must not be cached or buffered by proxies
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+def sse_response(events):
+    """Streamed text/event-stream response that proxies must not buffer"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
 @ai_bp.route('/chat', methods=['POST'])
 @jwt_required()
 def ai_chat():
     """
     AI Chat endpoint for conversational renewable energy advice
+    Send `mode: "stream"` (or Accept: text/event-stream) for server-sent token events,
+    or `mode: "job"` to queue the chat and poll/stream it by job id
     """
     try:
         user_id_str = get_jwt_identity()
@@ -41,25 +156,17 @@ def ai_chat():
         user_message = data['message']
         logger.info(f"AI chat request from user {user_id}: {user_message[:50]}...")
         
-        # Get user data for context
-        user_location = ''
-        user_role = 'consumer'
-        try:
-            with get_db_cursor() as (cur, conn):
-                cur.execute("SELECT email, location, role FROM users WHERE id = %s", (user_id,))
-                user = cur.fetchone()
-                if user:
-                    user_location = user.get('location', '') if isinstance(user, dict) else (user[2] if len(user) > 2 else '')
-                    user_role = user.get('role', 'consumer') if isinstance(user, dict) else (user[3] if len(user) > 3 else 'consumer')
-        except Exception as db_error:
-            logger.warning(f"Could not fetch user data: {str(db_error)}")
-        
         # Prepare user input for AI service
-        user_input = {
-            'message': user_message,
-            'location': user_location,
-            'role': user_role
-        }
+        user_input = build_chat_input(user_id, user_message)
+        
+        # Stream mode: flush tokens to the client as the completion arrives
+        if wants_event_stream():
+            return sse_response(stream_chat_events(user_id, user_input))
+        
+        # Job mode: hand the completion to the worker pool and return immediately
+        mode = data.get('mode') or request.args.get('mode')
+        if mode == 'job':
+            return submit_chat_job(user_id, user_input)
         
         # Get AI response
         try:
@@ -69,19 +176,14 @@ def ai_chat():
             response_text = ai_response.get('advice', '')
             emojis = ai_response.get('emojis', [])
             
-            # Log interaction to database
-            with get_db_cursor() as (cur, conn):
-                cur.execute("""
-                    INSERT INTO ai_interactions (user_id, interaction_type, prompt, response, carbon_savings_estimate)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (
-                    user_id,
-                    'chat',
-                    user_message,
-                    response_text,
-                    ai_response.get('carbon_savings_estimate')
-                ))
-                conn.commit()
+            # Log interaction to database off the request path
+            interaction_logger.log(
+                user_id,
+                'chat',
+                user_message,
+                response_text,
+                ai_response.get('carbon_savings_estimate')
+            )
             
             return jsonify({
                 'status': 'success',
@@ -92,11 +194,7 @@ def ai_chat():
         except Exception as ai_error:
             logger.error(f"AI service error: {str(ai_error)}")
             # Return fallback response if AI service fails
-            return jsonify({
-                'status': 'success',
-                'response': "I'm your AI Renewable Energy Advisor! 🌱⚡ I can help you with solar energy advice, cost savings, and finding local energy suppliers. What would you like to know about renewable energy?",
-                'emojis': ['🌱', '⚡', '🌍']
-            }), 200
+            return jsonify(CHAT_FALLBACK_RESPONSE), 200
             
     except Exception as e:
         logger.error(f"Error in AI chat: {str(e)}")
@@ -106,6 +204,89 @@ def ai_chat():
             'error': str(e)
         }), 500
 
+@ai_bp.route('/chat/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_chat_job(job_id):
+    """
+    Poll a queued AI chat job
+    """
+    try:
+        user_id_str = get_jwt_identity()
+        user_id = int(user_id_str) if user_id_str else None
+        
+        owner_id, snapshot = chat_jobs.get_snapshot(job_id)
+        if snapshot is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Chat job not found'
+            }), 404
+        
+        if owner_id != user_id:
+            return jsonify({
+                'status': 'error',
+                'message': 'Unauthorized to view this chat job'
+            }), 403
+        
+        return jsonify({
+            'status': 'success',
+            **snapshot
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching chat job {job_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to fetch chat job',
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/chat/jobs/<job_id>/stream', methods=['GET'])
+@jwt_required()
+def stream_chat_job(job_id):
+    """
+    Stream a queued AI chat job as server-sent events
+    Emits `token` events as text arrives and a final `done` event (`error` when the job failed);
+    on a worker other than the one running the job, only the final event
+    """
+    user_id_str = get_jwt_identity()
+    user_id = int(user_id_str) if user_id_str else None
+    
+    job = chat_jobs.get(job_id)
+    if job is None:
+        # Running or finished on another worker: wait for its published result, sent as one event
+        owner_id, snapshot = chat_jobs.get_snapshot(job_id)
+        if snapshot is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Chat job not found'
+            }), 404
+        if owner_id != user_id:
+            return jsonify({
+                'status': 'error',
+                'message': 'Unauthorized to view this chat job'
+            }), 403
+        job_events = chat_jobs.follow_published(job_id)
+    elif job.user_id != user_id:
+        return jsonify({
+            'status': 'error',
+            'message': 'Unauthorized to view this chat job'
+        }), 403
+    else:
+        job_events = chat_jobs.stream(job)
+    
+    def events():
+        for event, payload in job_events:
+            if event == 'ping':
+                yield ": keep-alive\n\n"
+            elif event == 'token':
+                yield format_sse('token', {'text': payload})
+            elif event == 'lost':
+                yield format_sse('error', {'state': FAILED, 'error': 'Chat job expired before it finished'})
+            else:
+                yield format_sse('error' if payload['state'] == FAILED else 'done', payload)
+    
+    return sse_response(events())
+
 @ai_bp.route('/auto-fill', methods=['POST'])
 def auto_fill_form():
     """
@@ -142,6 +323,19 @@ def auto_fill_form():
             'error': str(e)
         }), 500
 
+# Market averages behind the auto-fill suggestions
+MARKET_SUGGESTION_QUERY = """
+    SELECT 
+        energy_type,
+        AVG(price_per_kwh) as avg_price,
+        AVG(quantity_kwh) as avg_quantity,
+        COUNT(*) as frequency
+    FROM energy_listings
+    WHERE status = 'active'
+    GROUP BY energy_type
+    ORDER BY frequency DESC
+"""
+
 def generate_ai_suggestions(location):
     """
     Generate AI-powered suggestions based on location and market data
@@ -149,17 +343,7 @@ def generate_ai_suggestions(location):
     try:
         with get_db_cursor() as (cur, conn):
             # Get market data for similar locations
-            cur.execute("""
-                SELECT 
-                    energy_type,
-                    AVG(price_per_kwh) as avg_price,
-                    AVG(quantity_kwh) as avg_quantity,
-                    COUNT(*) as frequency
-                FROM energy_listings
-                WHERE status = 'active'
-                GROUP BY energy_type
-                ORDER BY frequency DESC
-            """)
+            cur.execute(MARKET_SUGGESTION_QUERY)
             
             market_data = cur.fetchall()
             
@@ -180,90 +364,101 @@ def generate_ai_suggestions(location):
                 
                 location_data = cur.fetchone()
             
-            # Generate suggestions
-            suggestions = {}
-            
-            if market_data:
-                # Most popular energy type
-                most_popular = market_data[0]
-                suggestions['energyType'] = most_popular['energy_type']
-                
-                # Price suggestion (with some variation)
-                base_price = float(most_popular['avg_price'])
-                price_variation = base_price * 0.1  # 10% variation
-                suggested_price = round(base_price + random.uniform(-price_variation, price_variation), 2)
-                suggestions['price'] = str(suggested_price)
-                
-                # Quantity suggestion
-                base_quantity = int(most_popular['avg_quantity'])
-                quantity_variation = base_quantity * 0.2  # 20% variation
-                suggested_quantity = int(base_quantity + random.uniform(-quantity_variation, quantity_variation))
-                suggestions['quantity'] = str(max(100, suggested_quantity))  # Minimum 100 kWh
-            
-            # Location-specific suggestions
-            if location_data:
-                suggestions['energyType'] = location_data['energy_type']
-                suggestions['price'] = str(round(float(location_data['avg_price']), 2))
-                suggestions['quantity'] = str(int(location_data['avg_quantity']))
-            
-            # Generate smart title based on energy type and quantity
-            if 'energyType' in suggestions:
-                energy_type = suggestions['energyType']
-                quantity = suggestions.get('quantity', '500')
-                
-                title_templates = {
-                    'Solar': [
-                        f"Solar Energy Surplus - {quantity} kWh Daily",
-                        f"Clean Solar Power Available - {quantity} kWh",
-                        f"Daily Solar Energy Supply - {quantity} kWh"
-                    ],
-                    'Wind': [
-                        f"Wind Power Generation - {quantity} kWh",
-                        f"Clean Wind Energy Available - {quantity} kWh",
-                        f"Renewable Wind Power - {quantity} kWh"
-                    ],
-                    'Hydro': [
-                        f"Hydropower Surplus - {quantity} kWh",
-                        f"Clean Hydroelectric Energy - {quantity} kWh",
-                        f"Renewable Hydro Power - {quantity} kWh"
-                    ],
-                    'Biomass': [
-                        f"Biomass Energy Supply - {quantity} kWh",
-                        f"Clean Biomass Power - {quantity} kWh",
-                        f"Renewable Biomass Energy - {quantity} kWh"
-                    ]
-                }
-                
-                templates = title_templates.get(energy_type, [f"{energy_type} Energy - {quantity} kWh"])
-                suggestions['title'] = random.choice(templates)
-            
-            # Add confidence scores
-            suggestions['_confidence'] = {
-                'energyType': 0.85,
-                'price': 0.75,
-                'quantity': 0.80,
-                'title': 0.70
-            }
-            
-            return suggestions
+            return build_ai_suggestions(market_data, location_data)
             
     except Exception as e:
         logger.error(f"Error in generate_ai_suggestions: {str(e)}")
-        # Return fallback suggestions
-        return {
-            'energyType': 'Solar',
-            'price': '0.12',
-            'quantity': '500',
-            'title': 'Solar Energy Surplus - 500 kWh',
-            '_confidence': {
-                'energyType': 0.50,
-                'price': 0.50,
-                'quantity': 0.50,
-                'title': 0.50
-            }
+        return fallback_ai_suggestions()
+
+def build_ai_suggestions(market_data, location_data):
+    """
+    Form suggestions from market-wide averages (most listed energy type first)
+    and the best match for the user's location, if any
+    """
+    suggestions = {}
+    
+    if market_data:
+        # Most popular energy type
+        most_popular = market_data[0]
+        suggestions['energyType'] = most_popular['energy_type']
+        
+        # Price suggestion (with some variation)
+        base_price = float(most_popular['avg_price'])
+        price_variation = base_price * 0.1  # 10% variation
+        suggested_price = round(base_price + random.uniform(-price_variation, price_variation), 2)
+        suggestions['price'] = str(suggested_price)
+        
+        # Quantity suggestion
+        base_quantity = int(most_popular['avg_quantity'])
+        quantity_variation = base_quantity * 0.2  # 20% variation
+        suggested_quantity = int(base_quantity + random.uniform(-quantity_variation, quantity_variation))
+        suggestions['quantity'] = str(max(100, suggested_quantity))  # Minimum 100 kWh
+    
+    # Location-specific suggestions
+    if location_data:
+        suggestions['energyType'] = location_data['energy_type']
+        suggestions['price'] = str(round(float(location_data['avg_price']), 2))
+        suggestions['quantity'] = str(int(location_data['avg_quantity']))
+    
+    # Generate smart title based on energy type and quantity
+    if 'energyType' in suggestions:
+        energy_type = suggestions['energyType']
+        quantity = suggestions.get('quantity', '500')
+        
+        title_templates = {
+            'Solar': [
+                f"Solar Energy Surplus - {quantity} kWh Daily",
+                f"Clean Solar Power Available - {quantity} kWh",
+                f"Daily Solar Energy Supply - {quantity} kWh"
+            ],
+            'Wind': [
+                f"Wind Power Generation - {quantity} kWh",
+                f"Clean Wind Energy Available - {quantity} kWh",
+                f"Renewable Wind Power - {quantity} kWh"
+            ],
+            'Hydro': [
+                f"Hydropower Surplus - {quantity} kWh",
+                f"Clean Hydroelectric Energy - {quantity} kWh",
+                f"Renewable Hydro Power - {quantity} kWh"
+            ],
+            'Biomass': [
+                f"Biomass Energy Supply - {quantity} kWh",
+                f"Clean Biomass Power - {quantity} kWh",
+                f"Renewable Biomass Energy - {quantity} kWh"
+            ]
+        }
+        
+        templates = title_templates.get(energy_type, [f"{energy_type} Energy - {quantity} kWh"])
+        suggestions['title'] = random.choice(templates)
+    
+    # Add confidence scores
+    suggestions['_confidence'] = {
+        'energyType': 0.85,
+        'price': 0.75,
+        'quantity': 0.80,
+        'title': 0.70
+    }
+    
+    return suggestions
+
+def fallback_ai_suggestions():
+    """Suggestions used when market data cannot be read"""
+    return {
+        'energyType': 'Solar',
+        'price': '0.12',
+        'quantity': '500',
+        'title': 'Solar Energy Surplus - 500 kWh',
+        '_confidence': {
+            'energyType': 0.50,
+            'price': 0.50,
+            'quantity': 0.50,
+            'title': 0.50
         }
+    }
 
 @ai_bp.route('/analyze-market', methods=['GET'])
+@conditional_get('listings', 'transactions')
+@cached_response('market', ttl=300)
 def analyze_market():
     """
     Analyze market trends and provide insights
@@ -0,0 +1,210 @@
+"""
+Async AI Endpoints
+Event-loop versions of the AI endpoints in api/ai.py, served by asgi.py.
+Completions are awaited through AsyncAIService and database reads go through
+the asyncpg pool, so a slow model or query suspends the request instead of
+holding a worker thread. Responses match the Flask views.
+
+Chat jobs (mode=job) are queued on the same worker pool as api/ai.py, so the
+job poll/stream routes served by Flask see them. /api/ai/analyze-market stays
+on Flask, behind its response cache.
+"""
+
+from flask import request, jsonify
+from flask_jwt_extended import get_jwt_identity
+from ai_service import AsyncAIService, AdviceStreamInterrupted
+from ai_jobs import AsyncInteractionLogger
+from database.async_pool import get_async_pool
+from user_context import get_async_user_role_location
+from api.async_routes import AsyncBlueprint, EventStream
+from api.ai import (
+    CHAT_FALLBACK_RESPONSE, MARKET_SUGGESTION_QUERY, build_ai_suggestions,
+    fallback_ai_suggestions, format_sse, submit_chat_job, wants_event_stream
+)
+import asyncio
+import logging
+
+ai_async_bp = AsyncBlueprint('ai_async', url_prefix='/api/ai')
+
+logger = logging.getLogger(__name__)
+
+ai_service = AsyncAIService()
+interaction_logger = AsyncInteractionLogger()
+
+async def build_chat_input(user_id, user_message):
+    """Chat input for the AI service, with the user's location and role for context"""
+    user_location = ''
+    user_role = 'consumer'
+    try:
+        # Token claims or the per-worker user context cache; the database only on a miss
+        user = await get_async_user_role_location(user_id)
+        if user:
+            user_location = user['location'] or ''
+            user_role = user['role'] or 'consumer'
+    except Exception as db_error:
+        logger.warning(f"Could not fetch user data: {str(db_error)}")
+
+    return {
+        'message': user_message,
+        'location': user_location,
+        'role': user_role
+    }
+
+async def stream_chat_events(user_id, user_input):
+    """
+    Relay advice tokens as `token` events while the completion streams in
+    Emojis are extracted and the interaction logged once, at stream end;
+    a stream that fails midway ends with an `error` event instead of `done`
+    """
+    chunks = []
+    try:
+        async for text in ai_service.stream_renewable_energy_advice(user_input):
+            chunks.append(text)
+            yield format_sse('token', {'text': text})
+    except AdviceStreamInterrupted as e:
+        # Truncated advice is neither logged nor presented as a finished answer
+        logger.error(f"AI chat stream for user {user_id} interrupted: {e}")
+        yield format_sse('error', {
+            'message': 'The answer was interrupted, please try again',
+            'partial': ''.join(chunks)
+        })
+        return
+
+    ai_response = ai_service.build_advice_result(user_input, ''.join(chunks))
+    interaction_logger.log(
+        user_id,
+        'chat',
+        user_input.get('message', ''),
+        ai_response['advice'],
+        ai_response.get('carbon_savings_estimate')
+    )
+    yield format_sse('done', {
+        'response': ai_response['advice'],
+        'emojis': ai_response['emojis']
+    })
+
+@ai_async_bp.route('/chat', methods=['POST'], jwt_required=True)
+async def ai_chat():
+    """
+    AI Chat endpoint for conversational renewable energy advice
+    Same modes as the Flask view: stream (server-sent events), job, or a single JSON answer
+    """
+    try:
+        user_id_str = get_jwt_identity()
+        # Convert string ID back to integer for database queries
+        user_id = int(user_id_str) if user_id_str else None
+        data = request.get_json()
+
+        if not data or not data.get('message'):
+            return jsonify({
+                'status': 'error',
+                'message': 'Message is required'
+            }), 400
+
+        user_message = data['message']
+        logger.info(f"AI chat request from user {user_id}: {user_message[:50]}...")
+
+        user_input = await build_chat_input(user_id, user_message)
+
+        if wants_event_stream():
+            return EventStream(stream_chat_events(user_id, user_input))
+
+        mode = data.get('mode') or request.args.get('mode')
+        if mode == 'job':
+            # Publishing the queued job is a database write; keep it off the event loop
+            return await asyncio.to_thread(submit_chat_job, user_id, user_input)
+
+        try:
+            ai_response = await ai_service.get_renewable_energy_advice(user_input)
+
+            response_text = ai_response.get('advice', '')
+            emojis = ai_response.get('emojis', [])
+
+            interaction_logger.log(
+                user_id,
+                'chat',
+                user_message,
+                response_text,
+                ai_response.get('carbon_savings_estimate')
+            )
+
+            return jsonify({
+                'status': 'success',
+                'response': response_text,
+                'emojis': emojis
+            }), 200
+
+        except Exception as ai_error:
+            logger.error(f"AI service error: {str(ai_error)}")
+            return jsonify(CHAT_FALLBACK_RESPONSE), 200
+
+    except Exception as e:
+        logger.error(f"Error in AI chat: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to process chat request',
+            'error': str(e)
+        }), 500
+
+@ai_async_bp.route('/auto-fill', methods=['POST'])
+async def auto_fill_form():
+    """
+    Auto-fill form fields using AI (simulated for now)
+    This endpoint analyzes existing data patterns and suggests values
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                'status': 'error',
+                'message': 'No data provided'
+            }), 400
+
+        current_data = data.get('currentData', {})
+        location = current_data.get('location', '')
+
+        suggestions = await generate_ai_suggestions(location)
+
+        return jsonify({
+            'status': 'success',
+            'message': 'AI suggestions generated',
+            'data': suggestions
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error generating AI suggestions: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to generate AI suggestions',
+            'error': str(e)
+        }), 500
+
+async def generate_ai_suggestions(location):
+    """
+    Generate AI-powered suggestions based on location and market data
+    """
+    try:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn:
+            market_data = await conn.fetch(MARKET_SUGGESTION_QUERY)
+
+            location_data = None
+            if location:
+                location_data = await conn.fetchrow("""
+                    SELECT
+                        energy_type,
+                        AVG(price_per_kwh) as avg_price,
+                        AVG(quantity_kwh) as avg_quantity
+                    FROM energy_listings
+                    WHERE LOWER(location) LIKE LOWER($1) AND status = 'active'
+                    GROUP BY energy_type
+                    ORDER BY COUNT(*) DESC
+                    LIMIT 1
+                """, f'%{location}%')
+
+        return build_ai_suggestions(market_data, location_data)
+
+    except Exception as e:
+        logger.error(f"Error in generate_ai_suggestions: {str(e)}")
+        return fallback_ai_suggestions()
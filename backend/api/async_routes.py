@@ -0,0 +1,45 @@
+"""
+Async Route Registry
+Blueprint-like registry of coroutine views for the async serving mode
+(asgi.py). Matching requests run on the event loop; everything else is
+served by the Flask app.
+
+Views run inside a Flask request context, so request, jsonify and
+get_jwt_identity work as in a Flask view. Paths are static (no URL
+converters).
+"""
+
+class EventStream:
+    """View return value: server-sent events from an async iterator of encoded event strings"""
+
+    def __init__(self, events):
+        self.events = events
+
+class AsyncRoute:
+    """A coroutine view and how to call it"""
+
+    __slots__ = ('view', 'jwt_required')
+
+    def __init__(self, view, jwt_required):
+        self.view = view
+        self.jwt_required = jwt_required
+
+class AsyncBlueprint:
+    """Coroutine views under a URL prefix, keyed by (method, path)"""
+
+    def __init__(self, name, url_prefix=''):
+        self.name = name
+        self.url_prefix = url_prefix.rstrip('/')
+        self.routes = {}
+
+    def route(self, rule, methods=('GET',), jwt_required=False):
+        """
+        Register a coroutine view
+        jwt_required: verify the access token (and revocation) before the view runs
+        """
+        def decorator(view):
+            path = self.url_prefix + rule
+            for method in methods:
+                self.routes[(method.upper(), path)] = AsyncRoute(view, jwt_required)
+            return view
+        return decorator
@@ -0,0 +1,64 @@
+"""
+Conditional GET Support
+Strong ETags built from table version counters, so an unchanged resource
+is answered with 304 before the full query runs or the payload is serialized
+"""
+
+import hashlib
+import logging
+from functools import wraps
+from flask import g, request, make_response, Response
+from database.config import get_db_cursor
+from database.versions import read_resource_versions
+from cache import is_cacheable_response
+
+logger = logging.getLogger(__name__)
+
+def compute_etag(resources):
+    """
+    Strong ETag for the current request over the given tables
+    Returns None when version tracking is not installed
+    The versions read are kept on flask.g.resource_versions for the view
+    """
+    with get_db_cursor() as (cur, conn):
+        versions = read_resource_versions(cur, resources)
+    if versions is None:
+        return None
+    g.resource_versions = versions
+    normalized_args = '&'.join(
+        f'{name}={value}' for name, value in sorted(request.args.items(multi=True))
+    )
+    version_key = ','.join(f'{name}:{versions[name]}' for name in sorted(versions))
+    digest = hashlib.sha1(f'{request.path}?{normalized_args}|{version_key}'.encode('utf-8')).hexdigest()
+    return digest
+
+def conditional_get(*resources):
+    """
+    Emit an ETag derived from the versions of `resources` and answer
+    matching If-None-Match requests with 304 without calling the view
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                etag = compute_etag(resources)
+            except Exception as e:
+                logger.warning(f"ETag computation failed, serving full response: {e}")
+                etag = None
+
+            if etag is None:
+                return view(*args, **kwargs)
+
+            if etag in request.if_none_match:
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if is_cacheable_response(response):
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -1,11 +1,17 @@
 """
 Dashboard API Endpoints
-This module provides endpoints for dashboard metrics computed from live database tables
-ONLY queries: users, transactions, listings tables - NO dashboard_metrics table
+This module provides endpoints for dashboard metrics derived from users, transactions
+and listings - read from the materialized dashboard_counters table when installed,
+otherwise computed from the live tables
 """
 
 from flask import Blueprint, jsonify
 from database.config import get_db_cursor
+from cache import cached_response
+from api.conditional import conditional_get
+from database.metrics import (
+    MEMBERS, HOUSEHOLDS, ENERGY_BOUGHT, ENERGY_LISTED, compute_live_totals, read_dashboard_counters
+)
 import logging
 
 # Create blueprint for dashboard API
@@ -15,147 +21,79 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 1 kWh renewable saves ~0.5 kg CO2; 1 tree offsets ~21 kg CO2/year
+CO2_KG_PER_KWH = 0.5
+CO2_KG_PER_TREE = 21
+
+def format_dashboard_metrics(members, households, energy_bought_kwh, energy_remaining_kwh):
+    """
+    Build the dashboard metrics payload from raw numbers
+    Purchases take their kWh out of listings.available_kwh, so energy listed
+    (energy_saved: all energy listed, bought or not) is what remains plus what was bought
+    """
+    energy_listed_kwh = energy_remaining_kwh + energy_bought_kwh
+    co2_saved_kg = int(energy_bought_kwh * CO2_KG_PER_KWH)
+    trees_equivalent = int(co2_saved_kg / CO2_KG_PER_TREE) if co2_saved_kg > 0 else 0
+    return {
+        'active_community_members': {'value': str(int(members))},
+        'households_powered': {'value': str(int(households))},
+        'energy_bought': {'value': f"{int(energy_bought_kwh):,} kWh", 'unit': 'kWh'},
+        'energy_saved': {'value': f"{int(energy_listed_kwh):,} kWh", 'unit': 'kWh'},
+        'co2_savings': {'value': f"{co2_saved_kg:,} kg"},
+        'environmental_impact_trees': {'value': f"≈ to Planting {trees_equivalent:,} trees!"}
+    }
+
 @dashboard_bp.route('/metrics', methods=['GET'])
+@conditional_get('users', 'listings', 'transactions')
+@cached_response('dashboard')
 def get_dashboard_metrics():
     """
-    Get all dashboard metrics computed from live user activity data in database tables
-    ONLY computes from: users, transactions, listings tables
-    NO dashboard_metrics table is used or required
+    Get all dashboard metrics
+    Reads the incrementally maintained dashboard_counters table in one query;
+    falls back to computing from users, transactions, listings when the
+    counters are not installed
     """
     try:
         with get_db_cursor() as (cur, conn):
-            result = {}
-            
-            # 1. Active Community Members: all users with accounts (consumers + suppliers)
             try:
-                cur.execute("SELECT COUNT(*) AS count FROM users")
-                row = cur.fetchone()
-                count = int(row['count']) if row and row.get('count') is not None else 0
-                logger.info(f"✅ Active community members: {count}")
-                result['active_community_members'] = {
-                    'value': str(count)
-                }
-            except Exception as e:
-                logger.error(f"❌ Failed to compute active_community_members: {e}", exc_info=True)
-                result['active_community_members'] = {'value': '0'}
-            
-            # 2. Households Powered by Clean Energy: number of consumers who have bought energy
-            try:
-                cur.execute("""
-                    SELECT COUNT(DISTINCT buyer_id) AS count 
-                    FROM transactions 
-                    WHERE buyer_id IS NOT NULL
-                """)
-                row = cur.fetchone()
-                count = int(row['count']) if row and row.get('count') is not None else 0
-                logger.info(f"✅ Households powered: {count}")
-                result['households_powered'] = {
-                    'value': str(count)
-                }
-            except Exception as e:
-                logger.error(f"❌ Failed to compute households_powered: {e}", exc_info=True)
-                result['households_powered'] = {'value': '0'}
-            
-            # 3. Energy Bought: total amount of energy (kWh) bought by consumers
-            try:
-                cur.execute("""
-                    SELECT COALESCE(SUM(kwh_amount), 0) AS total 
-                    FROM transactions
-                """)
-                row = cur.fetchone()
-                total = float(row['total']) if row and row.get('total') is not None else 0.0
-                logger.info(f"✅ Energy bought: {total} kWh")
-                # Format with comma for display
-                formatted_value = f"{int(total):,} kWh"
-                result['energy_bought'] = {
-                    'value': formatted_value,
-                    'unit': 'kWh'
-                }
+                counters, last_updated = read_dashboard_counters(cur)
             except Exception as e:
-                logger.error(f"❌ Failed to compute energy_bought: {e}", exc_info=True)
-                result['energy_bought'] = {'value': '0 kWh', 'unit': 'kWh'}
+                conn.rollback()
+                logger.warning(f"⚠️ dashboard_counters unavailable, computing live metrics: {e}")
+                counters, last_updated = None, None
             
-            # 4. Energy Saved: all energy (kWh) listed by suppliers (bought or not)
-            try:
-                # Sum all energy from listings table (use available_kwh or quantity_kwh)
-                cur.execute("""
-                    SELECT COALESCE(
-                        SUM(COALESCE(available_kwh, quantity_kwh, 0)), 
-                        0
-                    ) AS total 
-                    FROM listings
-                """)
-                row = cur.fetchone()
-                total = float(row['total']) if row and row.get('total') is not None else 0.0
-                logger.info(f"✅ Energy saved (listed): {total} kWh")
-                # Format with comma for display
-                formatted_value = f"{int(total):,} kWh"
-                result['energy_saved'] = {
-                    'value': formatted_value,
-                    'unit': 'kWh'
-                }
-            except Exception as e:
-                logger.error(f"❌ Failed to compute energy_saved: {e}", exc_info=True)
-                # Try alternative table name if listings doesn't exist
-                try:
-                    cur.execute("""
-                        SELECT COALESCE(
-                            SUM(COALESCE(quantity_kwh, 0)), 
-                            0
-                        ) AS total 
-                        FROM energy_listings
-                    """)
-                    row = cur.fetchone()
-                    total = float(row['total']) if row and row.get('total') is not None else 0.0
-                    formatted_value = f"{int(total):,} kWh"
-                    result['energy_saved'] = {
-                        'value': formatted_value,
-                        'unit': 'kWh'
+            if counters is not None:
+                return jsonify({
+                    'status': 'success',
+                    'data': format_dashboard_metrics(
+                        counters[MEMBERS],
+                        counters[HOUSEHOLDS],
+                        counters[ENERGY_BOUGHT],
+                        counters[ENERGY_LISTED]
+                    ),
+                    'freshness': {
+                        'source': 'materialized',
+                        'lastUpdated': last_updated.isoformat()
                     }
-                    logger.info(f"✅ Energy saved (from energy_listings): {total} kWh")
-                except Exception as e2:
-                    logger.error(f"❌ Fallback query for energy_saved also failed: {e2}", exc_info=True)
-                    result['energy_saved'] = {'value': '0 kWh', 'unit': 'kWh'}
+                }), 200
             
-            # 5. CO2 Savings: calculated from Energy Bought (1 kWh renewable = ~0.5 kg CO2 saved)
-            try:
-                # Get energy_bought value from previous calculation
-                energy_bought_value = result.get('energy_bought', {}).get('value', '0 kWh')
-                # Extract numeric value
-                energy_kwh = float(energy_bought_value.replace(' kWh', '').replace(',', '')) if 'kWh' in energy_bought_value else 0.0
-                if energy_kwh == 0:
-                    # Recalculate if we don't have the value
-                    cur.execute("SELECT COALESCE(SUM(kwh_amount), 0) AS total FROM transactions")
-                    row = cur.fetchone()
-                    energy_kwh = float(row['total']) if row and row.get('total') is not None else 0.0
-                
-                co2_saved_kg = int(energy_kwh * 0.5)  # Approximate conversion
-                logger.info(f"✅ CO2 savings: {co2_saved_kg} kg from {energy_kwh} kWh")
-                result['co2_savings'] = {
-                    'value': f"{co2_saved_kg:,} kg"
-                }
-            except Exception as e:
-                logger.error(f"❌ Failed to compute co2_savings: {e}", exc_info=True)
-                result['co2_savings'] = {'value': '0 kg'}
-            
-            # 6. Environmental Impact (Trees): calculated from CO2 Savings (1 tree offsets ~21 kg CO2/year)
-            try:
-                co2_value = result.get('co2_savings', {}).get('value', '0 kg')
-                co2_kg_string = co2_value.replace(' kg', '').replace(',', '')
-                co2_kg = int(co2_kg_string) if co2_kg_string and co2_kg_string != '0' else 0
-                trees_equivalent = int(co2_kg / 21) if co2_kg > 0 else 0
-                logger.info(f"✅ Environmental impact: {trees_equivalent} trees")
-                result['environmental_impact_trees'] = {
-                    'value': f"≈ to Planting {trees_equivalent:,} trees!"
-                }
-            except Exception as e:
-                logger.error(f"❌ Failed to compute environmental_impact_trees: {e}", exc_info=True)
-                result['environmental_impact_trees'] = {'value': '≈ to Planting 0 trees!'}
+            # Single round trip: every figure from one statement
+            totals = compute_live_totals(cur)
+            result = format_dashboard_metrics(
+                totals[MEMBERS],
+                totals[HOUSEHOLDS],
+                totals[ENERGY_BOUGHT],
+                totals[ENERGY_LISTED]
+            )
             
             logger.info(f"✅ Dashboard metrics computed successfully: {list(result.keys())}")
             return jsonify({
                 'status': 'success',
-                'data': result
+                'data': result,
+                'freshness': {
+                    'source': 'live',
+                    'lastUpdated': None  # computed on this request
+                }
             }), 200
             
     except Exception as e:
@@ -178,6 +116,7 @@ def get_dashboard_metrics():
         }), 200
 
 @dashboard_bp.route('/predictions', methods=['GET'])
+@cached_response('dashboard')
 def get_performance_predictions():
     """
     Get performance predictions data for charts
@@ -245,6 +184,7 @@ def get_performance_predictions():
         }), 200
 
 @dashboard_bp.route('/stats', methods=['GET'])
+@cached_response('dashboard')
 def get_dashboard_stats():
     """
     Get additional dashboard statistics
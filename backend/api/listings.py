@@ -3,14 +3,27 @@ Energy Listings API Endpoints
 provides CRUD operations for energy listings
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database.config import get_db_cursor
+from cache import cached_response, invalidate
+from api.conditional import conditional_get
+from api.pagination import InvalidCursor, decode_cursor, paginate_rows, parse_page_size
+from api.streaming import EXPORT_FORMATS, export_response
+from api.serialization import LISTING, NEARBY_LISTING, SEARCH_LISTING
+from database.geo import HAVERSINE_SQL, bounding_boxes, covering_cell_ranges
+from database.search import SEARCH_CONFIG, enable_fuzzy_location
+from listing_index import listing_index
+from listing_images import image_pipeline, save_stripped_upload, InvalidImage, ImageUploadsUnavailable
+from database.listing_images import read_image_dimensions
 import logging
 import os
 import time
+import uuid
 import psycopg2
 import psycopg2.extras
+from decimal import Decimal
+from datetime import datetime
 from werkzeug.utils import secure_filename
 
 # Create blueprint for listings API
@@ -20,83 +33,536 @@ listings_bp = Blueprint('listings', __name__, url_prefix='/api/listings')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keyset sort expression; must match idx_listings_created_id / idx_listings_status_created_id
+LISTING_SORT_KEY = "COALESCE(created_at, '1970-01-01'::timestamp)"
+
+# sort param -> (sort expression, descending); price sorts use idx_listings_status_price_id
+LISTING_SORTS = {
+    'newest': (LISTING_SORT_KEY, True),
+    'price_asc': ('price_per_kwh', False),
+    'price_desc': ('price_per_kwh', True)
+}
+
+# Cached responses that depend on listing rows
+LISTING_CACHE_NAMESPACES = ('listings', 'dashboard', 'market')
+
+# Radius search bounds for /nearby (km)
+DEFAULT_NEARBY_RADIUS_KM = 25.0
+MAX_NEARBY_RADIUS_KM = 500.0
+
+# Longest accepted /search query string
+MAX_SEARCH_QUERY_LENGTH = 200
+
+def build_nearby_query(lat, lon, radius_km, energy_type=None, min_price=None, max_price=None, limit=None):
+    """
+    Active listings within radius_km of (lat, lon), nearest first
+    Grid cell ranges (idx_listings_active_geo_cell) and the bounding box prefilter
+    candidates; the exact haversine distance refines them
+    Returns: (query, params)
+    """
+    boxes = bounding_boxes(lat, lon, radius_km)
+    params = {'lat': lat, 'lon': lon, 'radius_km': radius_km}
+    
+    cell_conditions = []
+    for i, (low, high) in enumerate(covering_cell_ranges(boxes)):
+        cell_conditions.append(f"listing_geo_cell(latitude, longitude) BETWEEN %(cell_lo_{i})s AND %(cell_hi_{i})s")
+        params[f'cell_lo_{i}'] = low
+        params[f'cell_hi_{i}'] = high
+    
+    box_conditions = []
+    for i, (min_lat, max_lat, min_lon, max_lon) in enumerate(boxes):
+        box_conditions.append(
+            f"(latitude BETWEEN %(min_lat_{i})s AND %(max_lat_{i})s "
+            f"AND longitude BETWEEN %(min_lon_{i})s AND %(max_lon_{i})s)"
+        )
+        params.update({
+            f'min_lat_{i}': min_lat, f'max_lat_{i}': max_lat,
+            f'min_lon_{i}': min_lon, f'max_lon_{i}': max_lon
+        })
+    
+    conditions = [
+        "status = 'active'",
+        "latitude IS NOT NULL",
+        "longitude IS NOT NULL",
+        f"({' OR '.join(cell_conditions)})",
+        f"({' OR '.join(box_conditions)})"
+    ]
+    if energy_type:
+        conditions.append("energy_type = %(energy_type)s")
+        params['energy_type'] = energy_type
+    if min_price is not None:
+        conditions.append("price_per_kwh >= %(min_price)s")
+        params['min_price'] = min_price
+    if max_price is not None:
+        conditions.append("price_per_kwh <= %(max_price)s")
+        params['max_price'] = max_price
+    
+    query = f"""
+        SELECT * FROM (
+            SELECT 
+                id, title, energy_type, available_kwh, price_per_kwh, 
+                status, location, description, image_url,
+                latitude, longitude, created_at, updated_at,
+                {HAVERSINE_SQL} AS distance_km
+            FROM listings
+            WHERE {' AND '.join(conditions)}
+        ) candidates
+        WHERE distance_km <= %(radius_km)s
+        ORDER BY distance_km, id
+    """
+    if limit is not None:
+        query += " LIMIT %(limit)s"
+        params['limit'] = limit
+    return query, params
+
+def escape_like(value):
+    """Escape LIKE wildcards in user input"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def build_search_query(text=None, location=None, status=None, energy_type=None, sort='relevance',
+                       cursor_key=None, direction='next', limit=None, fuzzy_location=False):
+    """
+    Listings matching a full-text query and/or a location, best match
+    (sort='relevance') or newest (sort='newest') first
+    text uses web search syntax ("quoted phrase", or, -exclude) against
+    search_vector (idx_listings_search_vector); location matches as a substring,
+    or also by trigram similarity when fuzzy_location (idx_listings_location_trgm)
+    Relevance has to rank every match; newest can stop after one page, which
+    is cheaper for very common terms
+    Returns: (query, params)
+    """
+    params = {}
+    sources = ["listings"]
+    conditions = []
+    rank_terms = []
+    
+    if text:
+        sources.append(f"websearch_to_tsquery('{SEARCH_CONFIG}', %(text)s) AS search_query")
+        conditions.append("search_vector @@ search_query")
+        rank_terms.append("ts_rank_cd(search_vector, search_query)")
+        params['text'] = text
+    if location:
+        params['location_pattern'] = f"%{escape_like(location)}%"
+        if fuzzy_location:
+            conditions.append("(location ILIKE %(location_pattern)s OR location %% %(location)s)")
+            rank_terms.append("similarity(location, %(location)s)")
+            params['location'] = location
+        else:
+            conditions.append("location ILIKE %(location_pattern)s")
+    if status:
+        conditions.append("status = %(status)s")
+        params['status'] = status
+    if energy_type:
+        conditions.append("energy_type = %(energy_type)s")
+        params['energy_type'] = energy_type
+    
+    rank = f"({' + '.join(rank_terms)})::float8" if rank_terms else "0::float8"
+    sort_expression = 'rank' if sort == 'relevance' else LISTING_SORT_KEY
+    query = f"""
+        SELECT *, {sort_expression} AS sort_value FROM (
+            SELECT 
+                id, title, energy_type, available_kwh, price_per_kwh, 
+                status, location, description, image_url,
+                created_at, updated_at,
+                {rank} AS rank
+            FROM {', '.join(sources)}
+            WHERE {' AND '.join(conditions) or 'TRUE'}
+        ) matches
+    """
+    
+    # Descending for 'next' pages; 'prev' pages walk back up
+    if cursor_key:
+        comparison = '<' if direction == 'next' else '>'
+        query += f" WHERE ({sort_expression}, id) {comparison} (%(cursor_value)s, %(cursor_id)s)"
+        params['cursor_value'], params['cursor_id'] = cursor_key
+    order = 'DESC' if direction == 'next' else 'ASC'
+    query += f" ORDER BY {sort_expression} {order}, id {order}"
+    if limit is not None:
+        query += " LIMIT %(limit)s"
+        params['limit'] = limit
+    return query, params
+
+def parse_coordinates(data):
+    """
+    Optional latitude/longitude from a listing payload
+    Returns: (latitude, longitude), both None when omitted; raises ValueError if invalid
+    """
+    lat, lon = data.get('latitude'), data.get('longitude')
+    if lat in (None, '') and lon in (None, ''):
+        return None, None
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise ValueError('Latitude and longitude must both be numbers')
+    if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        raise ValueError('Latitude must be between -90 and 90 and longitude between -180 and 180')
+    return lat, lon
+
+def parse_float_arg(name, default=None, minimum=None, maximum=None):
+    """Float query parameter; raises ValueError with a client-facing message"""
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+    if value != value:
+        raise ValueError(f'{name} must be a number')
+    if minimum is not None and value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    if maximum is not None and value > maximum:
+        raise ValueError(f'{name} must be at most {maximum}')
+    return value
+
+def parse_price_arg(name):
+    """Price filter as a Decimal, compared exactly like the NUMERIC price column"""
+    if parse_float_arg(name, minimum=0) is None:
+        return None
+    return Decimal(request.args.get(name).strip())
+
+def parse_price_range():
+    """min_price and max_price filters; raises ValueError when the range is empty"""
+    min_price = parse_price_arg('min_price')
+    max_price = parse_price_arg('max_price')
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValueError('min_price must not exceed max_price')
+    return min_price, max_price
+
 @listings_bp.route('/', methods=['GET'])
+@conditional_get('listings')
+@cached_response('listings')
 def get_all_listings():
     """
-    Get all energy listings
-    Supports filtering by status and energy_type
+    Get energy listings one page at a time
+    Supports filtering by status, energy_type and price range (min_price, max_price)
+    Query params: sort (newest, price_asc, price_desc; default newest),
+    limit (page size, capped at MAX_PAGE_SIZE), cursor (opaque keyset token)
     """
     try:
         # Get query parameters
         status = request.args.get('status')
         energy_type = request.args.get('energy_type')
-        limit = request.args.get('limit', type=int)
+        sort = request.args.get('sort', 'newest')
+        page_size = parse_page_size(request.args.get('limit'))
+        cursor = request.args.get('cursor')
         
-        # Build query
-        query = """
+        if sort not in LISTING_SORTS:
+            return jsonify({
+                'status': 'error',
+                'message': f"sort must be one of: {', '.join(LISTING_SORTS)}"
+            }), 400
+        sort_expression, descending = LISTING_SORTS[sort]
+        
+        try:
+            min_price, max_price = parse_price_range()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        direction = 'next'
+        cursor_key = None
+        if cursor:
+            try:
+                cursor_value, cursor_id, direction = decode_cursor(cursor)
+                # A newest cursor holds a timestamp, a price cursor a number
+                if isinstance(cursor_value, datetime) != (sort == 'newest'):
+                    raise InvalidCursor('Cursor does not match the requested sort')
+                if isinstance(cursor_value, float):
+                    # Issued before price cursors carried exact decimals
+                    cursor_value = Decimal(repr(cursor_value))
+                cursor_key = (cursor_value, cursor_id)
+            except InvalidCursor:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Invalid pagination cursor'
+                }), 400
+        
+        # Fetch one extra row to know whether another page exists
+        if listing_index is not None:
+            listing_index.ensure_fresh(getattr(g, 'resource_versions', {}).get('listings'))
+            rows = listing_index.query(
+                status=status, energy_type=energy_type,
+                min_price=min_price, max_price=max_price,
+                sort=sort, cursor_key=cursor_key, direction=direction,
+                limit=page_size + 1
+            )
+        else:
+            # Build query; sort_value matches the expressions in idx_listings_*_id
+            query = f"""
+                SELECT 
+                    id, title, energy_type, available_kwh, price_per_kwh, 
+                    status, location, description, image_url,
+                    created_at, updated_at,
+                    {sort_expression} AS sort_value
+                FROM listings
+            """
+            
+            conditions = []
+            params = []
+            
+            if status:
+                conditions.append("status = %s")
+                params.append(status)
+            
+            if energy_type:
+                conditions.append("energy_type = %s")
+                params.append(energy_type)
+            
+            if min_price is not None:
+                conditions.append("price_per_kwh >= %s")
+                params.append(min_price)
+            
+            if max_price is not None:
+                conditions.append("price_per_kwh <= %s")
+                params.append(max_price)
+            
+            # Walk the sort order forwards for 'next' pages, backwards for 'prev' pages
+            walk_descending = descending != (direction == 'prev')
+            if cursor_key:
+                comparison = '<' if walk_descending else '>'
+                conditions.append(f"({sort_expression}, id) {comparison} (%s, %s)")
+                params.extend(cursor_key)
+            
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            
+            order = 'DESC' if walk_descending else 'ASC'
+            query += f" ORDER BY {sort_expression} {order}, id {order} LIMIT %s"
+            params.append(page_size + 1)
+            
+            with get_db_cursor() as (cur, conn):
+                cur.execute(query, params)
+                rows = cur.fetchall()
+        
+        listings, pagination = paginate_rows(
+            rows, page_size, direction, cursor_key is not None,
+            key=lambda row: (row['sort_value'], row['id'])
+        )
+        
+        # Convert to list of dictionaries
+        result = LISTING.many(listings)
+        
+        return jsonify({
+            'status': 'success',
+            'data': result,
+            'count': len(result),
+            'pagination': pagination
+        }), 200
+            
+    except Exception as e:
+        logger.error(f"Error getting listings: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to retrieve listings',
+            'error': str(e)
+        }), 500
+
+@listings_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_listings():
+    """
+    Stream every matching listing, newest first, without paging (signed-in users only)
+    Query params: format (json, ndjson or csv; default json), status,
+    energy_type, min_price, max_price
+    """
+    try:
+        fmt = request.args.get('format', 'json')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({
+                'status': 'error',
+                'message': f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+            }), 400
+        try:
+            min_price, max_price = parse_price_range()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        conditions = []
+        params = []
+        for column, value in (('status', request.args.get('status')),
+                              ('energy_type', request.args.get('energy_type'))):
+            if value:
+                conditions.append(f"{column} = %s")
+                params.append(value)
+        if min_price is not None:
+            conditions.append("price_per_kwh >= %s")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price_per_kwh <= %s")
+            params.append(max_price)
+        
+        query = f"""
             SELECT 
                 id, title, energy_type, available_kwh, price_per_kwh, 
                 status, location, description, image_url,
                 created_at, updated_at
             FROM listings
+            WHERE {' AND '.join(conditions) or 'TRUE'}
+            ORDER BY {LISTING_SORT_KEY} DESC, id DESC
         """
+        return export_response(query, params, LISTING, fmt, 'eco-hub-listings')
+    
+    except Exception as e:
+        logger.error(f"Error exporting listings: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to export listings',
+            'error': str(e)
+        }), 500
+
+@listings_bp.route('/nearby', methods=['GET'])
+@conditional_get('listings')
+@cached_response('listings')
+def get_nearby_listings():
+    """
+    Get active listings within a radius, nearest first
+    Query params: lat, lng (required), radius_km (default 25, max 500),
+    energy_type, min_price, max_price, limit (capped at MAX_PAGE_SIZE)
+    """
+    try:
+        try:
+            lat = parse_float_arg('lat', minimum=-90, maximum=90)
+            lon = parse_float_arg('lng' if 'lng' in request.args else 'lon', minimum=-180, maximum=180)
+            radius_km = parse_float_arg('radius_km', DEFAULT_NEARBY_RADIUS_KM, minimum=0, maximum=MAX_NEARBY_RADIUS_KM)
+            min_price, max_price = parse_price_range()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        conditions = []
-        params = []
+        if lat is None or lon is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'lat and lng are required'
+            }), 400
+        
+        query, params = build_nearby_query(
+            lat, lon, radius_km,
+            energy_type=request.args.get('energy_type'),
+            min_price=min_price,
+            max_price=max_price,
+            limit=parse_page_size(request.args.get('limit'))
+        )
+        
+        with get_db_cursor() as (cur, conn):
+            cur.execute(query, params)
+            listings = cur.fetchall()
         
-        if status:
-            conditions.append("status = %s")
-            params.append(status)
+        result = NEARBY_LISTING.many(listings)
         
-        if energy_type:
-            conditions.append("energy_type = %s")
-            params.append(energy_type)
+        return jsonify({
+            'status': 'success',
+            'data': result,
+            'count': len(result),
+            'query': {
+                'lat': lat,
+                'lng': lon,
+                'radiusKm': radius_km
+            }
+        }), 200
         
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+    except Exception as e:
+        logger.error(f"Error getting nearby listings: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to retrieve nearby listings',
+            'error': str(e)
+        }), 500
+
+@listings_bp.route('/search', methods=['GET'])
+@conditional_get('listings')
+@cached_response('listings')
+def search_listings():
+    """
+    Full-text search over listing titles, locations and descriptions, best match first
+    Query params: q (web search syntax), location (fuzzy match), status, energy_type,
+    sort (relevance or newest; default relevance),
+    limit (page size, capped at MAX_PAGE_SIZE), cursor (opaque keyset token)
+    """
+    try:
+        text = (request.args.get('q') or '').strip()
+        location = (request.args.get('location') or '').strip()
+        sort = request.args.get('sort', 'relevance')
+        page_size = parse_page_size(request.args.get('limit'))
+        cursor = request.args.get('cursor')
         
-        query += " ORDER BY COALESCE(created_at, '1970-01-01'::timestamp) DESC, id DESC"
+        if not text and not location:
+            return jsonify({
+                'status': 'error',
+                'message': 'q or location is required'
+            }), 400
+        if len(text) > MAX_SEARCH_QUERY_LENGTH or len(location) > MAX_SEARCH_QUERY_LENGTH:
+            return jsonify({
+                'status': 'error',
+                'message': f'Search terms must be at most {MAX_SEARCH_QUERY_LENGTH} characters'
+            }), 400
+        if sort not in ('relevance', 'newest'):
+            return jsonify({
+                'status': 'error',
+                'message': 'sort must be one of: relevance, newest'
+            }), 400
         
-        if limit:
-            query += " LIMIT %s"
-            params.append(limit)
+        direction = 'next'
+        cursor_key = None
+        if cursor:
+            try:
+                cursor_value, cursor_id, direction = decode_cursor(cursor)
+                # A relevance cursor holds a rank, a newest cursor a timestamp
+                if isinstance(cursor_value, datetime) != (sort == 'newest'):
+                    raise InvalidCursor('Cursor does not match the requested sort')
+                cursor_key = (cursor_value, cursor_id)
+            except InvalidCursor:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Invalid pagination cursor'
+                }), 400
         
         with get_db_cursor() as (cur, conn):
+            query, params = build_search_query(
+                text=text, location=location,
+                status=request.args.get('status'),
+                energy_type=request.args.get('energy_type'),
+                sort=sort, cursor_key=cursor_key, direction=direction,
+                limit=page_size + 1,
+                fuzzy_location=bool(location) and enable_fuzzy_location(cur)
+            )
             cur.execute(query, params)
-            listings = cur.fetchall()
-            
-            # Convert to list of dictionaries
-            result = []
-            for listing in listings:
-                result.append({
-                    'id': listing['id'],
-                    'title': listing['title'],
-                    'energyType': listing['energy_type'],
-                    'quantity': listing['available_kwh'],
-                    'price': str(listing['price_per_kwh']),
-                    'status': listing['status'],
-                    'location': listing['location'],
-                    'description': listing['description'],
-                    'imageUrl': listing.get('image_url'),  # Add image URL
-                    'createdAt': listing['created_at'].isoformat() if listing['created_at'] else None,
-                    'updatedAt': listing['updated_at'].isoformat() if listing['updated_at'] else None
-                })
-            
-            return jsonify({
-                'status': 'success',
-                'data': result,
-                'count': len(result)
-            }), 200
-            
+            listings, pagination = paginate_rows(
+                cur.fetchall(), page_size, direction, cursor_key is not None,
+                key=lambda row: (row['sort_value'], row['id'])
+            )
+        
+        result = SEARCH_LISTING.many(listings)
+        
+        return jsonify({
+            'status': 'success',
+            'data': result,
+            'count': len(result),
+            'pagination': pagination,
+            'query': {
+                'q': text or None,
+                'location': location or None
+            }
+        }), 200
+        
     except Exception as e:
-        logger.error(f"Error getting listings: {str(e)}")
+        logger.error(f"Error searching listings: {str(e)}")
         return jsonify({
             'status': 'error',
-            'message': 'Failed to retrieve listings',
+            'message': 'Failed to search listings',
             'error': str(e)
         }), 500
 
 @listings_bp.route('/<int:listing_id>', methods=['GET'])
+@conditional_get('listings')
+@cached_response('listings')
 def get_listing_by_id(listing_id):
     """
     Get a specific energy listing by ID
@@ -120,19 +586,10 @@ def get_listing_by_id(listing_id):
                     'message': 'Listing not found'
                 }), 404
             
-            result = {
-                'id': listing['id'],
-                'title': listing['title'],
-                'energyType': listing['energy_type'],
-                'quantity': listing['available_kwh'],
-                'price': str(listing['price_per_kwh']),
-                'status': listing['status'],
-                'location': listing['location'],
-                'description': listing['description'],
-                'imageUrl': listing.get('image_url'),  # Add image URL
-                'createdAt': listing['created_at'].isoformat() if listing['created_at'] else None,
-                'updatedAt': listing['updated_at'].isoformat() if listing['updated_at'] else None
-            }
+            result = LISTING(listing)
+            dimensions = read_image_dimensions(cur, listing_id)
+            if dimensions:
+                result['imageWidth'], result['imageHeight'] = dimensions
             
             return jsonify({
                 'status': 'success',
@@ -174,6 +631,8 @@ def create_listing():
             data['location'] = request.form.get('location')
             data['status'] = request.form.get('status', 'active')
             data['description'] = request.form.get('description', '')
+            data['latitude'] = request.form.get('latitude')
+            data['longitude'] = request.form.get('longitude')
             
             # Handle image file upload
             image_file = request.files.get('image')
@@ -185,12 +644,26 @@ def create_listing():
                 os.makedirs(upload_folder, exist_ok=True)  # Create directory if it doesn't exist
                 
                 filename = secure_filename(image_file.filename)
-                # Add timestamp to make filename unique
+                # Add timestamp and a random suffix to make filename unique (variants are cached for a year)
                 timestamp = int(time.time())
-                unique_filename = f"{timestamp}_{filename}"
+                unique_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{filename}"
                 file_path = os.path.join(upload_folder, unique_filename)
                 
-                image_file.save(file_path)
+                # Stripped of EXIF/GPS before the file is reachable; resizing happens after the response
+                try:
+                    save_stripped_upload(image_file.stream, file_path)
+                except InvalidImage as e:
+                    logger.info(f"Rejected image upload {filename}: {e}")
+                    return jsonify({
+                        'status': 'error',
+                        'message': 'Image must be a JPEG, PNG or WebP file'
+                    }), 400
+                except ImageUploadsUnavailable:
+                    logger.error("Image upload refused: Pillow is not installed")
+                    return jsonify({
+                        'status': 'error',
+                        'message': 'Image uploads are temporarily unavailable'
+                    }), 503
                 # Store only the relative path, not full path or base64
                 image_url = f"/uploads/listings/{unique_filename}"
                 logger.info(f"Image file saved: {unique_filename}, size: {os.path.getsize(file_path)} bytes, path: {image_url}")
@@ -249,11 +722,20 @@ def create_listing():
                 'message': 'Quantity must be an integer and price must be a number'
             }), 400
         
+        # Optional coordinates enable radius search (/nearby)
+        try:
+            latitude, longitude = parse_coordinates(data)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
         with get_db_cursor() as (cur, conn):
             cur.execute("""
                 INSERT INTO listings
-                (user_id, title, energy_type, available_kwh, price_per_kwh, location, description, image_url, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                (user_id, title, energy_type, available_kwh, price_per_kwh, location, description, image_url, status, latitude, longitude)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id, created_at, updated_at
             """, (
                 user_id,
@@ -264,11 +746,19 @@ def create_listing():
                 data['location'],
                 data.get('description', ''),
                 image_url,  # Use image_url from FormData or JSON
-                data.get('status', 'active')
+                data.get('status', 'active'),
+                latitude,
+                longitude
             ))
             
             result = cur.fetchone()
             conn.commit()
+            invalidate(*LISTING_CACHE_NAMESPACES)
+            if listing_index is not None:
+                listing_index.refresh(cur, [result['id']])
+            if is_form_data and image_url:
+                # Resized variants are generated after the response; their URLs serve the stripped original until then
+                image_pipeline.submit(result['id'], image_url)
             
             # Debug: Log saved image status
             if image_url:
@@ -333,11 +823,27 @@ def update_listing(listing_id):
             'status': 'status',
             'location': 'location',
             'description': 'description',
-            'imageUrl': 'image_url'  # Add image URL support
+            'imageUrl': 'image_url',  # Add image URL support
+            'latitude': 'latitude',
+            'longitude': 'longitude'
         }
         
+        # Coordinates are stored as parsed, so '' clears them and padded numbers are accepted
+        coordinates = {}
+        if 'latitude' in data or 'longitude' in data:
+            try:
+                coordinates['latitude'], coordinates['longitude'] = parse_coordinates(data)
+            except ValueError as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': str(e)
+                }), 400
+        
         for frontend_field, db_field in field_mapping.items():
-            if frontend_field in data:
+            if frontend_field in coordinates:
+                update_fields.append(f"{db_field} = %s")
+                params.append(coordinates[frontend_field])
+            elif frontend_field in data:
                 update_fields.append(f"{db_field} = %s")
                 params.append(data[frontend_field])
         
@@ -399,6 +905,9 @@ def update_listing(listing_id):
             cur.execute(query, params)
             result = cur.fetchone()
             conn.commit()
+            invalidate(*LISTING_CACHE_NAMESPACES)
+            if listing_index is not None:
+                listing_index.refresh(cur, [listing_id])
             
             return jsonify({
                 'status': 'success',
@@ -434,6 +943,9 @@ def delete_listing(listing_id):
             # Delete the listing
             cur.execute("DELETE FROM listings WHERE id = %s", (listing_id,))
             conn.commit()
+            invalidate(*LISTING_CACHE_NAMESPACES)
+            if listing_index is not None:
+                listing_index.remove(listing_id)
             
             return jsonify({
                 'status': 'success',
@@ -0,0 +1,108 @@
+"""
+Keyset Pagination Helpers
+Opaque cursor tokens encoding a (sort value, id) key and a direction;
+the sort value is a timestamp (newest first), a Decimal (price sorts, kept
+exact so the cursor compares like the NUMERIC column) or a float (ranks)
+"""
+
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor token we cannot decode"""
+
+def encode_cursor(sort_value, row_id, direction='next'):
+    """Encode a (sort value, id) keyset position into an opaque url-safe token"""
+    payload = {
+        'id': row_id,
+        'd': direction
+    }
+    if sort_value is None or isinstance(sort_value, datetime):
+        payload['ts'] = sort_value.isoformat() if sort_value else None
+    elif isinstance(sort_value, Decimal):
+        payload['dv'] = str(sort_value)
+    else:
+        payload['v'] = float(sort_value)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """
+    Decode a cursor token
+    Returns: (sort_value, row_id, direction); sort_value is a datetime, a Decimal or a float
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if 'dv' in payload:
+            sort_value = Decimal(payload['dv'])
+            if not sort_value.is_finite():
+                raise ValueError(payload['dv'])
+        elif 'v' in payload:
+            sort_value = float(payload['v'])
+        else:
+            sort_value = datetime.fromisoformat(payload['ts'])
+        row_id = int(payload['id'])
+        direction = payload.get('d', 'next')
+    except (ValueError, TypeError, KeyError, AttributeError, InvalidOperation) as e:
+        raise InvalidCursor(f'Invalid cursor: {token}') from e
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor(f'Invalid cursor direction: {direction}')
+    return sort_value, row_id, direction
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a requested page size to [1, maximum]"""
+    if value is None:
+        return default
+    try:
+        size = int(value)
+    except (ValueError, TypeError):
+        return default
+    return max(1, min(size, maximum))
+
+def paginate_rows(rows, page_size, direction, had_cursor, key):
+    """
+    Trim a page fetched with LIMIT page_size + 1 and build the navigation tokens
+
+    Rows fetched for a 'prev' page come back in the opposite order and are
+    reversed here so every page is returned in the requested sort order.
+
+    Args:
+        rows: fetched rows (page_size + 1 at most)
+        page_size: requested page size
+        direction: 'next' or 'prev'
+        had_cursor: whether the request carried a cursor
+        key: callable returning (sort value, id) for a row
+
+    Returns:
+        (page_rows, pagination_dict)
+    """
+    has_more = len(rows) > page_size
+    page = list(rows[:page_size])
+    if direction == 'prev':
+        page.reverse()
+        has_next = had_cursor
+        has_prev = has_more
+    else:
+        has_next = has_more
+        has_prev = had_cursor
+
+    next_cursor = None
+    prev_cursor = None
+    if page:
+        if has_next:
+            next_cursor = encode_cursor(*key(page[-1]), direction='next')
+        if has_prev:
+            prev_cursor = encode_cursor(*key(page[0]), direction='prev')
+
+    return page, {
+        'pageSize': page_size,
+        'hasMore': has_next,
+        'nextCursor': next_cursor,
+        'prevCursor': prev_cursor
+    }
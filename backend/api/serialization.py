@@ -0,0 +1,195 @@
+"""
+Response Serialization
+Row serializers compiled once per response shape, plus the JSON encoder every
+response goes through.
+
+Each RowSerializer turns a database row (dict) into its API dict with one
+generated function: no per-row loop over a field list, no repeated
+conditional .isoformat() calls in every handler. The encoder is pluggable
+(JSON_ENCODER=auto|orjson|json); with orjson, timestamps are left as
+datetimes and encoded natively, which skips a Python call per timestamp.
+FastJSONProvider routes Flask's jsonify through the same encoder, so it must
+be installed on the app (app.py does) for native timestamps to render as ISO
+8601 strings.
+"""
+
+import os
+import json
+import logging
+from decimal import Decimal
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+from listing_images import variant_url
+
+# orjson is optional; it encodes several times faster than json and handles datetimes itself
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def _encode_default(value):
+    """Types the encoders leave to us, encoded the way jsonify always did (ISO dates)"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def _orjson_encode(value):
+    return orjson.dumps(value, default=_encode_default)
+
+_json_encoder = json.JSONEncoder(default=_encode_default, separators=(',', ':'), ensure_ascii=False)
+
+def _json_encode(value):
+    return _json_encoder.encode(value).encode('utf-8')
+
+def _select_encoder():
+    """(name, encode) for JSON_ENCODER; auto picks orjson when it is installed"""
+    wanted = os.getenv('JSON_ENCODER', 'auto').lower()
+    if wanted == 'orjson' and orjson is None:
+        logger.warning("JSON_ENCODER=orjson but orjson is not installed; using json")
+    if wanted in ('auto', 'orjson') and orjson is not None:
+        return 'orjson', _orjson_encode
+    return 'json', _json_encode
+
+ENCODER_NAME, encode = _select_encoder()
+
+# Whether encode() writes datetimes itself, so serializers can pass them through
+NATIVE_DATETIMES = ENCODER_NAME == 'orjson'
+
+def dumps(value):
+    """Compact JSON text"""
+    return encode(value).decode('utf-8')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by encode(); install with app.json = FastJSONProvider(app)"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(encode(obj), mimetype=self.mimetype)
+
+# Field conversions: expression templates over the row value {v}
+CONVERSIONS = {
+    None: '{v}',
+    'str': 'str({v})',
+    'float': 'float({v})',
+    'round2': 'round(float({v}), 2)',
+    'round4': 'round({v}, 4)',
+    # NUMERIC columns come back as Decimal, which jsonify always rendered as a string
+    'decimal': '(str({tmp}) if ({tmp} := {v}).__class__ is _Decimal else {tmp})',
+    'timestamp': '({tmp}.isoformat() if ({tmp} := {v}) is not None else None)'
+}
+
+def _compile(name, fields, native_datetimes):
+    """Generate fn(row) -> dict for a list of (key, column, conversion)"""
+    namespace = {'_Decimal': Decimal}
+    entries = []
+    for i, (key, column, conversion) in enumerate(fields):
+        if callable(conversion):
+            namespace[f'_f{i}'] = conversion
+            expression = f'_f{i}(r)'
+        else:
+            if conversion == 'timestamp' and native_datetimes:
+                conversion = None
+            expression = CONVERSIONS[conversion].format(v=f'r[{column!r}]', tmp=f'_t{i}')
+        entries.append(f'        {key!r}: {expression},')
+    source = f"def serialize_{name}(r):\n    return {{\n" + '\n'.join(entries) + "\n    }\n"
+    exec(compile(source, f'<serializer {name}>', 'exec'), namespace)
+    return namespace[f'serialize_{name}']
+
+class RowSerializer:
+    """
+    Row -> API dict for one response shape
+    fields: [(json key, row column, conversion)]; conversion is a CONVERSIONS
+    key or a callable taking the whole row (column is then ignored)
+    Calling the serializer gives the dict for encode()/jsonify; .text gives
+    the same dict with every timestamp as an ISO string (CSV exports)
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = list(fields)
+        self.keys = [key for key, _, _ in self.fields]
+        self.text = _compile(name, self.fields, native_datetimes=False)
+        self._json = _compile(name, self.fields, NATIVE_DATETIMES) if NATIVE_DATETIMES else self.text
+
+    def __call__(self, row):
+        return self._json(row)
+
+    def many(self, rows):
+        serialize = self._json
+        return [serialize(row) for row in rows]
+
+    def extend(self, name, fields):
+        """A serializer with extra fields after these ones"""
+        return RowSerializer(name, self.fields + list(fields))
+
+def _user_name(r):
+    return r['name'] or f"{r['first_name'] or ''} {r['last_name'] or ''}".strip()
+
+LISTING = RowSerializer('listing', [
+    ('id', 'id', None),
+    ('title', 'title', None),
+    ('energyType', 'energy_type', None),
+    ('quantity', 'available_kwh', 'decimal'),
+    ('price', 'price_per_kwh', 'str'),
+    ('status', 'status', None),
+    ('location', 'location', None),
+    ('description', 'description', None),
+    ('imageUrl', 'image_url', None),
+    # Resized WebP variants of uploaded images (None for external and inline images)
+    ('thumbnailUrl', 'image_url', lambda r: variant_url(r['image_url'], 'thumb')),
+    ('mediumImageUrl', 'image_url', lambda r: variant_url(r['image_url'], 'medium')),
+    ('createdAt', 'created_at', 'timestamp'),
+    ('updatedAt', 'updated_at', 'timestamp'),
+])
+
+NEARBY_LISTING = LISTING.extend('nearby_listing', [
+    ('latitude', 'latitude', None),
+    ('longitude', 'longitude', None),
+    ('distanceKm', 'distance_km', 'round2'),
+])
+
+SEARCH_LISTING = LISTING.extend('search_listing', [
+    ('rank', 'rank', 'round4'),
+])
+
+TRANSACTION = RowSerializer('transaction', [
+    ('id', 'id', None),
+    ('date', 'created_at', 'timestamp'),
+    ('location', 'location', None),
+    ('energyType', 'energy_type', None),
+    ('kwh', 'kwh_amount', 'float'),
+    ('totalPrice', 'total_price', 'float'),
+])
+
+SALE = RowSerializer('sale', [
+    ('id', 'id', None),
+    ('date', 'created_at', 'timestamp'),
+    ('listingId', 'listing_id', None),
+    ('listingTitle', 'title', None),
+    ('location', 'location', None),
+    ('energyType', 'energy_type', None),
+    ('kwh', 'kwh_amount', 'float'),
+    ('totalPrice', 'total_price', 'float'),
+])
+
+# Same keys as User.to_dict()
+USER = RowSerializer('user', [
+    ('id', 'id', None),
+    ('first_name', 'first_name', None),
+    ('last_name', 'last_name', None),
+    ('name', 'name', _user_name),
+    ('email', 'email', None),
+    ('role', 'role', None),
+    ('location', 'location', None),
+    ('latitude', 'latitude', None),
+    ('longitude', 'longitude', None),
+    ('created_at', 'created_at', 'timestamp'),
+    ('updated_at', 'updated_at', 'timestamp'),
+])
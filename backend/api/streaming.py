@@ -0,0 +1,129 @@
+"""
+Streaming Export Helpers
+Full-history exports and unbounded list responses read rows through a
+server-side (named) cursor a chunk at a time and write CSV, NDJSON or a JSON
+array as they go, so memory stays flat no matter how many rows the query returns. The export
+transaction runs with a statement timeout and an idle-in-transaction timeout,
+so a slow query or a stalled reader cannot hold a pooled connection open
+indefinitely; either ends the response early (a truncated body)
+"""
+
+import io
+import os
+import csv
+import psycopg2.extras
+from flask import Response, stream_with_context
+from database.config import get_db_connection
+from api.serialization import encode
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Milliseconds one fetch may run, and the export transaction may wait for the client between fetches
+EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv('EXPORT_STATEMENT_TIMEOUT_MS', '30000'))
+EXPORT_IDLE_TIMEOUT_MS = int(os.getenv('EXPORT_IDLE_TIMEOUT_MS', '60000'))
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json'
+}
+
+def prefetch(chunks):
+    """
+    Pull the first chunk now, so a failing query raises inside the view
+    (and becomes a normal error response) instead of truncating a 200 body
+    """
+    first = next(chunks, None)
+    def resumed():
+        if first is not None:
+            yield first
+        yield from chunks
+    return resumed()
+
+def stream_query(query, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of up to chunk_size dict rows from a named cursor
+    The pooled connection is held until the generator finishes or is closed,
+    or until one of the export timeouts ends the transaction
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as settings:
+            settings.execute(
+                "SELECT set_config('statement_timeout', %s, true), "
+                "set_config('idle_in_transaction_session_timeout', %s, true)",
+                (str(EXPORT_STATEMENT_TIMEOUT_MS), str(EXPORT_IDLE_TIMEOUT_MS))
+            )
+        with conn.cursor(name='export_rows', cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = chunk_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        conn.rollback()
+
+def ndjson_chunks(chunks, serialize):
+    """One JSON document per line, one output chunk per fetched chunk"""
+    for rows in chunks:
+        yield b''.join(encode(serialize(row)) + b'\n' for row in rows)
+
+def json_chunks(chunks, serialize, key='data', envelope=None):
+    """
+    One JSON object whose `key` array is written a fetched chunk at a time,
+    after the envelope fields and followed by "count"
+    A database error mid-stream truncates the body, so clients see invalid
+    JSON rather than a silently short list
+    """
+    head = encode(envelope)[1:-1] + b',' if envelope else b''
+    yield b'{' + head + encode(key) + b':['
+    count = 0
+    for rows in chunks:
+        body = b','.join(encode(serialize(row)) for row in rows)
+        yield b',' + body if count else body
+        count += len(rows)
+    yield b'],"count":' + str(count).encode('ascii') + b'}'
+
+def csv_chunks(chunks, serialize, fields):
+    """Header row, then rows; fields are serialized dict keys in column order"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows(serialize(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(query, params, serializer, fmt, filename):
+    """
+    Streaming attachment response of query's rows as CSV, NDJSON or a JSON array
+    serializer: an api.serialization.RowSerializer (its keys are the CSV columns)
+    """
+    chunks = prefetch(stream_query(query, params))
+    if fmt == 'csv':
+        body = csv_chunks(chunks, serializer.text, serializer.keys)
+    elif fmt == 'json':
+        body = json_chunks(chunks, serializer, envelope={'status': 'success'})
+    else:
+        body = ndjson_chunks(chunks, serializer)
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}.{fmt}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def json_stream_response(query, params, serialize, key='data', envelope=None):
+    """Inline (non-attachment) streamed JSON response of query's rows"""
+    body = json_chunks(prefetch(stream_query(query, params)), serialize, key, envelope)
+    return Response(
+        stream_with_context(body),
+        mimetype='application/json',
+        headers={'X-Accel-Buffering': 'no'}
+    )
@@ -6,21 +6,308 @@ Records consumer purchases and exposes buyer history and totals
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from database.config import get_db_cursor
+from cache import invalidate
+from purchases import (
+    PurchaseError, InsufficientQuantity, BatchRejected, MAX_BATCH_IDEMPOTENCY_KEY_LENGTH,
+    parse_quantity, parse_idempotency_key, parse_batch_lines, purchase, purchase_batch
+)
+from api.listings import LISTING_CACHE_NAMESPACES
+from api.pagination import InvalidCursor, decode_cursor, paginate_rows, parse_page_size
+from api.streaming import EXPORT_FORMATS, export_response
+from api.serialization import TRANSACTION, SALE
+from database.rollups import (
+    BUYER, SELLER, read_user_totals, compute_user_totals, read_user_daily, compute_user_daily
+)
+from listing_index import listing_index
 import logging
-from datetime import datetime
+import psycopg2
+from datetime import datetime, timedelta, timezone
 
 transactions_bp = Blueprint('transactions', __name__, url_prefix='/api/transactions')
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# History sort key; matches the idx_transactions_*_created_id index expressions in migrate.py
+HISTORY_SORT_KEY = "COALESCE(t.created_at, '1970-01-01'::timestamp)"
+
+# Daily summary window: default and maximum number of days
+DEFAULT_SUMMARY_DAYS = 30
+MAX_SUMMARY_DAYS = 366
+
+
+# Purchase history is read by buyer, sales history by seller
+HISTORY_VIEWS = {
+    'purchases': {
+        'party_column': 't.buyer_id',
+        'columns': "t.id, t.kwh_amount, t.total_price, t.created_at, l.location, l.energy_type",
+        'serializer': TRANSACTION,
+        'label': 'transactions',
+        'rollup_role': BUYER,
+        'amount_field': 'totalExpenditure'
+    },
+    'sales': {
+        'party_column': 't.seller_id',
+        'columns': ("t.id, t.kwh_amount, t.total_price, t.created_at, "
+                    "l.location, l.energy_type, l.title, l.id AS listing_id"),
+        'serializer': SALE,
+        'label': 'sales',
+        'rollup_role': SELLER,
+        'amount_field': 'totalRevenue'
+    }
+}
+
+
+def parse_history_window():
+    """
+    (start, end) datetimes from the from/to query params, end exclusive
+    Raises ValueError with a client-facing message
+    """
+    window = []
+    for name in ('from', 'to'):
+        raw = request.args.get(name)
+        if not raw:
+            window.append(None)
+            continue
+        try:
+            value = datetime.fromisoformat(raw)
+        except ValueError:
+            raise ValueError(f'{name} must be an ISO date or datetime')
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if name == 'to' and len(raw) == 10:
+            # A bare date includes the whole day
+            value += timedelta(days=1)
+        window.append(value)
+    start, end = window
+    if start and end and start >= end:
+        raise ValueError('from must be before to')
+    return start, end
+
+
+def build_history_query(view, user_id, start=None, end=None, cursor_key=None, direction='next', limit=None):
+    """
+    Newest-first history for one buyer or seller, keyset paged on (created_at, id)
+    Returns: (query, params); rows carry sort_value for the page cursors
+    """
+    spec = HISTORY_VIEWS[view]
+    conditions = [f"{spec['party_column']} = %s"]
+    params = [user_id]
+    if start:
+        conditions.append(f"{HISTORY_SORT_KEY} >= %s")
+        params.append(start)
+    if end:
+        conditions.append(f"{HISTORY_SORT_KEY} < %s")
+        params.append(end)
+
+    # Walk backwards through time for 'next' pages, forwards for 'prev' pages
+    walk_descending = direction != 'prev'
+    if cursor_key:
+        comparison = '<' if walk_descending else '>'
+        conditions.append(f"({HISTORY_SORT_KEY}, t.id) {comparison} (%s, %s)")
+        params.extend(cursor_key)
+
+    order = 'DESC' if walk_descending else 'ASC'
+    query = f"""
+        SELECT {spec['columns']}, {HISTORY_SORT_KEY} AS sort_value
+        FROM transactions t
+        JOIN listings l ON l.id = t.listing_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {HISTORY_SORT_KEY} {order}, t.id {order}
+    """
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+def history_page(view):
+    """One keyset page of the caller's purchase or sales history"""
+    label = HISTORY_VIEWS[view]['label']
+    try:
+        user_id_str = get_jwt_identity()
+        # Convert string ID to integer for database queries
+        user_id = int(user_id_str) if user_id_str else None
+        page_size = parse_page_size(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+
+        try:
+            start, end = parse_history_window()
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        direction = 'next'
+        cursor_key = None
+        if cursor:
+            try:
+                cursor_value, cursor_id, direction = decode_cursor(cursor)
+                if not isinstance(cursor_value, datetime):
+                    raise InvalidCursor('History cursors hold a timestamp')
+                cursor_key = (cursor_value, cursor_id)
+            except InvalidCursor:
+                return jsonify({'status': 'error', 'message': 'Invalid pagination cursor'}), 400
+
+        # Fetch one extra row to know whether another page exists
+        query, params = build_history_query(
+            view, user_id, start, end, cursor_key, direction, limit=page_size + 1
+        )
+        with get_db_cursor() as (cur, conn):
+            cur.execute(query, params)
+            rows = cur.fetchall()
+
+        page, pagination = paginate_rows(
+            rows, page_size, direction, cursor_key is not None,
+            key=lambda row: (row['sort_value'], row['id'])
+        )
+        data = HISTORY_VIEWS[view]['serializer'].many(page)
+        return jsonify({
+            'status': 'success',
+            'data': data,
+            'count': len(data),
+            'pagination': pagination
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching {label}: {str(e)}")
+        return jsonify({'status': 'error', 'message': f'Failed to fetch {label}', 'error': str(e)}), 500
+
+
+def history_export(view):
+    """The caller's whole purchase or sales history as a streamed CSV, NDJSON or JSON download"""
+    spec = HISTORY_VIEWS[view]
+    try:
+        user_id_str = get_jwt_identity()
+        # Convert string ID to integer for database queries
+        user_id = int(user_id_str) if user_id_str else None
+        fmt = request.args.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({
+                'status': 'error',
+                'message': f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+            }), 400
+        try:
+            start, end = parse_history_window()
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        query, params = build_history_query(view, user_id, start, end)
+        return export_response(query, params, spec['serializer'], fmt, f"eco-hub-{view}")
+    except Exception as e:
+        logger.error(f"Error exporting {spec['label']}: {str(e)}")
+        return jsonify({'status': 'error', 'message': f"Failed to export {spec['label']}", 'error': str(e)}), 500
+
+
+# Rollup tables this worker has already warned about
+_missing_rollups = set()
+
+def warn_rollups_missing(table):
+    """Log once per worker that summaries are computed live because table does not exist"""
+    if table not in _missing_rollups:
+        _missing_rollups.add(table)
+        logger.warning(f"{table} does not exist, computing summaries live; run 'python migrate.py user-rollups'")
+
+
+def summary_totals(view):
+    """
+    The caller's running purchase or sales totals
+    One primary-key read of user_transaction_totals; falls back to aggregating
+    the caller's transactions when the rollups are not installed
+    """
+    spec = HISTORY_VIEWS[view]
+    user_id_str = get_jwt_identity()
+    # Convert string ID to integer for database queries
+    user_id = int(user_id_str) if user_id_str else None
+    with get_db_cursor() as (cur, conn):
+        try:
+            totals = read_user_totals(cur, user_id, spec['rollup_role'])
+            source = 'rollup'
+        except psycopg2.errors.UndefinedTable:
+            # Rollups not installed yet ('python migrate.py user-rollups')
+            conn.rollback()
+            warn_rollups_missing('user_transaction_totals')
+            totals = compute_user_totals(cur, user_id, spec['rollup_role'])
+            source = 'live'
+    first_at, last_at = totals['first_activity_at'], totals['last_activity_at']
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'totalKwh': float(totals['kwh_total'] or 0),
+            spec['amount_field']: float(totals['amount_total'] or 0),
+            'transactionCount': int(totals['transaction_count'] or 0),
+            'firstActivity': first_at.isoformat() if first_at else None,
+            'lastActivity': last_at.isoformat() if last_at else None
+        },
+        'freshness': {'source': source}
+    }), 200
+
+
+def summary_daily(view):
+    """The caller's per-day purchase or sales totals over a window, oldest first, one entry per day"""
+    spec = HISTORY_VIEWS[view]
+    label = spec['label']
+    try:
+        user_id_str = get_jwt_identity()
+        # Convert string ID to integer for database queries
+        user_id = int(user_id_str) if user_id_str else None
+        try:
+            start, end = parse_history_window()
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        # Whole days: the window ends at the start of the day after 'to'
+        end_day = end.date() if end else datetime.utcnow().date() + timedelta(days=1)
+        if end and end != datetime.combine(end_day, datetime.min.time()):
+            end_day += timedelta(days=1)
+        start_day = start.date() if start else end_day - timedelta(days=DEFAULT_SUMMARY_DAYS)
+        if start_day >= end_day:
+            # Only reachable with 'from' after today when 'to' is omitted
+            return jsonify({'status': 'error', 'message': 'from must be before to (default: today)'}), 400
+        if (end_day - start_day).days > MAX_SUMMARY_DAYS:
+            return jsonify({
+                'status': 'error',
+                'message': f'The window can span at most {MAX_SUMMARY_DAYS} days'
+            }), 400
+
+        with get_db_cursor() as (cur, conn):
+            try:
+                rows = read_user_daily(cur, user_id, spec['rollup_role'], start_day, end_day)
+                source = 'rollup'
+            except psycopg2.errors.UndefinedTable:
+                conn.rollback()
+                warn_rollups_missing('user_transaction_daily')
+                rows = compute_user_daily(cur, user_id, spec['rollup_role'], start_day, end_day)
+                source = 'live'
+
+        buckets = {row['day']: row for row in rows}
+        days = []
+        day = start_day
+        while day < end_day:
+            row = buckets.get(day)
+            days.append({
+                'date': day.isoformat(),
+                'kwh': float(row['kwh_total']) if row else 0.0,
+                'totalPrice': float(row['amount_total']) if row else 0.0,
+                'count': int(row['transaction_count']) if row else 0
+            })
+            day += timedelta(days=1)
+        return jsonify({
+            'status': 'success',
+            'data': days,
+            'count': len(days),
+            'freshness': {'source': source}
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching daily {label} summary: {str(e)}")
+        return jsonify({'status': 'error', 'message': f'Failed to fetch daily {label} summary', 'error': str(e)}), 500
+
 
 @transactions_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_transaction():
     """
-    Create a transaction for a purchase by the authenticated consumer
+    Purchase energy from a listing as the authenticated consumer
     Expected JSON: { listingId: number, kwh: number }
+    Optional Idempotency-Key header (or idempotencyKey field): retries with the
+    same key return the original transaction instead of buying again
     """
     try:
         data = request.get_json() or {}
@@ -33,90 +320,112 @@ def create_transaction():
         if not listing_id or not kwh_amount:
             return jsonify({'status': 'error', 'message': 'listingId and kwh are required'}), 400
 
-        with get_db_cursor() as (cur, conn):
-            # Fetch listing details to determine seller and price
-            cur.execute(
-                """
-                SELECT l.id, l.user_id AS seller_id, l.price_per_kwh, l.location
-                FROM listings l
-                WHERE l.id = %s
-                """,
-                (listing_id,)
+        try:
+            kwh = parse_quantity(kwh_amount)
+            idempotency_key = parse_idempotency_key(
+                request.headers.get('Idempotency-Key') or data.get('idempotencyKey')
             )
-            listing = cur.fetchone()
-            if not listing:
-                return jsonify({'status': 'error', 'message': 'Listing not found'}), 404
-
-            total_price = float(listing['price_per_kwh']) * float(kwh_amount)
-
-            # Insert transaction as completed now
-            cur.execute(
-                """
-                INSERT INTO transactions (buyer_id, seller_id, listing_id, kwh_amount, total_price, status, created_at, completed_at)
-                VALUES (%s, %s, %s, %s, %s, 'completed', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                RETURNING id, created_at, completed_at
-                """,
-                (buyer_id, listing['seller_id'], listing_id, kwh_amount, total_price)
-            )
-            tx = cur.fetchone()
-            conn.commit()
+        except PurchaseError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), e.status_code
 
-            return jsonify({
-                'status': 'success',
-                'data': {
-                    'id': tx['id'],
-                    'buyerId': buyer_id,
-                    'sellerId': listing['seller_id'],
-                    'listingId': listing_id,
-                    'kwh': float(kwh_amount),
-                    'totalPrice': total_price,
-                    'createdAt': tx['created_at'].isoformat() if tx['created_at'] else None,
-                    'completedAt': tx['completed_at'].isoformat() if tx['completed_at'] else None,
-                }
-            }), 201
+        with get_db_cursor() as (cur, conn):
+            try:
+                receipt, replayed = purchase(cur, conn, buyer_id, listing_id, kwh, idempotency_key)
+            except InsufficientQuantity as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': str(e),
+                    'availableKwh': e.available_kwh
+                }), e.status_code
+            except PurchaseError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), e.status_code
+
+            if not replayed:
+                invalidate(*LISTING_CACHE_NAMESPACES)
+                if listing_index is not None:
+                    listing_index.refresh(cur, [receipt['listingId']])
+
+        response = jsonify({'status': 'success', 'data': receipt, 'replayed': replayed})
+        return response, 200 if replayed else 201
 
     except Exception as e:
         logger.error(f"Error creating transaction: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to create transaction', 'error': str(e)}), 500
 
 
-@transactions_bp.route('/me', methods=['GET'])
+@transactions_bp.route('/batch', methods=['POST'])
 @jwt_required()
-def get_my_transactions():
+def create_batch_transaction():
     """
-    Get purchase history for the authenticated consumer (as buyer)
+    Purchase from several listings at once (a multi-listing cart), all or nothing
+    Expected JSON: { lines: [{ listingId: number, kwh: number }, ...] }
+    Optional Idempotency-Key header (or idempotencyKey field) covers the whole batch
+    Returns per-line receipts, or per-line results with the reason each
+    refused line failed (nothing is purchased in that case)
     """
     try:
+        data = request.get_json() or {}
         buyer_id_str = get_jwt_identity()
         # Convert string ID to integer for database queries
         buyer_id = int(buyer_id_str) if buyer_id_str else None
-        with get_db_cursor() as (cur, conn):
-            cur.execute(
-                """
-                SELECT t.id, t.kwh_amount, t.total_price, t.created_at,
-                       l.location, l.energy_type
-                FROM transactions t
-                JOIN listings l ON l.id = t.listing_id
-                WHERE t.buyer_id = %s
-                ORDER BY t.created_at DESC, t.id DESC
-                """,
-                (buyer_id,)
+
+        try:
+            lines = parse_batch_lines(data.get('lines'))
+            idempotency_key = parse_idempotency_key(
+                request.headers.get('Idempotency-Key') or data.get('idempotencyKey'),
+                max_length=MAX_BATCH_IDEMPOTENCY_KEY_LENGTH
             )
-            rows = cur.fetchall()
-            history = []
-            for r in rows:
-                history.append({
-                    'id': r['id'],
-                    'date': r['created_at'].isoformat() if r['created_at'] else None,
-                    'location': r['location'],
-                    'energyType': r['energy_type'],
-                    'kwh': float(r['kwh_amount']),
-                    'totalPrice': float(r['total_price']),
-                })
-            return jsonify({'status': 'success', 'data': history}), 200
+        except PurchaseError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), e.status_code
+
+        with get_db_cursor() as (cur, conn):
+            try:
+                receipts, replayed = purchase_batch(cur, conn, buyer_id, lines, idempotency_key)
+            except BatchRejected as e:
+                return jsonify({'status': 'error', 'message': str(e), 'lines': e.lines}), e.status_code
+            except PurchaseError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), e.status_code
+
+            if not replayed:
+                invalidate(*LISTING_CACHE_NAMESPACES)
+                if listing_index is not None:
+                    listing_index.refresh(cur, sorted({receipt['listingId'] for receipt in receipts}))
+
+        response = jsonify({
+            'status': 'success',
+            'data': {
+                'lines': receipts,
+                'totalKwh': sum(receipt['kwh'] for receipt in receipts),
+                'totalPrice': sum(receipt['totalPrice'] for receipt in receipts)
+            },
+            'replayed': replayed
+        })
+        return response, 200 if replayed else 201
+
     except Exception as e:
-        logger.error(f"Error fetching transactions: {str(e)}")
-        return jsonify({'status': 'error', 'message': 'Failed to fetch transactions', 'error': str(e)}), 500
+        logger.error(f"Error creating batch transaction: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to create batch transaction', 'error': str(e)}), 500
+
+
+@transactions_bp.route('/me', methods=['GET'])
+@jwt_required()
+def get_my_transactions():
+    """
+    Get purchase history for the authenticated consumer (as buyer), newest first
+    Query params: from, to (ISO dates or datetimes; a bare 'to' date includes
+    that whole day), limit (page size), cursor (opaque keyset token)
+    """
+    return history_page('purchases')
+
+
+@transactions_bp.route('/me/export', methods=['GET'])
+@jwt_required()
+def export_my_transactions():
+    """
+    Stream the authenticated consumer's full purchase history
+    Query params: format (csv, ndjson or json; default csv), from, to
+    """
+    return history_export('purchases')
 
 
 @transactions_bp.route('/me/summary', methods=['GET'])
@@ -124,74 +433,43 @@ def get_my_transactions():
 def get_my_summary():
     """
     Get aggregated totals for the authenticated consumer purchases
-    Returns: { totalKwh, totalExpenditure }
+    Returns: { totalKwh, totalExpenditure, transactionCount, firstActivity, lastActivity }
     """
     try:
-        buyer_id_str = get_jwt_identity()
-        # Convert string ID to integer for database queries
-        buyer_id = int(buyer_id_str) if buyer_id_str else None
-        with get_db_cursor() as (cur, conn):
-            cur.execute(
-                """
-                SELECT COALESCE(SUM(kwh_amount), 0) AS total_kwh,
-                       COALESCE(SUM(total_price), 0) AS total_spend
-                FROM transactions
-                WHERE buyer_id = %s
-                """,
-                (buyer_id,)
-            )
-            row = cur.fetchone() or {'total_kwh': 0, 'total_spend': 0}
-            return jsonify({
-                'status': 'success',
-                'data': {
-                    'totalKwh': float(row['total_kwh'] or 0),
-                    'totalExpenditure': float(row['total_spend'] or 0)
-                }
-            }), 200
+        return summary_totals('purchases')
     except Exception as e:
         logger.error(f"Error fetching purchase summary: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to fetch summary', 'error': str(e)}), 500
 
 
+@transactions_bp.route('/me/summary/daily', methods=['GET'])
+@jwt_required()
+def get_my_daily_summary():
+    """
+    Per-day purchase totals for charts, one entry per day (zeros on idle days)
+    Query params: from, to (as for /me; default the last 30 days, at most 366)
+    """
+    return summary_daily('purchases')
+
+
 @transactions_bp.route('/sales', methods=['GET'])
 @jwt_required()
 def get_my_sales():
     """
-    Get sales history for the authenticated supplier (as seller)
+    Get sales history for the authenticated supplier (as seller), newest first
+    Query params: from, to, limit, cursor (as for /me)
     """
-    try:
-        seller_id_str = get_jwt_identity()
-        # Convert string ID to integer for database queries
-        seller_id = int(seller_id_str) if seller_id_str else None
-        with get_db_cursor() as (cur, conn):
-            cur.execute(
-                """
-                SELECT t.id, t.kwh_amount, t.total_price, t.created_at,
-                       l.location, l.energy_type, l.title, l.id AS listing_id
-                FROM transactions t
-                JOIN listings l ON l.id = t.listing_id
-                WHERE t.seller_id = %s
-                ORDER BY t.created_at DESC, t.id DESC
-                """,
-                (seller_id,)
-            )
-            rows = cur.fetchall()
-            sales = []
-            for r in rows:
-                sales.append({
-                    'id': r['id'],
-                    'date': r['created_at'].isoformat() if r['created_at'] else None,
-                    'listingId': r['listing_id'],
-                    'listingTitle': r['title'],
-                    'location': r['location'],
-                    'energyType': r['energy_type'],
-                    'kwh': float(r['kwh_amount']),
-                    'totalPrice': float(r['total_price']),
-                })
-            return jsonify({'status': 'success', 'data': sales}), 200
-    except Exception as e:
-        logger.error(f"Error fetching sales: {str(e)}")
-        return jsonify({'status': 'error', 'message': 'Failed to fetch sales', 'error': str(e)}), 500
+    return history_page('sales')
+
+
+@transactions_bp.route('/sales/export', methods=['GET'])
+@jwt_required()
+def export_my_sales():
+    """
+    Stream the authenticated supplier's full sales history
+    Query params: format (csv, ndjson or json; default csv), from, to
+    """
+    return history_export('sales')
 
 
 @transactions_bp.route('/sales/summary', methods=['GET'])
@@ -199,32 +477,20 @@ def get_my_sales():
 def get_my_sales_summary():
     """
     Get aggregated sales totals for the authenticated supplier
-    Returns: { totalKwh, totalRevenue }
+    Returns: { totalKwh, totalRevenue, transactionCount, firstActivity, lastActivity }
     """
     try:
-        seller_id_str = get_jwt_identity()
-        # Convert string ID to integer for database queries
-        seller_id = int(seller_id_str) if seller_id_str else None
-        with get_db_cursor() as (cur, conn):
-            cur.execute(
-                """
-                SELECT COALESCE(SUM(kwh_amount), 0) AS total_kwh,
-                       COALESCE(SUM(total_price), 0) AS total_revenue
-                FROM transactions
-                WHERE seller_id = %s
-                """,
-                (seller_id,)
-            )
-            row = cur.fetchone() or {'total_kwh': 0, 'total_revenue': 0}
-            return jsonify({
-                'status': 'success',
-                'data': {
-                    'totalKwh': float(row['total_kwh'] or 0),
-                    'totalRevenue': float(row['total_revenue'] or 0)
-                }
-            }), 200
+        return summary_totals('sales')
     except Exception as e:
         logger.error(f"Error fetching sales summary: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to fetch sales summary', 'error': str(e)}), 500
 
 
+@transactions_bp.route('/sales/summary/daily', methods=['GET'])
+@jwt_required()
+def get_my_daily_sales_summary():
+    """
+    Per-day sales totals for charts, one entry per day (zeros on idle days)
+    Query params: from, to (as for /me/summary/daily)
+    """
+    return summary_daily('sales')
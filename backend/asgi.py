@@ -0,0 +1,165 @@
+"""
+ASGI Entry Point
+Async serving mode for the API:
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 4
+
+Routes registered on AsyncBlueprints (api/ai_async.py) run as coroutines on
+the event loop, with the asyncpg pool (database/async_pool.py) and the async
+OpenAI client, so a slow completion or query does not hold a worker. Every
+other route is the unchanged Flask app from app.py, run on a bounded thread
+pool (ASGI_WSGI_THREADS per worker).
+
+Coroutine views get the same Flask request context, JWT error handlers and
+CORS headers as the WSGI routes.
+"""
+
+import os
+import io
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from flask import Response, jsonify
+from flask_jwt_extended import verify_jwt_in_request
+
+from app import app as flask_app
+from database.async_pool import open_async_pool, close_async_pool, get_async_pool_stats
+from api.async_routes import AsyncBlueprint, EventStream
+from api.ai import SSE_HEADERS
+from api.ai_async import ai_async_bp, interaction_logger
+
+logger = logging.getLogger(__name__)
+
+# asgiref's run_wsgi_app is thread-sensitive, which funnels every request through one shared thread
+_run_wsgi_app = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    """WsgiToAsgiInstance that runs the WSGI call on the event loop's default executor"""
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.run_wsgi_app_in_thread, thread_sensitive=False)(body)
+
+    def run_wsgi_app_in_thread(self, body):
+        _run_wsgi_app(self, body)
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi serving concurrent requests on a thread pool"""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+health_async_bp = AsyncBlueprint('health_async', url_prefix='/api/health')
+
+@health_async_bp.route('/async-db-pool')
+async def async_db_pool_stats():
+    """asyncpg pool statistics for this worker process"""
+    return jsonify({'status': 'success', 'data': get_async_pool_stats()}), 200
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+def encode_headers(response):
+    return [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in response.headers.items()]
+
+class AsyncServingApp:
+    """
+    ASGI app: coroutine views by (method, path), the Flask app for everything else
+    wsgi_threads bounds how many Flask requests run at once in this worker
+    """
+
+    def __init__(self, flask_app, blueprints, wsgi_threads=16):
+        self.flask_app = flask_app
+        self.wsgi = ThreadedWsgiToAsgi(flask_app)
+        self.wsgi_threads = wsgi_threads
+        self.routes = {}
+        for blueprint in blueprints:
+            self.routes.update(blueprint.routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] == 'http':
+            route = self.routes.get((scope['method'], scope['path']))
+            if route is not None:
+                await self.dispatch(route, scope, receive, send)
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                loop = asyncio.get_running_loop()
+                loop.set_default_executor(
+                    ThreadPoolExecutor(max_workers=self.wsgi_threads, thread_name_prefix='wsgi')
+                )
+                try:
+                    await open_async_pool()
+                except Exception as e:
+                    # Views open the pool on first use, so a database that comes up later still works
+                    logger.warning(f"asyncpg pool not opened at startup: {e}")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await interaction_logger.drain()
+                await close_async_pool()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def build_environ(self, scope, body):
+        """The WSGI environ Flask would see for this request"""
+        instance = WsgiToAsgiInstance(self.flask_app)
+        instance.scope = scope
+        return instance.build_environ(scope, io.BytesIO(body))
+
+    async def dispatch(self, route, scope, receive, send):
+        """Run a coroutine view inside a Flask request context and send its response"""
+        app = self.flask_app
+        environ = self.build_environ(scope, await read_body(receive))
+        with app.request_context(environ):
+            events = None
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    if route.jwt_required:
+                        verify_jwt_in_request()
+                    rv = await route.view()
+            except Exception as e:
+                # Routes JWT errors to the JWTManager loaders, like a Flask view
+                try:
+                    rv = app.handle_user_exception(e)
+                except Exception as unhandled:
+                    rv = app.handle_exception(unhandled)
+
+            if isinstance(rv, EventStream):
+                events = rv.events
+                rv = Response(iter(()), mimetype='text/event-stream', headers=SSE_HEADERS)
+            response = app.process_response(app.make_response(rv))
+
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': encode_headers(response)
+            })
+            if events is None:
+                await send({'type': 'http.response.body', 'body': response.get_data()})
+                return
+            async for event in events:
+                await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body'})
+
+app = AsyncServingApp(
+    flask_app,
+    [ai_async_bp, health_async_bp],
+    wsgi_threads=int(os.getenv('ASGI_WSGI_THREADS', '16'))
+)
@@ -0,0 +1,88 @@
+"""
+Access and Refresh Tokens
+Login issues a short-lived access token and a long-lived refresh token
+(JWT_REFRESH_TOKEN_EXPIRES). POST /api/auth/refresh trades a refresh token
+for a new pair: a signature check and one revocation insert instead of a
+password verification.
+
+Refresh tokens rotate: each one can be used once, and its jti is revoked as
+it is used. Every token issued from one login carries the same family id
+(the 'fam' claim). Presenting a refresh token that was already used means it
+leaked (or the client raced itself), so the whole family is revoked: the
+attacker's and the user's tokens stop working and the user logs in again.
+Logout revokes the family too.
+"""
+
+import time
+import uuid
+import logging
+from datetime import timedelta
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from revocation import revocation_store
+from user_context import get_user_context, user_context_claims, USER_CONTEXT_CLAIMS
+
+logger = logging.getLogger(__name__)
+
+FAMILY_CLAIM = 'fam'
+
+class RefreshTokenReused(Exception):
+    """Raised when a refresh token is presented a second time"""
+
+def family_key(family):
+    # Families share the revocation store with token jtis
+    return f'family:{family}'
+
+def issue_access_token(user_id, family, context=None):
+    """Access token of a family; context (the user's profile dict) adds role/location claims"""
+    claims = {FAMILY_CLAIM: family, **user_context_claims(context)}
+    return create_access_token(identity=str(user_id), additional_claims=claims)
+
+def issue_tokens(user_id, family=None, context=None):
+    """New access + refresh token pair; a new family unless rotating an existing one"""
+    family = family or uuid.uuid4().hex
+    return {
+        'access_token': issue_access_token(user_id, family, context),
+        'refresh_token': create_refresh_token(identity=str(user_id), additional_claims={FAMILY_CLAIM: family})
+    }
+
+def revoke_family(family):
+    """Revoke every token issued from one login"""
+    # Outlives any refresh token issued up to now, and so every access token of the family
+    lifetime = current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+    if isinstance(lifetime, timedelta):
+        lifetime = lifetime.total_seconds()
+    revocation_store.revoke(family_key(family), time.time() + lifetime if lifetime else None)
+
+def is_revoked(jwt_payload):
+    """Token-in-blocklist check: the token's own jti, then its family"""
+    if revocation_store.is_revoked(jwt_payload['jti']):
+        if jwt_payload.get('type') == 'refresh' and FAMILY_CLAIM in jwt_payload:
+            # A used refresh token came back
+            logger.warning(f"Refresh token reuse for user {jwt_payload.get('sub')}, revoking its family")
+            revoke_family(jwt_payload[FAMILY_CLAIM])
+        return True
+    family = jwt_payload.get(FAMILY_CLAIM)
+    return family is not None and revocation_store.is_revoked(family_key(family))
+
+def rotate_tokens(jwt_payload):
+    """
+    Spend a verified refresh token and issue the next pair of its family
+    Raises: RefreshTokenReused when another request spent it first
+    """
+    family = jwt_payload.get(FAMILY_CLAIM)
+    if not revocation_store.revoke(jwt_payload['jti'], jwt_payload.get('exp')):
+        # Lost the race to spend it: reuse seen by the backend before this worker's filter caught up
+        if family:
+            revoke_family(family)
+        raise RefreshTokenReused(jwt_payload['jti'])
+    # Claims are re-read so a changed role or location reaches the next access token
+    context = get_user_context(jwt_payload['sub']) if USER_CONTEXT_CLAIMS else None
+    return issue_tokens(jwt_payload['sub'], family, context)
+
+def revoke_session(jwt_payload):
+    """Logout: revoke the presented token and, for tokens issued by login, its whole family"""
+    revocation_store.revoke(jwt_payload['jti'], jwt_payload.get('exp'))
+    family = jwt_payload.get(FAMILY_CLAIM)
+    if family:
+        revoke_family(family)
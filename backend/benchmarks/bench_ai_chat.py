@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+AI Chat Worker Occupancy Benchmark
+Fires a burst of advisor chats at the app backed by the fake LLM and measures
+how long request workers stay pinned in synchronous mode versus job mode,
+plus the latency of a cheap /api/health probe issued during the burst.
+
+A semaphore emulates a fixed pool of sync gunicorn workers: every request
+(chat, poll or probe) must hold a slot while the view runs.
+
+Usage (needs DATABASE_URL; the fake LLM is enabled automatically):
+    python benchmarks/bench_ai_chat.py --chats 16 --workers 4 --latency 1.0
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=16, help='concurrent chat requests in the burst')
+    parser.add_argument('--workers', type=int, default=4, help='emulated sync request workers')
+    parser.add_argument('--latency', type=float, default=1.0, help='fake LLM seconds before first token')
+    parser.add_argument('--token-delay', type=float, default=0.01, help='fake LLM seconds between tokens')
+    parser.add_argument('--poll-interval', type=float, default=0.1)
+    parser.add_argument('--email', default='bench_ai_chat@example.com')
+    return parser.parse_args()
+
+class WorkerPool:
+    """Counts the time request handlers hold one of N worker slots"""
+
+    def __init__(self, size):
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self.busy_seconds = 0.0
+
+    def call(self, fn):
+        with self._slots:
+            started = time.perf_counter()
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self.busy_seconds += time.perf_counter() - started
+
+def run_burst(app, token, args, mode):
+    pool = WorkerPool(args.workers)
+    headers = {'Authorization': f'Bearer {token}'}
+    probe_samples = []
+    finished = threading.Event()
+
+    def chat(i):
+        client = app.test_client()
+        body = {'message': f'How much could solar save me? ({mode} #{i})'}
+        if mode == 'job':
+            body['mode'] = 'job'
+        response = pool.call(lambda: client.post('/api/ai/chat', json=body, headers=headers))
+        if mode == 'sync':
+            assert response.status_code == 200, response.get_json()
+            return
+        assert response.status_code == 202, response.get_json()
+        status_url = response.get_json()['statusUrl']
+        while True:
+            time.sleep(args.poll_interval)
+            polled = pool.call(lambda: client.get(status_url, headers=headers)).get_json()
+            if polled['state'] in ('completed', 'failed'):
+                return
+
+    def probe():
+        client = app.test_client()
+        while not finished.is_set():
+            started = time.perf_counter()
+            pool.call(lambda: client.get('/api/health'))
+            probe_samples.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    started = time.perf_counter()
+    probe_thread.start()
+    with ThreadPoolExecutor(max_workers=args.chats) as executor:
+        list(executor.map(chat, range(args.chats)))
+    elapsed = time.perf_counter() - started
+    finished.set()
+    probe_thread.join()
+
+    print(f"{mode:<5} burst {elapsed:7.2f}s   worker busy {pool.busy_seconds:7.2f}s   "
+          f"probe p50 {statistics.median(probe_samples):8.1f} ms   max {max(probe_samples):8.1f} ms")
+    return pool.busy_seconds
+
+def main():
+    args = parse_args()
+    os.environ['AI_FAKE_LLM'] = '1'
+    os.environ['AI_FAKE_LLM_LATENCY'] = str(args.latency)
+    os.environ['AI_FAKE_LLM_TOKEN_DELAY'] = str(args.token_delay)
+    # Every request must reach the model, so keep the advice cache out of the measurement
+    os.environ['AI_CACHE_ENABLED'] = 'false'
+    os.environ.setdefault('AI_CHAT_WORKERS', str(args.chats))
+
+    from flask_jwt_extended import create_access_token
+    from werkzeug.security import generate_password_hash
+    from database.config import get_db_cursor
+    from app import app
+
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO users (first_name, last_name, name, email, password_hash, role, location)
+            VALUES ('Bench', 'Chat', 'Bench Chat', %s, %s, 'consumer', 'Nairobi, Kenya')
+            ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+            RETURNING id
+        """, (args.email, generate_password_hash('bench')))
+        user_id = cur.fetchone()['id']
+        conn.commit()
+
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+
+    print(f"🤖 {args.chats} chats, {args.workers} workers, fake LLM latency {args.latency}s")
+    sync_busy = run_burst(app, token, args, 'sync')
+    job_busy = run_burst(app, token, args, 'job')
+    print(f"   worker time saved: {sync_busy / max(job_busy, 1e-9):.1f}x less occupancy in job mode")
+
+if __name__ == '__main__':
+    main()
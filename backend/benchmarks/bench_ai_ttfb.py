@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+AI Chat Time-To-First-Byte Benchmark
+Measures time to first byte and total time of /api/ai/chat as plain JSON
+versus the server-sent event variant, with the fake LLM as a stub streaming
+model (fixed first-token latency plus a per-token delay)
+
+Usage (needs DATABASE_URL; the fake LLM is enabled automatically):
+    python benchmarks/bench_ai_ttfb.py --runs 5 --latency 0.4 --token-delay 0.02
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.4, help='fake LLM seconds before first token')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='fake LLM seconds between tokens')
+    parser.add_argument('--email', default='bench_ai_chat@example.com')
+    return parser.parse_args()
+
+def measure(client, headers, body):
+    """Return (ttfb_ms, total_ms) for one chat request, reading the body incrementally"""
+    started = time.perf_counter()
+    response = client.post('/api/ai/chat', json=body, headers=headers, buffered=False)
+    ttfb = None
+    for chunk in response.response:
+        if chunk and ttfb is None:
+            ttfb = time.perf_counter() - started
+    total = time.perf_counter() - started
+    response.close()
+    assert response.status_code == 200, response.status_code
+    return ttfb * 1000, total * 1000
+
+def report(label, samples):
+    ttfbs = [ttfb for ttfb, _ in samples]
+    totals = [total for _, total in samples]
+    print(f"{label:<8} ttfb p50 {statistics.median(ttfbs):8.1f} ms   total p50 {statistics.median(totals):8.1f} ms")
+    return statistics.median(ttfbs)
+
+def main():
+    args = parse_args()
+    os.environ['AI_FAKE_LLM'] = '1'
+    os.environ['AI_FAKE_LLM_LATENCY'] = str(args.latency)
+    os.environ['AI_FAKE_LLM_TOKEN_DELAY'] = str(args.token_delay)
+    # Every request must reach the model, so keep the advice cache out of the measurement
+    os.environ['AI_CACHE_ENABLED'] = 'false'
+
+    from flask_jwt_extended import create_access_token
+    from werkzeug.security import generate_password_hash
+    from database.config import get_db_cursor
+    from app import app
+
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO users (first_name, last_name, name, email, password_hash, role, location)
+            VALUES ('Bench', 'Chat', 'Bench Chat', %s, %s, 'consumer', 'Nairobi, Kenya')
+            ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+            RETURNING id
+        """, (args.email, generate_password_hash('bench')))
+        user_id = cur.fetchone()['id']
+        conn.commit()
+
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    message = {'message': 'What size of solar system do I need?'}
+
+    print(f"⏱️  {args.runs} runs, fake LLM latency {args.latency}s, token delay {args.token_delay}s")
+    sync_ttfb = report('json', [measure(client, headers, message) for _ in range(args.runs)])
+    stream_ttfb = report('sse', [measure(client, headers, {**message, 'mode': 'stream'}) for _ in range(args.runs)])
+    print(f"   time to first byte: {sync_ttfb / stream_ttfb:.1f}x faster with streaming")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Batch Purchase Benchmark
+Buying a multi-listing cart through one POST /api/transactions/batch versus
+one POST /api/transactions/ per listing, through the Flask app (JWT decode,
+pooled connection checkout and commit included for every request)
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_batch_purchase.py
+    python benchmarks/bench_batch_purchase.py --sizes 1 10 50 100 --runs 20
+    python benchmarks/bench_batch_purchase.py --cleanup
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+
+BENCH_EMAIL_DOMAIN = '@bench-batch.invalid'
+BENCH_TITLE = 'Bench batch cart listing'
+
+# Enough stock that no run ever sells a listing out
+BENCH_STOCK = 1e9
+
+def setup(listings):
+    """A supplier with `listings` well-stocked listings and a buyer; returns (listing_ids, buyer_id)"""
+    with get_db_cursor() as (cur, conn):
+        ids = []
+        for i, role in enumerate(['supplier', 'consumer']):
+            cur.execute("""
+                INSERT INTO users (email, password_hash, role)
+                VALUES (%s, 'x', %s)
+                ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+                RETURNING id
+            """, (f'bench{i}{BENCH_EMAIL_DOMAIN}', role))
+            ids.append(cur.fetchone()['id'])
+        cur.execute("""
+            INSERT INTO listings (user_id, title, energy_type, available_kwh, price_per_kwh, status, location)
+            SELECT %s, %s, 'Solar', %s, 0.10 + (g %% 20) / 100.0, 'active', 'Bench'
+            FROM generate_series(1, %s) g
+            RETURNING id
+        """, (ids[0], BENCH_TITLE, BENCH_STOCK, listings))
+        listing_ids = sorted(row['id'] for row in cur.fetchall())
+        conn.commit()
+    return listing_ids, ids[1]
+
+def cleanup():
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            DELETE FROM transactions
+            WHERE listing_id IN (SELECT id FROM listings WHERE title = %s)
+        """, (BENCH_TITLE,))
+        transactions = cur.rowcount
+        cur.execute("DELETE FROM listings WHERE title = %s", (BENCH_TITLE,))
+        listings = cur.rowcount
+        cur.execute("DELETE FROM users WHERE email LIKE %s", ('%' + BENCH_EMAIL_DOMAIN,))
+        conn.commit()
+    print(f"🧹 Removed {listings} listings and {transactions:,} transactions")
+
+def sequential(client, headers, cart):
+    for line in cart:
+        response = client.post('/api/transactions/', json=line, headers=headers)
+        assert response.status_code == 201, response.get_json()
+
+def batch(client, headers, cart):
+    response = client.post('/api/transactions/batch', json={'lines': cart}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+
+def time_it(fn, client, headers, cart, runs):
+    fn(client, headers, cart)  # warm up
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(client, headers, cart)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 10, 25, 50], help='cart lines')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--cleanup', action='store_true', help='delete benchmark rows and exit')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    from flask_jwt_extended import create_access_token
+    from app import app
+
+    listing_ids, buyer_id = setup(max(args.sizes))
+    with app.app_context():
+        token = create_access_token(identity=str(buyer_id))
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    print(f"🛒 Cart purchase latency through the app (p50 of {args.runs} runs)")
+    try:
+        for size in args.sizes:
+            cart = [{'listingId': listing_id, 'kwh': 1.5} for listing_id in listing_ids[:size]]
+            one_by_one = time_it(sequential, client, headers, cart, args.runs)
+            batched = time_it(batch, client, headers, cart, args.runs)
+            print(f"   {size:4} lines   {size:4} x POST /transactions/ {one_by_one:9.2f} ms   "
+                  f"POST /transactions/batch {batched:8.2f} ms   ({one_by_one / batched:5.1f}x)")
+    finally:
+        cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Dashboard Metrics Benchmark
+Compares the previous sequential-query metrics path against the single
+round-trip query (and the materialized counters read) on a seeded dataset
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_dashboard_metrics.py --seed --transactions 1000000
+    python benchmarks/bench_dashboard_metrics.py --runs 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+from database.metrics import compute_live_totals, read_dashboard_counters
+
+BENCH_EMAIL_PREFIX = 'bench_dashboard_'
+
+def seed(users, listings, transactions):
+    """Insert synthetic users, listings and transactions with generate_series"""
+    print(f"🌱 Seeding {users:,} users, {listings:,} listings, {transactions:,} transactions...")
+    started = time.perf_counter()
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO users (first_name, last_name, name, email, password_hash, role, location, created_at, updated_at)
+            SELECT 'Bench', 'User ' || g, 'Bench User ' || g,
+                   %s || g || '@example.com', 'x',
+                   CASE WHEN g %% 5 = 0 THEN 'supplier' ELSE 'consumer' END,
+                   'Nairobi, Kenya', NOW(), NOW()
+            FROM generate_series(1, %s) g
+            ON CONFLICT (email) DO NOTHING
+        """, (BENCH_EMAIL_PREFIX, users))
+        cur.execute("SELECT array_agg(id) AS ids FROM users WHERE email LIKE %s", (BENCH_EMAIL_PREFIX + '%',))
+        user_ids = cur.fetchone()['ids']
+
+        cur.execute("""
+            INSERT INTO listings (user_id, title, energy_type, available_kwh, price_per_kwh, status, location, created_at, updated_at)
+            SELECT (%(ids)s::int[])[1 + (g %% array_length(%(ids)s::int[], 1))],
+                   'Bench listing ' || g,
+                   (ARRAY['Solar', 'Wind', 'Hydro', 'Biomass', 'Geothermal'])[1 + g %% 5],
+                   100 + (g %% 900), 0.10 + (g %% 40) / 100.0,
+                   CASE WHEN g %% 4 = 0 THEN 'inactive' ELSE 'active' END,
+                   'Bench location ' || (g %% 50),
+                   NOW() - (g || ' minutes')::interval, NOW()
+            FROM generate_series(1, %(n)s) g
+            RETURNING id
+        """, {'ids': user_ids, 'n': listings})
+        listing_ids = [row['id'] for row in cur.fetchall()]
+
+        cur.execute("""
+            INSERT INTO transactions (buyer_id, seller_id, listing_id, kwh_amount, total_price, status, created_at, completed_at)
+            SELECT (%(users)s::int[])[1 + (g %% array_length(%(users)s::int[], 1))],
+                   (%(users)s::int[])[1 + ((g * 7) %% array_length(%(users)s::int[], 1))],
+                   (%(listings)s::int[])[1 + (g %% array_length(%(listings)s::int[], 1))],
+                   1 + (g %% 50), (1 + (g %% 50)) * 0.15, 'completed',
+                   NOW() - (g || ' seconds')::interval, NOW()
+            FROM generate_series(1, %(n)s) g
+        """, {'users': user_ids, 'listings': listing_ids, 'n': transactions})
+        conn.commit()
+        cur.execute("ANALYZE users; ANALYZE listings; ANALYZE transactions;")
+        conn.commit()
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+def legacy_metrics(cur):
+    """The previous implementation: sequential aggregates and string re-parsing"""
+    result = {}
+    cur.execute("SELECT COUNT(*) AS count FROM users")
+    result['active_community_members'] = {'value': str(int(cur.fetchone()['count']))}
+    cur.execute("SELECT COUNT(DISTINCT buyer_id) AS count FROM transactions WHERE buyer_id IS NOT NULL")
+    result['households_powered'] = {'value': str(int(cur.fetchone()['count']))}
+    cur.execute("SELECT COALESCE(SUM(kwh_amount), 0) AS total FROM transactions")
+    result['energy_bought'] = {'value': f"{int(float(cur.fetchone()['total'])):,} kWh", 'unit': 'kWh'}
+    cur.execute("SELECT COALESCE(SUM(COALESCE(available_kwh, quantity_kwh, 0)), 0) AS total FROM listings")
+    result['energy_saved'] = {'value': f"{int(float(cur.fetchone()['total'])):,} kWh", 'unit': 'kWh'}
+    energy_kwh = float(result['energy_bought']['value'].replace(' kWh', '').replace(',', ''))
+    if energy_kwh == 0:
+        cur.execute("SELECT COALESCE(SUM(kwh_amount), 0) AS total FROM transactions")
+        energy_kwh = float(cur.fetchone()['total'])
+    co2_kg = int(energy_kwh * 0.5)
+    result['co2_savings'] = {'value': f"{co2_kg:,} kg"}
+    result['environmental_impact_trees'] = {'value': f"≈ to Planting {int(co2_kg / 21):,} trees!"}
+    return result
+
+def time_it(label, fn, runs):
+    samples = []
+    with get_db_cursor() as (cur, conn):
+        fn(cur)  # warm up caches
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn(cur)
+            samples.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<28} p50 {statistics.median(samples):9.2f} ms   "
+          f"min {min(samples):9.2f} ms   max {max(samples):9.2f} ms")
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='insert the synthetic dataset first')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--listings', type=int, default=50000)
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.users, args.listings, args.transactions)
+
+    print("📊 Dashboard metrics latency")
+    legacy = time_it('legacy (sequential)', legacy_metrics, args.runs)
+    single = time_it('single round trip', compute_live_totals, args.runs)
+    print(f"   speedup: {legacy / single:.2f}x")
+
+    def materialized(cur):
+        values, _ = read_dashboard_counters(cur)
+        if values is None:
+            raise RuntimeError('dashboard counters not installed (python migrate.py dashboard-counters)')
+        return values
+
+    try:
+        counters = time_it('materialized counters', materialized, args.runs)
+        print(f"   speedup vs legacy: {legacy / counters:.2f}x")
+    except Exception as e:
+        print(f"ℹ️  Skipping materialized read: {e}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Listing Image Benchmark
+Cost of the in-request metadata strip (listing_images.save_stripped_upload),
+throughput of the background variant generation (process_image: thumb and
+medium WebP) and the bytes a marketplace page transfers with originals
+against thumbnails.
+
+Uploads are synthetic camera-sized JPEGs with EXIF and GPS (every other one
+an MPO, as phone cameras write), in a temporary directory; no database or
+server is needed.
+
+Usage (needs Pillow):
+    python benchmarks/bench_listing_images.py --images 24 --workers 2
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing_images import Image, save_stripped_upload, process_image
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=24, help='uploads to process')
+    parser.add_argument('--size', default='4032x3024', help='upload dimensions (WxH)')
+    parser.add_argument('--workers', type=int, default=1, help='pool processes')
+    parser.add_argument('--page-size', type=int, default=12, help='cards on a marketplace page')
+    return parser.parse_args()
+
+def make_upload(path, width, height, seed):
+    # Upscaled noise over a gradient: smooth texture that compresses roughly like a photo
+    noise = Image.merge('RGB', [
+        Image.effect_noise((width // 16, height // 16), 60 + seed % 20 + band).resize((width, height), Image.BICUBIC)
+        for band in range(3)
+    ])
+    gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    image = Image.blend(noise, gradient, 0.5)
+    exif = Image.Exif()
+    exif[0x0112] = 6                    # Orientation: rotated 90 degrees
+    exif[0x010F] = 'Bench Camera'
+    exif.get_ifd(0x8825)[2] = (1.0, 17.0, 44.0)     # GPSLatitude
+    if seed % 2:
+        image.save(path, format='MPO', quality=92, exif=exif, save_all=True, append_images=[image.reduce(8)])
+    else:
+        image.save(path, format='JPEG', quality=92, exif=exif)
+
+def main():
+    args = parse_args()
+    if Image is None:
+        print("Pillow is not installed (pip install Pillow); nothing to measure")
+        return
+    width, height = (int(n) for n in args.size.split('x'))
+    workdir = tempfile.mkdtemp(prefix='bench_listing_images_')
+    try:
+        raw_paths = []
+        for i in range(args.images):
+            raw_paths.append(os.path.join(workdir, f'{i}_raw.jpg'))
+            make_upload(raw_paths[-1], width, height, i)
+        uploaded = sum(os.path.getsize(path) for path in raw_paths)
+
+        print(f"🖼️  {args.images} uploads of {width}x{height} ({uploaded / args.images / 1024:,.0f} KiB each), "
+              f"{args.workers} worker(s)")
+        paths, strip_ms = [], []
+        for raw_path in raw_paths:
+            paths.append(raw_path.replace('_raw', '_upload'))
+            started = time.perf_counter()
+            with open(raw_path, 'rb') as stream:
+                save_stripped_upload(stream, paths[-1])
+            strip_ms.append((time.perf_counter() - started) * 1000)
+        strip_ms.sort()
+        print(f"   in-request strip          median {strip_ms[len(strip_ms) // 2]:.0f} ms per upload")
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            results = list(pool.map(process_image, paths))
+        elapsed = time.perf_counter() - started
+
+        per_image_ms = sorted(result['ms'] for result in results)
+        print(f"   throughput      {args.images / elapsed:8.2f} images/s   "
+              f"median {per_image_ms[len(per_image_ms) // 2]} ms per image")
+
+        originals = sum(result['bytes'] for result in results) / args.images
+        for name in ('thumb', 'medium'):
+            variant = results[0]['variants'][name]
+            average = sum(result['variants'][name]['bytes'] for result in results) / args.images
+            print(f"   {name:<8} {variant['width']}x{variant['height']:<6} {average / 1024:8,.1f} KiB   "
+                  f"{average / originals:6.1%} of the original")
+        print(f"   page of {args.page_size} cards: {originals * args.page_size / 1024 ** 2:,.2f} MiB originals, "
+              f"{sum(r['variants']['thumb']['bytes'] for r in results) / args.images * args.page_size / 1024 ** 2:,.2f} MiB thumbnails")
+        stripped = 0
+        for path in paths:
+            with Image.open(path) as image:
+                stripped += 'exif' not in image.info and not image.getexif()
+        print(f"   metadata stripped: {stripped}/{args.images} originals")
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == '__main__':
+    main()
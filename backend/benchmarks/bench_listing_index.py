@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Listing Index Benchmark
+Memory footprint of the in-memory listing index (per 100k listings) and
+page latency for the marketplace list query: keyset SQL vs ListingIndex.query,
+after checking both return the same pages
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_listing_index.py --seed --listings 100000
+    python benchmarks/bench_listing_index.py --runs 200
+    python benchmarks/bench_listing_index.py --cleanup
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+from api.listings import LISTING_SORTS
+from listing_index import ListingIndex
+
+BENCH_TITLE_PREFIX = 'Bench index '
+PAGE_SIZE = 24
+
+# (label, query filters, sort)
+QUERIES = [
+    ('newest, all', {}, 'newest'),
+    ('newest, active solar', {'status': 'active', 'energy_type': 'Solar'}, 'newest'),
+    ('price asc, active', {'status': 'active'}, 'price_asc'),
+    ('price desc, 0.20-0.30', {'status': 'active', 'min_price': 0.20, 'max_price': 0.30}, 'price_desc'),
+    ('price asc, rare type', {'energy_type': 'Tidal'}, 'price_asc')
+]
+
+def seed(listings):
+    """Insert synthetic listings with spread-out timestamps and prices"""
+    print(f"🌱 Seeding {listings:,} listings...")
+    started = time.perf_counter()
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO listings (title, energy_type, available_kwh, price_per_kwh, status, location,
+                                  description, created_at, updated_at)
+            SELECT %s || g,
+                   (ARRAY['Solar', 'Wind', 'Hydro', 'Biomass', 'Geothermal'])[1 + g %% 5],
+                   100 + (g %% 900), 0.10 + (g %% 40) / 100.0,
+                   CASE WHEN g %% 10 = 0 THEN 'inactive' ELSE 'active' END,
+                   'Bench location ' || (g %% 50),
+                   'Synthetic listing for the index benchmark',
+                   NOW() - (g || ' seconds')::interval, NOW()
+            FROM generate_series(1, %s) g
+        """, (BENCH_TITLE_PREFIX, listings))
+        conn.commit()
+        cur.execute("ANALYZE listings")
+        conn.commit()
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+def cleanup():
+    with get_db_cursor() as (cur, conn):
+        cur.execute("DELETE FROM listings WHERE title LIKE %s", (BENCH_TITLE_PREFIX + '%',))
+        print(f"🧹 Removed {cur.rowcount:,} benchmark listings")
+        conn.commit()
+
+def sql_page(cur, filters, sort):
+    """The keyset SQL path of GET /api/listings/ (first page)"""
+    expression, descending = LISTING_SORTS[sort]
+    order = 'DESC' if descending else 'ASC'
+    conditions, params = [], []
+    for column, operator, name in (('status', '=', 'status'), ('energy_type', '=', 'energy_type'),
+                                   ('price_per_kwh', '>=', 'min_price'), ('price_per_kwh', '<=', 'max_price')):
+        if filters.get(name) is not None:
+            conditions.append(f"{column} {operator} %s")
+            params.append(filters[name])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    cur.execute(f"""
+        SELECT id, title, energy_type, available_kwh, price_per_kwh,
+               status, location, description, image_url, created_at, updated_at,
+               {expression} AS sort_value
+        FROM listings {where}
+        ORDER BY {expression} {order}, id {order}
+        LIMIT %s
+    """, params + [PAGE_SIZE + 1])
+    return [row['id'] for row in cur.fetchall()]
+
+def index_page(index, filters, sort):
+    return [row['id'] for row in index.query(sort=sort, limit=PAGE_SIZE + 1, **filters)]
+
+def time_it(fn, runs):
+    fn()  # warm up
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='insert the synthetic listings first')
+    parser.add_argument('--cleanup', action='store_true', help='delete the synthetic listings and exit')
+    parser.add_argument('--listings', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.listings)
+
+    index = ListingIndex()
+    started = time.perf_counter()
+    index.bootstrap()
+    load_seconds = time.perf_counter() - started
+
+    # Separate load under tracemalloc, which slows allocation down
+    tracemalloc.start()
+    traced = ListingIndex()
+    traced.bootstrap()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    count = len(index)
+    print(f"🧠 Index holds {count:,} listings, loaded in {load_seconds:.2f}s")
+    print(f"   {size / 1024 / 1024:.1f} MiB total, {size / max(count, 1) * 100000 / 1024 / 1024:.1f} MiB per 100k listings")
+
+    started = time.perf_counter()
+    index.sync()
+    print(f"🔄 Delta sync (no changes) {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"⏱️  First page of {PAGE_SIZE} (p50)")
+    with get_db_cursor() as (cur, conn):
+        for label, filters, sort in QUERIES:
+            expected = sql_page(cur, filters, sort)
+            assert index_page(index, filters, sort) == expected, f'index page differs for {label}'
+            sql = time_it(lambda: sql_page(cur, filters, sort), args.runs)
+            memory = time_it(lambda: index_page(index, filters, sort), args.runs)
+            print(f"   {label:<24} sql {sql:7.3f} ms   index {memory:7.3f} ms  ({sql / memory:6.1f}x)")
+
+if __name__ == '__main__':
+    main()
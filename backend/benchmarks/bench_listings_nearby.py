@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Nearby Listings Benchmark
+Radius search latency on a seeded listings table: loading every active
+listing and filtering by haversine in Python (the rank_nearby_sellers way),
+a full-scan SQL distance filter, and the grid-indexed /nearby query
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_listings_nearby.py --seed --listings 100000
+    python benchmarks/bench_listings_nearby.py --radii 2 10 50 --runs 20
+    python benchmarks/bench_listings_nearby.py --cleanup
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+from database.geo import HAVERSINE_SQL, haversine_km, install_geo_index
+from api.listings import build_nearby_query
+
+BENCH_TITLE_PREFIX = 'Bench nearby '
+SEARCH_POINT = (-1.2921, 36.8219)  # Nairobi
+
+def seed(listings):
+    """Insert synthetic active listings scattered over East Africa"""
+    print(f"🌱 Seeding {listings:,} listings with coordinates...")
+    started = time.perf_counter()
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO listings (title, energy_type, available_kwh, price_per_kwh, status, location,
+                                  latitude, longitude, created_at, updated_at)
+            SELECT %s || g,
+                   (ARRAY['Solar', 'Wind', 'Hydro', 'Biomass', 'Geothermal'])[1 + g %% 5],
+                   100 + (g %% 900), 0.10 + (g %% 40) / 100.0,
+                   CASE WHEN g %% 10 = 0 THEN 'inactive' ELSE 'active' END,
+                   'Bench location ' || (g %% 50),
+                   -4.5 + random() * 9.0, 33.5 + random() * 8.0,
+                   NOW(), NOW()
+            FROM generate_series(1, %s) g
+        """, (BENCH_TITLE_PREFIX, listings))
+        conn.commit()
+        cur.execute("ANALYZE listings")
+        conn.commit()
+    install_geo_index()
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+def cleanup():
+    with get_db_cursor() as (cur, conn):
+        cur.execute("DELETE FROM listings WHERE title LIKE %s", (BENCH_TITLE_PREFIX + '%',))
+        print(f"🧹 Removed {cur.rowcount:,} benchmark listings")
+        conn.commit()
+
+def python_filter(cur, radius_km):
+    """Load every active listing, then filter and sort by distance in Python"""
+    cur.execute("""
+        SELECT id, title, energy_type, available_kwh, price_per_kwh, status, location,
+               description, image_url, latitude, longitude, created_at, updated_at
+        FROM listings
+        WHERE status = 'active' AND latitude IS NOT NULL AND longitude IS NOT NULL
+    """)
+    lat, lon = SEARCH_POINT
+    nearby = []
+    for row in cur.fetchall():
+        distance = haversine_km(lat, lon, row['latitude'], row['longitude'])
+        if distance <= radius_km:
+            nearby.append((distance, row['id'], row))
+    nearby.sort(key=lambda item: (item[0], item[1]))
+    return [row['id'] for _, _, row in nearby]
+
+def full_scan(cur, radius_km):
+    """Exact distance filter in SQL without the grid/bounding-box prefilter"""
+    lat, lon = SEARCH_POINT
+    cur.execute(f"""
+        SELECT id FROM (
+            SELECT id, {HAVERSINE_SQL} AS distance_km
+            FROM listings
+            WHERE status = 'active' AND latitude IS NOT NULL AND longitude IS NOT NULL
+        ) candidates
+        WHERE distance_km <= %(radius_km)s
+        ORDER BY distance_km, id
+    """, {'lat': lat, 'lon': lon, 'radius_km': radius_km})
+    return [row['id'] for row in cur.fetchall()]
+
+def indexed(cur, radius_km):
+    query, params = build_nearby_query(SEARCH_POINT[0], SEARCH_POINT[1], radius_km)
+    cur.execute(query, params)
+    return [row['id'] for row in cur.fetchall()]
+
+def time_it(fn, radius_km, runs):
+    samples = []
+    with get_db_cursor() as (cur, conn):
+        result = fn(cur, radius_km)  # warm up caches
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn(cur, radius_km)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='insert the synthetic listings first')
+    parser.add_argument('--cleanup', action='store_true', help='delete the synthetic listings and exit')
+    parser.add_argument('--listings', type=int, default=100000)
+    parser.add_argument('--radii', type=float, nargs='+', default=[2, 10, 50])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.listings)
+
+    print("📍 Radius search latency around Nairobi (p50)")
+    for radius_km in args.radii:
+        slow, expected = time_it(python_filter, radius_km, max(1, args.runs // 5))
+        scan, scanned = time_it(full_scan, radius_km, args.runs)
+        fast, found = time_it(indexed, radius_km, args.runs)
+        assert found == expected == scanned, 'indexed search returned different listings'
+        print(f"   {radius_km:6.1f} km  {len(found):6,} hits   python {slow:9.2f} ms   "
+              f"sql scan {scan:8.2f} ms   grid index {fast:7.2f} ms  ({scan / fast:5.1f}x vs scan)")
+
+if __name__ == '__main__':
+    main()
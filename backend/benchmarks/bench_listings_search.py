@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Listing Search Benchmark
+First-page latency of /api/listings/search (tsvector + GIN, keyset paged,
+sorted by relevance or newest) against the LOWER(...) LIKE '%term%' scan it
+replaces, on a seeded listings table
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_listings_search.py --seed --listings 500000
+    python benchmarks/bench_listings_search.py --runs 20
+    python benchmarks/bench_listings_search.py --cleanup
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+from database.search import install_search_index, enable_fuzzy_location
+from api.listings import build_search_query, escape_like
+
+BENCH_TITLE_PREFIX = 'Bench search '
+PAGE_SIZE = 24
+
+# Rows per seeding transaction; the per-row dashboard counter trigger
+# rewrites one counter row per insert, which gets slow in huge transactions
+SEED_BATCH = 25000
+
+TITLE_WORDS = ['Solar', 'Wind', 'Hydro', 'Biogas', 'Geothermal', 'Rooftop', 'Community', 'Farm',
+               'Surplus', 'Battery', 'Microgrid', 'Turbine', 'Panel', 'Clean', 'Green', 'Village']
+LOCATIONS = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Malindi', 'Kitale',
+             'Garissa', 'Kakamega', 'Nyeri', 'Machakos', 'Meru', 'Kericho', 'Naivasha', 'Lamu']
+DESCRIPTION_WORDS = ['reliable', 'daytime', 'overnight', 'storage', 'grid', 'offgrid', 'certified',
+                     'excess', 'seasonal', 'contract', 'delivery', 'cooperative', 'school', 'clinic',
+                     'irrigation', 'pumping', 'lighting', 'cooling', 'milling', 'charging']
+
+# (label, q, location)
+SEARCHES = [
+    ('common word', 'solar', None),
+    ('two words', 'wind turbine', None),
+    ('word + place', 'geothermal naivasha', None),
+    ('rare combination', 'biogas clinic irrigation', None),
+    ('location only', None, 'Kisumu')
+]
+
+def seed(listings):
+    """Insert synthetic listings with word-list titles, locations and descriptions"""
+    print(f"🌱 Seeding {listings:,} listings (search trigger runs per row)...")
+    started = time.perf_counter()
+    for first in range(1, listings + 1, SEED_BATCH):
+        seed_batch(first, min(first + SEED_BATCH - 1, listings))
+    report = install_search_index()
+    with get_db_cursor() as (cur, conn):
+        conn.autocommit = True
+        try:
+            cur.execute("VACUUM ANALYZE listings")
+        finally:
+            conn.autocommit = False
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s (pg_trgm: {'yes' if report['trigram'] else 'no'})")
+
+def seed_batch(first, last):
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO listings (title, energy_type, available_kwh, price_per_kwh, status, location,
+                                  description, created_at, updated_at)
+            SELECT %(prefix)s || t1.w || ' ' || t2.w || ' ' || g,
+                   (ARRAY['Solar', 'Wind', 'Hydro', 'Biomass', 'Geothermal'])[1 + g %% 5],
+                   100 + (g %% 900), 0.10 + (g %% 40) / 100.0,
+                   CASE WHEN g %% 10 = 0 THEN 'inactive' ELSE 'active' END,
+                   loc.w || ' ' || (ARRAY['North', 'South', 'East', 'West', 'Central'])[1 + g %% 5],
+                   d1.w || ' ' || d2.w || ' energy for ' || d3.w || ' in ' || loc.w,
+                   NOW() - (g || ' seconds')::interval, NOW()
+            FROM generate_series(%(first)s, %(last)s) g
+            CROSS JOIN LATERAL (SELECT (%(titles)s::text[])[1 + abs(hashtext('t1' || g)) %% %(n_titles)s] AS w) t1
+            CROSS JOIN LATERAL (SELECT (%(titles)s::text[])[1 + abs(hashtext('t2' || g)) %% %(n_titles)s] AS w) t2
+            CROSS JOIN LATERAL (SELECT (%(locations)s::text[])[1 + abs(hashtext('loc' || g)) %% %(n_locations)s] AS w) loc
+            CROSS JOIN LATERAL (SELECT (%(words)s::text[])[1 + abs(hashtext('d1' || g)) %% %(n_words)s] AS w) d1
+            CROSS JOIN LATERAL (SELECT (%(words)s::text[])[1 + abs(hashtext('d2' || g)) %% %(n_words)s] AS w) d2
+            CROSS JOIN LATERAL (SELECT (%(words)s::text[])[1 + abs(hashtext('d3' || g)) %% %(n_words)s] AS w) d3
+        """, {
+            'prefix': BENCH_TITLE_PREFIX, 'first': first, 'last': last,
+            'titles': TITLE_WORDS, 'n_titles': len(TITLE_WORDS),
+            'locations': LOCATIONS, 'n_locations': len(LOCATIONS),
+            'words': DESCRIPTION_WORDS, 'n_words': len(DESCRIPTION_WORDS)
+        })
+        conn.commit()
+
+def cleanup():
+    with get_db_cursor() as (cur, conn):
+        cur.execute("DELETE FROM listings WHERE title LIKE %s", (BENCH_TITLE_PREFIX + '%',))
+        print(f"🧹 Removed {cur.rowcount:,} benchmark listings")
+        conn.commit()
+
+def like_scan(cur, text, location):
+    """The unindexed approach: every word as a LOWER(...) LIKE '%word%' over all three columns"""
+    conditions, params = [], []
+    for word in (text or '').split():
+        conditions.append("(LOWER(title) LIKE %s OR LOWER(description) LIKE %s OR LOWER(location) LIKE %s)")
+        params.extend([f"%{escape_like(word.lower())}%"] * 3)
+    if location:
+        conditions.append("LOWER(location) LIKE LOWER(%s)")
+        params.append(f"%{escape_like(location)}%")
+    cur.execute(f"""
+        SELECT id FROM listings
+        WHERE {' AND '.join(conditions)}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """, params + [PAGE_SIZE + 1])
+    return [row['id'] for row in cur.fetchall()]
+
+def indexed_search(cur, text, location, sort='relevance'):
+    query, params = build_search_query(
+        text=text, location=location, sort=sort, limit=PAGE_SIZE + 1,
+        fuzzy_location=bool(location) and enable_fuzzy_location(cur)
+    )
+    cur.execute(query, params)
+    return [row['id'] for row in cur.fetchall()]
+
+def count_matches(cur, text, location):
+    query, params = build_search_query(text=text, location=location)
+    cur.execute(f"SELECT COUNT(*) AS count FROM ({query}) counted", params)
+    return cur.fetchone()['count']
+
+def time_it(cur, fn, text, location, runs):
+    fn(cur, text, location)  # warm up
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(cur, text, location)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='insert the synthetic listings first')
+    parser.add_argument('--cleanup', action='store_true', help='delete the synthetic listings and exit')
+    parser.add_argument('--listings', type=int, default=500000)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.listings)
+
+    with get_db_cursor() as (cur, conn):
+        cur.execute("SELECT COUNT(*) AS count FROM listings")
+        print(f"🔎 First page of {PAGE_SIZE} over {cur.fetchone()['count']:,} listings (p50)")
+        for label, text, location in SEARCHES:
+            matches = count_matches(cur, text, location)
+            scan = time_it(cur, like_scan, text, location, args.runs)
+            ranked = time_it(cur, indexed_search, text, location, args.runs)
+            newest = time_it(cur, lambda *a: indexed_search(*a, sort='newest'), text, location, args.runs)
+            print(f"   {label:<18} {matches:8,} matches   LIKE scan {scan:8.2f} ms   "
+                  f"ranked {ranked:8.2f} ms ({scan / ranked:6.1f}x)   newest {newest:8.2f} ms ({scan / newest:6.1f}x)")
+
+if __name__ == '__main__':
+    main()
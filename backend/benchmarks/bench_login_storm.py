@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Login Storm Load Test
+Marketplace listing-read latency while a burst of logins hits the same
+server, with password hashing inline in the request threads
+(PASSWORD_HASH_WORKERS=0, the old behaviour) against the bounded hashing
+pool (passwords.py). Each mode is started as a real gunicorn server with
+threaded workers, measured for --duration seconds of reads alone, then for
+--duration seconds of reads plus --login-clients clients logging in
+back to back.
+
+Usage (needs DATABASE_URL and gunicorn):
+    python benchmarks/bench_login_storm.py --workers 2 --threads 16 --login-clients 32
+    python benchmarks/bench_login_storm.py --modes pool --hash-workers 2 --max-pending 4
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+import subprocess
+from collections import Counter
+
+# Add the backend directory to the Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import httpx
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=16, help='request threads per worker')
+    parser.add_argument('--read-clients', type=int, default=8, help='concurrent listing readers')
+    parser.add_argument('--login-clients', type=int, default=32, help='concurrent clients logging in during the storm')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per phase')
+    parser.add_argument('--hash-workers', type=int, default=1, help='PASSWORD_HASH_WORKERS in pool mode')
+    parser.add_argument('--max-pending', type=int, default=8, help='PASSWORD_HASH_MAX_PENDING in pool mode')
+    parser.add_argument('--read-path', default='/api/listings/?limit=24', help='GET path the readers request')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--modes', default='inline,pool', help='comma separated: inline, pool')
+    parser.add_argument('--email', default='bench_login@example.com')
+    return parser.parse_args()
+
+def server_command(args):
+    return [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers),
+            '--worker-class', 'gthread', '--threads', str(args.threads),
+            '--bind', f'127.0.0.1:{args.port}', '--timeout', '120', '--log-level', 'warning', 'app:app']
+
+def server_env(mode, args):
+    env = dict(os.environ)
+    env.update({
+        'PASSWORD_HASH_WORKERS': '0' if mode == 'inline' else str(args.hash_workers),
+        'PASSWORD_HASH_MAX_PENDING': str(args.max_pending),
+        # Every read must reach the database, as on a cache miss
+        'CACHE_BACKEND': 'none',
+    })
+    return env
+
+async def wait_until_ready(base_url, process, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f'server exited with {process.returncode}')
+            try:
+                if (await client.get(f'{base_url}/api/health')).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError('server did not become ready')
+
+async def ensure_user(client, base_url, email):
+    await client.post(f'{base_url}/api/auth/register', json={
+        'firstName': 'Bench', 'lastName': 'Login', 'email': email,
+        'password': 'bench-password', 'role': 'consumer'
+    })
+
+async def run_phase(client, base_url, args, login_clients):
+    """Read latencies (seconds) and login (status, seconds) samples for one phase"""
+    reads, logins = [], []
+    deadline = time.monotonic() + args.duration
+
+    async def reader():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = (await client.get(f'{base_url}{args.read_path}')).status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                reads.append(time.perf_counter() - started)
+
+    async def login():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = (await client.post(f'{base_url}/api/auth/login', json={
+                    'email': args.email, 'password': 'bench-password'
+                })).status_code
+            except httpx.HTTPError:
+                status = 'error'
+            logins.append((status, time.perf_counter() - started))
+            if status == 503:
+                # A real client backs off instead of retrying at once
+                await asyncio.sleep(0.1)
+
+    await asyncio.gather(*[reader() for _ in range(args.read_clients)],
+                         *[login() for _ in range(login_clients)])
+    return reads, logins
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def report_reads(label, reads, duration):
+    if not reads:
+        raise RuntimeError(f'no successful reads of --read-path during "{label}"')
+    ms = [r * 1000 for r in reads]
+    print(f"      {label:<14} reads {len(ms) / duration:7.1f}/s   p50 {statistics.median(ms):7.1f} ms   "
+          f"p95 {percentile(ms, 0.95):7.1f} ms   p99 {percentile(ms, 0.99):7.1f} ms")
+    return percentile(ms, 0.95)
+
+def report_logins(logins, duration):
+    statuses = Counter(status for status, _ in logins)
+    ok = [seconds * 1000 for status, seconds in logins if status == 200]
+    busy = [seconds * 1000 for status, seconds in logins if status == 503]
+    line = f"      logins: {statuses.get(200, 0) / duration:6.1f}/s ok"
+    if ok:
+        line += f" (p50 {statistics.median(ok):.0f} ms)"
+    if busy:
+        line += f", {len(busy)} answered 503 (p50 {statistics.median(busy):.1f} ms)"
+    others = {status: count for status, count in statuses.items() if status not in (200, 503)}
+    if others:
+        line += f", other {others}"
+    print(line)
+
+async def bench_mode(mode, args):
+    base_url = f'http://127.0.0.1:{args.port}'
+    process = subprocess.Popen(server_command(args), cwd=BACKEND_DIR, env=server_env(mode, args))
+    connections = args.read_clients + args.login_clients
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    try:
+        await wait_until_ready(base_url, process)
+        async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+            await ensure_user(client, base_url, args.email)
+            print(f"   {mode}")
+            reads, _ = await run_phase(client, base_url, args, 0)
+            before = report_reads('reads only', reads, args.duration)
+            reads, logins = await run_phase(client, base_url, args, args.login_clients)
+            during = report_reads('login storm', reads, args.duration)
+            report_logins(logins, args.duration)
+            print(f"      read p95 during the storm: x{during / before:.1f}")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    args = parse_args()
+    # Keep per-request client logging out of the report
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    print(f"🔐 {args.workers} workers x {args.threads} threads, {args.read_clients} readers, "
+          f"{args.login_clients} login clients, {args.duration:.0f}s per phase")
+    for mode in args.modes.split(','):
+        asyncio.run(bench_mode(mode, args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Purchase Contention Stress Test
+Hundreds of concurrent purchasers (plus duplicate retries sharing an
+idempotency key) race for one hot listing through the purchase engine.
+Checks that no kWh is oversold and no keyed retry is charged twice, and
+reports throughput. --compare-naive runs the old read-then-write pattern
+on a second listing to show the oversell it allows.
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_purchase_contention.py
+    python benchmarks/bench_purchase_contention.py --buyers 500 --stock 600 --kwh 2 --compare-naive
+    python benchmarks/bench_purchase_contention.py --cleanup
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Enough pooled connections for the purchasers; must stay below Postgres max_connections
+os.environ.setdefault('DB_POOL_SIZE', '20')
+os.environ.setdefault('DB_MAX_OVERFLOW', '40')
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+from purchases import PurchaseError, install_purchase_schema, purchase
+
+BENCH_EMAIL_DOMAIN = '@bench-purchase.invalid'
+BENCH_TITLE = 'Bench purchase hot listing'
+BUYER_ACCOUNTS = 25
+
+def setup(stock):
+    """Seller, buyer accounts and a fresh hot listing; returns (listing_id, buyer_ids)"""
+    install_purchase_schema()
+    with get_db_cursor() as (cur, conn):
+        ids = []
+        for i in range(BUYER_ACCOUNTS + 1):
+            cur.execute("""
+                INSERT INTO users (email, password_hash, role)
+                VALUES (%s, 'x', %s)
+                ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+                RETURNING id
+            """, (f'bench{i}{BENCH_EMAIL_DOMAIN}', 'supplier' if i == 0 else 'consumer'))
+            ids.append(cur.fetchone()['id'])
+        cur.execute("""
+            INSERT INTO listings (user_id, title, energy_type, available_kwh, price_per_kwh, status, location)
+            VALUES (%s, %s, 'Solar', %s, 0.15, 'active', 'Bench')
+            RETURNING id
+        """, (ids[0], BENCH_TITLE, stock))
+        listing_id = cur.fetchone()['id']
+        conn.commit()
+    return listing_id, ids[1:]
+
+def cleanup():
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            DELETE FROM transactions
+            WHERE listing_id IN (SELECT id FROM listings WHERE title = %s)
+        """, (BENCH_TITLE,))
+        transactions = cur.rowcount
+        cur.execute("DELETE FROM listings WHERE title = %s", (BENCH_TITLE,))
+        listings = cur.rowcount
+        cur.execute("DELETE FROM users WHERE email LIKE %s", ('%' + BENCH_EMAIL_DOMAIN,))
+        conn.commit()
+    print(f"🧹 Removed {listings} listings and {transactions:,} transactions")
+
+def engine_purchase(buyer_id, listing_id, kwh, key):
+    with get_db_cursor() as (cur, conn):
+        try:
+            receipt, replayed = purchase(cur, conn, buyer_id, listing_id, kwh, key)
+            return 'replayed' if replayed else 'bought'
+        except PurchaseError:
+            return 'refused'
+
+def naive_purchase(buyer_id, listing_id, kwh, key):
+    """The read-then-write pattern: check stock, then write back the value read earlier"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute("SELECT user_id, price_per_kwh, available_kwh FROM listings WHERE id = %s", (listing_id,))
+        listing = cur.fetchone()
+        if listing['available_kwh'] < kwh:
+            conn.rollback()
+            return 'refused'
+        cur.execute("UPDATE listings SET available_kwh = %s WHERE id = %s",
+                    (listing['available_kwh'] - kwh, listing_id))
+        cur.execute("""
+            INSERT INTO transactions (buyer_id, seller_id, listing_id, kwh_amount, total_price, status)
+            VALUES (%s, %s, %s, %s, %s, 'completed')
+        """, (buyer_id, listing['user_id'], listing_id, kwh, float(listing['price_per_kwh']) * kwh))
+        conn.commit()
+        return 'bought'
+
+def run(fn, listing_id, buyer_ids, args):
+    """
+    Fire every purchase at once; retry_share of purchases are sent twice
+    concurrently with the same idempotency key
+    """
+    rng = random.Random(7)
+    requests = []
+    for i in range(args.buyers):
+        key = uuid.uuid4().hex
+        buyer_id = buyer_ids[i % len(buyer_ids)]
+        requests.append((buyer_id, key))
+        if rng.random() < args.retry_share:
+            requests.append((buyer_id, key))
+    rng.shuffle(requests)
+
+    start = threading.Event()
+    latencies = []
+
+    def attempt(request):
+        buyer_id, key = request
+        start.wait()
+        started = time.perf_counter()
+        outcome = fn(buyer_id, listing_id, args.kwh, key)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return outcome
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        futures = [pool.submit(attempt, request) for request in requests]
+        time.sleep(0.5)  # let the pool spin up its threads
+        started = time.perf_counter()
+        start.set()
+        outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    return requests, outcomes, elapsed, latencies
+
+def verify(listing_id, stock):
+    with get_db_cursor() as (cur, conn):
+        cur.execute("SELECT available_kwh, status FROM listings WHERE id = %s", (listing_id,))
+        listing = cur.fetchone()
+        cur.execute("""
+            SELECT COUNT(*) AS count, COALESCE(SUM(kwh_amount), 0) AS sold,
+                   COUNT(idempotency_key) - COUNT(DISTINCT (buyer_id, idempotency_key)) AS duplicate_keys
+            FROM transactions
+            WHERE listing_id = %s
+        """, (listing_id,))
+        totals = cur.fetchone()
+    return listing, totals
+
+def report(label, requests, outcomes, elapsed, latencies):
+    counts = {name: outcomes.count(name) for name in ('bought', 'replayed', 'refused')}
+    latencies.sort()
+    print(f"   {label}: {len(requests):,} requests in {elapsed:.2f}s "
+          f"({len(requests) / elapsed:,.0f} req/s, p50 {statistics.median(latencies):.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms)")
+    print(f"      bought {counts['bought']:,}, replayed {counts['replayed']:,}, refused {counts['refused']:,}")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--buyers', type=int, default=300, help='distinct purchases to attempt')
+    parser.add_argument('--stock', type=float, default=500, help='kWh on the hot listing')
+    parser.add_argument('--kwh', type=float, default=3, help='kWh per purchase')
+    parser.add_argument('--threads', type=int, default=200, help='concurrent purchasers')
+    parser.add_argument('--retry-share', type=float, default=0.2, help='share of purchases retried with the same key')
+    parser.add_argument('--compare-naive', action='store_true', help='also run the read-then-write pattern')
+    parser.add_argument('--cleanup', action='store_true', help='delete benchmark rows and exit')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    listing_id, buyer_ids = setup(args.stock)
+    print(f"🔥 {args.buyers:,} purchasers x {args.kwh:g} kWh against one listing with {args.stock:g} kWh")
+    requests, outcomes, elapsed, latencies = run(engine_purchase, listing_id, buyer_ids, args)
+    counts = report('purchase engine', requests, outcomes, elapsed, latencies)
+
+    listing, totals = verify(listing_id, args.stock)
+    sold = float(totals['sold'])
+    remaining = float(listing['available_kwh'])
+    expected_sales = min(args.buyers, int(args.stock // args.kwh))
+    assert remaining >= 0, f'negative stock: {remaining}'
+    assert abs(sold + remaining - args.stock) < 1e-6, f'sold {sold} + remaining {remaining} != stock {args.stock}'
+    assert totals['count'] == counts['bought'] == expected_sales, (totals['count'], counts['bought'], expected_sales)
+    assert totals['duplicate_keys'] == 0, 'an idempotency key was charged twice'
+    print(f"✅ No oversell: sold {sold:g} kWh, {remaining:g} left (listing {listing['status']}), "
+          f"{counts['replayed']:,} retries answered without a second charge")
+
+    if args.compare_naive:
+        naive_listing, _ = setup(args.stock)
+        requests, outcomes, elapsed, latencies = run(naive_purchase, naive_listing, buyer_ids, args)
+        report('read-then-write', requests, outcomes, elapsed, latencies)
+        listing, totals = verify(naive_listing, args.stock)
+        oversold = float(totals['sold']) - args.stock
+        print(f"⚠️  Read-then-write sold {float(totals['sold']):g} kWh of {args.stock:g} "
+              f"({max(oversold, 0):g} kWh oversold), stock column says {float(listing['available_kwh']):g} left")
+
+    cleanup()
+
+if __name__ == '__main__':
+    main()
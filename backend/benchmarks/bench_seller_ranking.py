@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Seller Ranking Benchmark
+Compares the previous per-listing ranking loop with the batched NumPy engine
+behind AIService.rank_nearby_sellers, after checking both produce the same
+ordering and scores on a fixture set
+
+No database needed.
+
+Usage:
+    python benchmarks/bench_seller_ranking.py
+    python benchmarks/bench_seller_ranking.py --sizes 10000 100000 --top-k 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seller_ranking import SellerRankingEngine, energy_type_scores
+
+USER_LOCATION = (-1.2921, 36.8219)  # Nairobi
+ENERGY_TYPES = ['Solar', 'Wind', 'Hydro', 'Geothermal', 'Biomass', 'Tidal']
+
+def make_listings(count, seed=42):
+    """Synthetic listings around East Africa; prices on a 0.005 grid to hit rounding edges"""
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i,
+            'title': f'Listing {i}',
+            'energy_type': rng.choice(ENERGY_TYPES),
+            'price_per_kwh': round(rng.randrange(5, 120) * 0.005, 3),
+            'available_kwh': rng.choice([50, 99, 100, 250, 499, 500, 750, 999, 1000, 5000]),
+            'latitude': rng.uniform(-4.5, 4.5),
+            'longitude': rng.uniform(33.5, 41.5)
+        }
+        for i in range(count)
+    ]
+
+def legacy_rank(user_location, listings):
+    """The previous implementation: per-listing helpers, dict splat, full sort"""
+    def calculate_distance(point1, point2):
+        from math import radians, cos, sin, asin, sqrt
+        lat1, lon1 = point1
+        lat2, lon2 = point2
+        dlat = radians(lat2 - lat1)
+        dlon = radians(lon2 - lon1)
+        a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+        return 6371 * 2 * asin(sqrt(a))
+
+    def price_score(price):
+        if price <= 0.10:
+            return 1.0
+        elif price >= 0.50:
+            return 0.0
+        return 1.0 - ((price - 0.10) / 0.40)
+
+    def availability_score(available_kwh):
+        if available_kwh >= 1000:
+            return 1.0
+        elif available_kwh >= 500:
+            return 0.8
+        elif available_kwh >= 100:
+            return 0.6
+        return 0.4
+
+    def energy_type_score(energy_type):
+        return {'solar': 1.0, 'wind': 0.9, 'hydro': 0.8, 'geothermal': 0.9, 'biomass': 0.7}.get(energy_type.lower(), 0.5)
+
+    ranked = []
+    for listing in listings:
+        distance = calculate_distance(user_location, (listing['latitude'], listing['longitude']))
+        p = price_score(listing['price_per_kwh'])
+        a = availability_score(listing['available_kwh'])
+        e = energy_type_score(listing['energy_type'])
+        ai_score = (p * 0.4 + a * 0.3 + e * 0.3)
+        ranked.append({
+            **listing,
+            'distance_km': round(distance, 2),
+            'ai_score': round(ai_score, 2),
+            'price_score': p,
+            'availability_score': a,
+            'energy_type_score': e
+        })
+    ranked.sort(key=lambda x: x['ai_score'], reverse=True)
+    return ranked
+
+def check_equivalence(engine, listings, top_k):
+    expected = legacy_rank(USER_LOCATION, listings)
+    actual = engine.rank(USER_LOCATION, listings)
+    assert [l['id'] for l in actual] == [l['id'] for l in expected], 'ordering differs from legacy ranking'
+    for got, want in zip(actual, expected):
+        assert got['ai_score'] == want['ai_score'], (got['id'], got['ai_score'], want['ai_score'])
+        assert abs(got['distance_km'] - want['distance_km']) <= 0.01, (got['id'], got['distance_km'], want['distance_km'])
+    top = engine.rank(USER_LOCATION, listings, top_k)
+    assert [l['id'] for l in top] == [l['id'] for l in expected[:top_k]], 'top-k differs from legacy ranking'
+    print(f"✅ Identical ordering on {len(listings):,} fixture listings (full and top-{top_k})")
+
+def time_it(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--fixture-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = SellerRankingEngine()
+    check_equivalence(engine, make_listings(args.fixture_size, seed=7), args.top_k)
+
+    print("📊 Ranking throughput (median of runs)")
+    for size in args.sizes:
+        listings = make_listings(size)
+        legacy = time_it(lambda: legacy_rank(USER_LOCATION, listings), args.runs)
+        batched = time_it(lambda: engine.rank(USER_LOCATION, listings), args.runs)
+        top_k = time_it(lambda: engine.rank(USER_LOCATION, listings, args.top_k), args.runs)
+
+        # Scoring pass alone, for callers that already hold columnar arrays
+        columns = [np.array([listing[field] for listing in listings], dtype=np.float64)
+                   for field in ('latitude', 'longitude', 'price_per_kwh', 'available_kwh')]
+        columns.append(energy_type_scores([listing['energy_type'] for listing in listings]))
+        columnar = time_it(lambda: engine.top_indices(engine.score_columns(USER_LOCATION, *columns)['ai_score'], args.top_k), args.runs)
+
+        print(f"{size:>8,} listings")
+        print(f"   legacy loop            {legacy * 1000:9.1f} ms  {size / legacy:>12,.0f} listings/s")
+        print(f"   numpy, full ranking    {batched * 1000:9.1f} ms  {size / batched:>12,.0f} listings/s  ({legacy / batched:5.1f}x)")
+        print(f"   numpy, top-{args.top_k:<3}        {top_k * 1000:9.1f} ms  {size / top_k:>12,.0f} listings/s  ({legacy / top_k:5.1f}x)")
+        print(f"   numpy, columnar top-{args.top_k:<3}{columnar * 1000:9.1f} ms  {size / columnar:>12,.0f} listings/s  ({legacy / columnar:5.1f}x)")
+
+if __name__ == '__main__':
+    main()
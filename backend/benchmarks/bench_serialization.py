@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Serialization Benchmark
+Rows/sec for turning one page of database rows into a JSON body, per
+endpoint response shape: the old hand-built dicts encoded by Flask's default
+provider against the compiled RowSerializers encoded by api.serialization
+(orjson when installed; run with JSON_ENCODER=json to time the fallback).
+Checks both paths decode to the same JSON first. Needs no database.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 100 --seconds 1
+    JSON_ENCODER=json python benchmarks/bench_serialization.py
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from api.serialization import (
+    ENCODER_NAME, encode, LISTING, NEARBY_LISTING, SEARCH_LISTING, TRANSACTION, SALE, USER
+)
+
+def make_rows(count):
+    """psycopg2-shaped rows: NUMERIC as Decimal, TIMESTAMP as naive datetime"""
+    base = datetime(2025, 6, 1, 12, 0, 0, 123456)
+    rows = []
+    for i in range(count):
+        created = base - timedelta(minutes=37 * i)
+        rows.append({
+            'id': i + 1,
+            'title': f'Rooftop solar surplus {i}',
+            'energy_type': ('Solar', 'Wind', 'Hydro', 'Biomass')[i % 4],
+            'available_kwh': Decimal(100 + i % 900),
+            'price_per_kwh': Decimal('0.15') + Decimal(i % 20) / 100,
+            'status': 'active',
+            'location': f'Nairobi {i % 50}',
+            'description': 'Daily surplus from a rooftop array, collected at the substation',
+            'image_url': f'/uploads/listings/{i}.jpg' if i % 3 else None,
+            'created_at': created,
+            'updated_at': created if i % 5 else None,
+            'latitude': -1.29 + i / 1000,
+            'longitude': 36.82 + i / 1000,
+            'distance_km': 0.731 * i,
+            'rank': 0.123456 / (i + 1),
+            'kwh_amount': Decimal(1 + i % 20),
+            'total_price': Decimal(1 + i % 20) * Decimal('0.15'),
+            'listing_id': 1 + i % 50,
+            'first_name': 'Amani',
+            'last_name': f'User {i}',
+            'name': None if i % 2 else f'Amani User {i}',
+            'email': f'user{i}@example.com',
+            'role': 'consumer' if i % 5 else 'supplier',
+        })
+    return rows
+
+# The per-row dicts the handlers built before the serialization layer
+def legacy_listing(listing):
+    return {
+        'id': listing['id'],
+        'title': listing['title'],
+        'energyType': listing['energy_type'],
+        'quantity': listing['available_kwh'],
+        'price': str(listing['price_per_kwh']),
+        'status': listing['status'],
+        'location': listing['location'],
+        'description': listing['description'],
+        'imageUrl': listing.get('image_url'),
+        'createdAt': listing['created_at'].isoformat() if listing['created_at'] else None,
+        'updatedAt': listing['updated_at'].isoformat() if listing['updated_at'] else None
+    }
+
+def legacy_nearby(listing):
+    return {
+        **legacy_listing(listing),
+        'latitude': listing['latitude'],
+        'longitude': listing['longitude'],
+        'distanceKm': round(float(listing['distance_km']), 2)
+    }
+
+def legacy_search(listing):
+    return {**legacy_listing(listing), 'rank': round(listing['rank'], 4)}
+
+def legacy_transaction(r):
+    return {
+        'id': r['id'],
+        'date': r['created_at'].isoformat() if r['created_at'] else None,
+        'location': r['location'],
+        'energyType': r['energy_type'],
+        'kwh': float(r['kwh_amount']),
+        'totalPrice': float(r['total_price']),
+    }
+
+def legacy_sale(r):
+    return {
+        'id': r['id'],
+        'date': r['created_at'].isoformat() if r['created_at'] else None,
+        'listingId': r['listing_id'],
+        'listingTitle': r['title'],
+        'location': r['location'],
+        'energyType': r['energy_type'],
+        'kwh': float(r['kwh_amount']),
+        'totalPrice': float(r['total_price']),
+    }
+
+def legacy_user(r):
+    return {
+        'id': r['id'],
+        'first_name': r['first_name'],
+        'last_name': r['last_name'],
+        'name': r['name'] or f"{r['first_name'] or ''} {r['last_name'] or ''}".strip(),
+        'email': r['email'],
+        'role': r['role'],
+        'location': r['location'],
+        'latitude': r['latitude'],
+        'longitude': r['longitude'],
+        'created_at': r['created_at'].isoformat() if r['created_at'] else None,
+        'updated_at': r['updated_at'].isoformat() if r['updated_at'] else None
+    }
+
+# (endpoint, legacy row builder, serializer)
+SHAPES = [
+    ('GET /api/listings/', legacy_listing, LISTING),
+    ('GET /api/listings/nearby', legacy_nearby, NEARBY_LISTING),
+    ('GET /api/listings/search', legacy_search, SEARCH_LISTING),
+    ('GET /api/transactions/me', legacy_transaction, TRANSACTION),
+    ('GET /api/transactions/sales', legacy_sale, SALE),
+    ('GET /api/users', legacy_user, USER),
+]
+
+def rows_per_second(fn, rows, seconds):
+    fn(rows)  # warm up
+    done = 0
+    started = time.perf_counter()
+    while True:
+        fn(rows)
+        done += len(rows)
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return done / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100, help='rows per response body (a page is 24-100)')
+    parser.add_argument('--seconds', type=float, default=1.0, help='time budget per measurement')
+    args = parser.parse_args()
+
+    flask_json = DefaultJSONProvider(Flask(__name__))
+    rows = make_rows(args.rows)
+
+    print(f"🧾 {args.rows} rows per body, encoder {ENCODER_NAME} (rows/sec, higher is better)")
+    for endpoint, legacy, serializer in SHAPES:
+        def before(page):
+            return flask_json.dumps({'status': 'success', 'data': [legacy(row) for row in page]})
+
+        def after(page):
+            return encode({'status': 'success', 'data': serializer.many(page)})
+
+        assert json.loads(before(rows)) == json.loads(after(rows)), f'{endpoint}: outputs differ'
+        old = rows_per_second(before, rows, args.seconds)
+        new = rows_per_second(after, rows, args.seconds)
+        print(f"   {endpoint:<28} {old:12,.0f} -> {new:12,.0f}   x{new / old:.1f}")
+
+if __name__ == '__main__':
+    main()
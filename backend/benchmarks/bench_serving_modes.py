@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Serving Mode Load Test
+Concurrent-request throughput of the sync deployment (gunicorn sync workers,
+app:app) against the async serving mode (uvicorn, asgi:app) with the same
+number of worker processes. Each mode is started as a real server backed by
+the fake LLM and the local Postgres in DATABASE_URL, then driven by
+--concurrency clients for --duration seconds with a mix of AI chats and
+marketplace listing reads.
+
+Usage (needs DATABASE_URL, gunicorn, uvicorn, asyncpg and asgiref):
+    python benchmarks/bench_serving_modes.py --workers 2 --concurrency 64 --latency 1.0
+    python benchmarks/bench_serving_modes.py --read-ratio 0   # chats only
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import logging
+import statistics
+import subprocess
+
+# Add the backend directory to the Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import httpx
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes in both modes')
+    parser.add_argument('--concurrency', type=int, default=64, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds of load per mode')
+    parser.add_argument('--read-ratio', type=float, default=0.5, help='share of requests that are listing reads')
+    parser.add_argument('--latency', type=float, default=1.0, help='fake LLM seconds per completion')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='fake LLM seconds between tokens')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--modes', default='sync,async', help='comma separated: sync, async')
+    parser.add_argument('--email', default='bench_serving@example.com')
+    return parser.parse_args()
+
+def server_command(mode, args):
+    bind_port = str(args.port)
+    if mode == 'sync':
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers),
+                '--bind', f'127.0.0.1:{bind_port}', '--timeout', '120', '--log-level', 'warning', 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(args.workers),
+            '--host', '127.0.0.1', '--port', bind_port, '--log-level', 'warning']
+
+def server_env(args):
+    env = dict(os.environ)
+    env.update({
+        'AI_FAKE_LLM': '1',
+        'AI_FAKE_LLM_LATENCY': str(args.latency),
+        'AI_FAKE_LLM_TOKEN_DELAY': str(args.token_delay),
+        # Every chat must reach the model, so keep the advice cache out of the measurement
+        'AI_CACHE_ENABLED': 'false',
+        'CACHE_BACKEND': 'none',
+    })
+    return env
+
+async def wait_until_ready(base_url, process, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f'server exited with {process.returncode}')
+            try:
+                if (await client.get(f'{base_url}/api/health')).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError('server did not become ready')
+
+async def run_load(base_url, token, args):
+    """[(kind, seconds, ok)] for every request issued before the deadline"""
+    samples = []
+    headers = {'Authorization': f'Bearer {token}'}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    deadline = time.monotonic() + args.duration
+    rng = random.Random(42)
+
+    async def client_loop(client, n):
+        i = 0
+        while time.monotonic() < deadline:
+            i += 1
+            started = time.perf_counter()
+            if rng.random() < args.read_ratio:
+                kind = 'read'
+                request = client.get(f'{base_url}/api/listings/', params={'limit': 24})
+            else:
+                kind = 'chat'
+                request = client.post(f'{base_url}/api/ai/chat', headers=headers,
+                                      json={'message': f'How much could solar save me? (client {n}, #{i})'})
+            try:
+                ok = (await request).status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            samples.append((kind, time.perf_counter() - started, ok))
+
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        await asyncio.gather(*(client_loop(client, n) for n in range(args.concurrency)))
+    return samples
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def report(mode, samples, elapsed):
+    results = {}
+    for kind in ('chat', 'read'):
+        kind_samples = [s for s in samples if s[0] == kind]
+        if not kind_samples:
+            continue
+        latencies = [s[1] * 1000 for s in kind_samples if s[2]]
+        errors = sum(1 for s in kind_samples if not s[2])
+        rate = len(latencies) / elapsed
+        results[kind] = rate
+        if latencies:
+            print(f"   {mode:<5} {kind:<4} {rate:8.1f} req/s   p50 {statistics.median(latencies):8.1f} ms   "
+                  f"p95 {percentile(latencies, 0.95):8.1f} ms   errors {errors}")
+        else:
+            print(f"   {mode:<5} {kind:<4} no successful requests   errors {errors}")
+    return results
+
+async def bench_mode(mode, token, args):
+    base_url = f'http://127.0.0.1:{args.port}'
+    process = subprocess.Popen(server_command(mode, args), cwd=BACKEND_DIR, env=server_env(args))
+    try:
+        await wait_until_ready(base_url, process)
+        started = time.monotonic()
+        samples = await run_load(base_url, token, args)
+        return report(mode, samples, time.monotonic() - started)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def create_bench_token(email):
+    from flask_jwt_extended import create_access_token
+    from werkzeug.security import generate_password_hash
+    from database.config import get_db_cursor
+    from app import app
+
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO users (first_name, last_name, name, email, password_hash, role, location)
+            VALUES ('Bench', 'Serving', 'Bench Serving', %s, %s, 'consumer', 'Nairobi, Kenya')
+            ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+            RETURNING id
+        """, (email, generate_password_hash('bench')))
+        user_id = cur.fetchone()['id']
+        conn.commit()
+
+    with app.app_context():
+        return create_access_token(identity=str(user_id))
+
+def main():
+    args = parse_args()
+    token = create_bench_token(args.email)
+    # Keep per-request client logging out of the report
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    print(f"🚦 {args.workers} workers, {args.concurrency} clients for {args.duration:.0f}s, "
+          f"{args.read_ratio:.0%} listing reads, fake LLM latency {args.latency}s")
+    results = {}
+    for mode in args.modes.split(','):
+        results[mode] = asyncio.run(bench_mode(mode, token, args))
+
+    if 'sync' in results and 'async' in results:
+        for kind in ('chat', 'read'):
+            before, after = results['sync'].get(kind), results['async'].get(kind)
+            if before and after:
+                print(f"   {kind} throughput: x{after / before:.1f} in async mode")
+
+if __name__ == '__main__':
+    main()
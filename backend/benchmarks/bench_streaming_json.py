@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON Benchmark
+Peak RSS and wall time for serializing a large listing-shaped result as one
+JSON document: the old fetchall + list of dicts + json.dumps path against the
+named-cursor streaming path (api/streaming.py). Rows come from
+generate_series, so nothing needs seeding; each mode runs in a fresh
+subprocess so its peak RSS is measured on its own
+
+Usage (point DATABASE_URL at any reachable database):
+    python benchmarks/bench_streaming_json.py --rows 1000000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Listing-shaped synthetic rows
+ROWS_QUERY = """
+    SELECT g AS id,
+           'Bench listing ' || g AS title,
+           (ARRAY['Solar', 'Wind', 'Hydro', 'Biomass'])[1 + g %% 4] AS energy_type,
+           (100 + g %% 900)::numeric AS available_kwh,
+           (0.10 + (g %% 20) / 100.0)::numeric AS price_per_kwh,
+           'active' AS status,
+           'Nairobi ' || (g %% 50) AS location,
+           'Daily surplus from a rooftop array, collected at the substation' AS description,
+           NULL::text AS image_url,
+           NOW()::timestamp - (g || ' seconds')::interval AS created_at,
+           NOW()::timestamp AS updated_at
+    FROM generate_series(1, %s) g
+"""
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / 2 ** 20
+
+def run_mode(mode, rows):
+    """Serialize every row in this process; returns (bytes written, seconds)"""
+    from database.config import get_db_cursor
+    from api.serialization import LISTING
+    from api.streaming import json_chunks, stream_query
+
+    started = time.perf_counter()
+    if mode == 'fetchall':
+        with get_db_cursor() as (cur, conn):
+            cur.execute(ROWS_QUERY, (rows,))
+            fetched = cur.fetchall()
+        data = [LISTING.text(row) for row in fetched]
+        body = json.dumps({'status': 'success', 'data': data, 'count': len(data)}, default=str)
+        size = len(body)
+    else:
+        size = 0
+        for chunk in json_chunks(stream_query(ROWS_QUERY, (rows,)), LISTING, envelope={'status': 'success'}):
+            size += len(chunk)
+    return size, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--mode', choices=['fetchall', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        baseline = peak_rss_mib()
+        size, elapsed = run_mode(args.mode, args.rows)
+        print(json.dumps({'size': size, 'elapsed': elapsed, 'baseline': baseline, 'peak': peak_rss_mib()}))
+        return
+
+    from api.serialization import ENCODER_NAME
+    print(f"📦 {args.rows:,} listing rows as one JSON document "
+          f"(encoder: {ENCODER_NAME})")
+    for mode, label in (('fetchall', 'fetchall + jsonify (old)'), ('stream', 'named cursor, streamed')):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode, '--rows', str(args.rows)],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(f"   {label:<26} {result['size'] / 2 ** 20:8.1f} MiB in {result['elapsed']:6.2f}s   "
+              f"peak RSS {result['peak']:7.1f} MiB (+{result['peak'] - result['baseline']:.1f} over imports)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Token Renewal Benchmark
+Throughput of renewing a session with POST /api/auth/refresh (signature
+check, revocation lookups and one revocation insert) against logging in
+again with POST /api/auth/login (user lookup and a full password
+verification), through the Flask test client in one process.
+
+Each refresh spends the previous refresh token, as a client would.
+
+Usage (needs DATABASE_URL; REVOCATION_BACKEND=memory keeps revocations in process):
+    python benchmarks/bench_token_refresh.py --requests 200
+    REVOCATION_BACKEND=memory python benchmarks/bench_token_refresh.py --threads 8
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='renewals per method and client thread')
+    parser.add_argument('--threads', type=int, default=1, help='concurrent client threads')
+    parser.add_argument('--email', default='bench_refresh@example.com')
+    parser.add_argument('--password', default='bench-password')
+    return parser.parse_args()
+
+def login(client, args):
+    response = client.post('/api/auth/login', json={'email': args.email, 'password': args.password})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def login_loop(args, _):
+    client = app.test_client()
+    for _ in range(args.requests):
+        login(client, args)
+
+def refresh_loop(args, refresh_token):
+    client = app.test_client()
+    for _ in range(args.requests):
+        response = client.post('/api/auth/refresh', headers={'Authorization': f'Bearer {refresh_token}'})
+        assert response.status_code == 200, response.get_json()
+        refresh_token = response.get_json()['refresh_token']
+
+def measure(loop, args, client):
+    # One session per client thread, logged in before the clock starts
+    refresh_tokens = [login(client, args)['refresh_token'] for _ in range(args.threads)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for future in [pool.submit(loop, args, token) for token in refresh_tokens]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return args.requests * args.threads / elapsed
+
+def main():
+    args = parse_args()
+    client = app.test_client()
+    # Created once; a second run gets 400 for the existing user
+    client.post('/api/auth/register', json={
+        'firstName': 'Bench', 'lastName': 'Refresh', 'email': args.email,
+        'password': args.password, 'role': 'consumer'
+    })
+
+    print(f"🔑 {args.requests} renewals x {args.threads} threads "
+          f"(revocation backend: {os.getenv('REVOCATION_BACKEND', 'postgres')})")
+    results = {}
+    for name, loop in (('login', login_loop), ('refresh', refresh_loop)):
+        results[name] = measure(loop, args, client)
+        print(f"   {name:<8} {results[name]:10,.1f} renewals/s   {1000 / results[name] * args.threads:8.2f} ms each")
+    print(f"   refresh throughput: x{results['refresh'] / results['login']:.0f} of login")
+
+if __name__ == '__main__':
+    main()
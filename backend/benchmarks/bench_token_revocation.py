@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Token Revocation Benchmark
+Memory and lookup cost of the revocation check run on every authenticated
+request, with --revoked tokens already logged out:
+
+- memory: the old per-process set of jtis against the Bloom filter each
+  worker keeps (revocation.py); the revocation list itself lives in the
+  shared backend
+- lookups: ns per check of a token that was never revoked (the common case)
+  and of a revoked one, through the RevocationStore and straight against
+  its backend, plus the measured false-positive rate
+
+The memory backend needs nothing; add --postgres to time the revoked_tokens
+table (needs DATABASE_URL; the benchmark's rows are removed afterwards).
+
+Usage:
+    python benchmarks/bench_token_revocation.py --revoked 100000
+    python benchmarks/bench_token_revocation.py --revoked 10000 --postgres
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import tracemalloc
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from revocation import BloomFilter, RevocationStore, MemoryRevocationBackend, PostgresRevocationBackend
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--revoked', type=int, default=100000, help='tokens revoked before measuring')
+    parser.add_argument('--lookups', type=int, default=200000, help='lookups per in-process measurement')
+    parser.add_argument('--backend-lookups', type=int, default=2000, help='lookups per database measurement')
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    parser.add_argument('--postgres', action='store_true', help='also time the revoked_tokens table')
+    return parser.parse_args()
+
+def new_jtis(count):
+    # Fresh str objects, as decoded from each request's token (their hash is not cached yet)
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+def traced_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, kept
+
+def ns_per_lookup(check, jtis):
+    started = time.perf_counter()
+    for jti in jtis:
+        check(jti)
+    return (time.perf_counter() - started) / len(jtis) * 1e9
+
+def report_memory(args):
+    revoked_text = [str(jti) for jti in new_jtis(args.revoked)]
+    set_bytes, _ = traced_bytes(lambda: {''.join(jti) for jti in revoked_text})
+    bloom_bytes, _ = traced_bytes(lambda: BloomFilter(args.revoked, args.error_rate))
+    print(f"🧠 In-process memory for {args.revoked:,} revoked tokens")
+    print(f"   set of jtis (old)        {set_bytes / 2 ** 20:8.2f} MiB   {set_bytes / args.revoked:6.1f} B/token")
+    print(f"   Bloom filter             {bloom_bytes / 2 ** 20:8.2f} MiB   {bloom_bytes / args.revoked:6.1f} B/token")
+
+def prime_store(backend, args):
+    expires_at = time.time() + 3600
+    revoked = new_jtis(args.revoked)
+    store = RevocationStore(backend, capacity=args.revoked, error_rate=args.error_rate,
+                            sync_interval=3600, rebuild_interval=3600)
+    for jti in revoked:
+        backend.revoke(jti, expires_at)
+    store.sync(rebuild=True)
+    return store, revoked
+
+def report_lookups(label, store, revoked, lookups, backend_lookups):
+    fresh = new_jtis(lookups)
+    through_store = ns_per_lookup(store.is_revoked, fresh)
+    backend_only = ns_per_lookup(store.backend.is_revoked, new_jtis(backend_lookups))
+    revoked_sample = revoked[:backend_lookups]
+    revoked_hits = ns_per_lookup(store.is_revoked, revoked_sample)
+    assert all(store.is_revoked(jti) for jti in revoked_sample[:100]), 'revoked token passed'
+    false_positives = sum(1 for jti in new_jtis(lookups) if jti in store._bloom) / lookups
+
+    bloom = store._bloom
+    print(f"   {label}: filter of {bloom.count:,} entries, capacity {bloom.capacity:,}, {bloom.nbytes / 2 ** 10:,.0f} KiB")
+    print(f"      not revoked, Bloom filter first   {through_store:12,.0f} ns")
+    print(f"      not revoked, backend only         {backend_only:12,.0f} ns   x{backend_only / through_store:,.1f}")
+    print(f"      revoked (filter hit + backend)    {revoked_hits:12,.0f} ns")
+    print(f"      false-positive rate               {false_positives:12.4%}   (target {store.error_rate:.2%})")
+
+def main():
+    args = parse_args()
+    report_memory(args)
+
+    print(f"⏱️  Lookup cost with {args.revoked:,} revoked tokens")
+    old = set(new_jtis(args.revoked))
+    print(f"   set of jtis (old, this worker only) {ns_per_lookup(old.__contains__, new_jtis(args.lookups)):10,.0f} ns")
+
+    store, revoked = prime_store(MemoryRevocationBackend(), args)
+    report_lookups('memory backend', store, revoked, args.lookups, args.lookups)
+
+    if args.postgres:
+        from database.config import get_db_cursor
+        from database.revocations import install_revoked_tokens
+        install_revoked_tokens()
+        backend = PostgresRevocationBackend()
+        store, revoked = prime_store(backend, args)
+        try:
+            report_lookups('postgres backend (revoked_tokens)', store, revoked, args.lookups, args.backend_lookups)
+        finally:
+            with get_db_cursor() as (cur, conn):
+                cur.execute("DELETE FROM revoked_tokens WHERE jti = ANY(%s)", (revoked,))
+                conn.commit()
+
+if __name__ == '__main__':
+    main()
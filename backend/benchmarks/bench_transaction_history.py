@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Transaction History Benchmark
+Latency of the keyset-paged /api/transactions/sales history (first page,
+deep page, date window) against the old unbounded query, the sales summary
+read from the per-user rollups against the old full aggregate, plus peak
+Python memory while streaming the full history as CSV and NDJSON
+
+Usage (point DATABASE_URL at a scratch database, never production):
+    python benchmarks/bench_transaction_history.py --seed --transactions 200000
+    python benchmarks/bench_transaction_history.py --runs 20
+    python benchmarks/bench_transaction_history.py --cleanup
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.config import get_db_cursor
+from database.rollups import SELLER, compute_user_totals
+
+BENCH_EMAIL_DOMAIN = '@bench-history.invalid'
+BENCH_TITLE = 'Bench history listing'
+BENCH_LISTINGS = 50
+
+# Rows per seeding transaction; the per-row dashboard counter trigger
+# rewrites one counter row per insert, which gets slow in huge transactions
+SEED_BATCH = 25000
+
+# The unbounded query the sales endpoint used to run
+LEGACY_SALES_QUERY = """
+    SELECT t.id, t.kwh_amount, t.total_price, t.created_at,
+           l.location, l.energy_type, l.title, l.id AS listing_id
+    FROM transactions t
+    JOIN listings l ON l.id = t.listing_id
+    WHERE t.seller_id = %s
+    ORDER BY t.created_at DESC, t.id DESC
+"""
+
+def bench_users():
+    """(seller_id, buyer_id), creating the accounts when missing"""
+    with get_db_cursor() as (cur, conn):
+        ids = []
+        for i, role in enumerate(['supplier', 'consumer']):
+            cur.execute("""
+                INSERT INTO users (email, password_hash, role)
+                VALUES (%s, 'x', %s)
+                ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+                RETURNING id
+            """, (f'bench{i}{BENCH_EMAIL_DOMAIN}', role))
+            ids.append(cur.fetchone()['id'])
+        conn.commit()
+    return ids[0], ids[1]
+
+def seed(transactions):
+    """One seller with BENCH_LISTINGS listings and `transactions` sales spread over two years"""
+    seller_id, buyer_id = bench_users()
+    print(f"🌱 Seeding {transactions:,} transactions for one seller...")
+    started = time.perf_counter()
+    with get_db_cursor() as (cur, conn):
+        cur.execute("""
+            INSERT INTO listings (user_id, title, energy_type, available_kwh, price_per_kwh, status, location)
+            SELECT %s, %s, 'Solar', 1000, 0.15, 'active', 'Bench ' || g
+            FROM generate_series(1, %s) g
+            RETURNING id
+        """, (seller_id, BENCH_TITLE, BENCH_LISTINGS))
+        listing_ids = [row['id'] for row in cur.fetchall()]
+        conn.commit()
+    for first in range(1, transactions + 1, SEED_BATCH):
+        with get_db_cursor() as (cur, conn):
+            cur.execute("""
+                INSERT INTO transactions (buyer_id, seller_id, listing_id, kwh_amount, total_price,
+                                          status, created_at, completed_at)
+                SELECT %(buyer)s, %(seller)s, (%(listings)s::int[])[1 + g %% %(n_listings)s],
+                       1 + g %% 20, (1 + g %% 20) * 0.15, 'completed',
+                       NOW() - (g * (730 * 86400.0 / %(total)s) || ' seconds')::interval, NOW()
+                FROM generate_series(%(first)s, %(last)s) g
+            """, {
+                'buyer': buyer_id, 'seller': seller_id, 'listings': listing_ids,
+                'n_listings': len(listing_ids), 'total': transactions,
+                'first': first, 'last': min(first + SEED_BATCH - 1, transactions)
+            })
+            conn.commit()
+    with get_db_cursor() as (cur, conn):
+        conn.autocommit = True
+        try:
+            cur.execute("VACUUM ANALYZE transactions")
+        finally:
+            conn.autocommit = False
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+def cleanup():
+    transactions = 0
+    while True:
+        # Batched for the same reason as seeding
+        with get_db_cursor() as (cur, conn):
+            cur.execute("""
+                DELETE FROM transactions
+                WHERE id IN (
+                    SELECT id FROM transactions
+                    WHERE listing_id IN (SELECT id FROM listings WHERE title = %s)
+                    LIMIT %s
+                )
+            """, (BENCH_TITLE, SEED_BATCH))
+            deleted = cur.rowcount
+            conn.commit()
+        transactions += deleted
+        if not deleted:
+            break
+    with get_db_cursor() as (cur, conn):
+        cur.execute("DELETE FROM listings WHERE title = %s", (BENCH_TITLE,))
+        cur.execute("DELETE FROM users WHERE email LIKE %s", ('%' + BENCH_EMAIL_DOMAIN,))
+        conn.commit()
+    print(f"🧹 Removed {transactions:,} benchmark transactions")
+
+def time_it(fn, runs):
+    fn()  # warm up
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true', help='insert the synthetic history first')
+    parser.add_argument('--cleanup', action='store_true', help='delete the synthetic history and exit')
+    parser.add_argument('--transactions', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.transactions)
+
+    from flask_jwt_extended import create_access_token
+    from app import app
+
+    seller_id, _ = bench_users()
+    with app.app_context():
+        token = create_access_token(identity=str(seller_id))
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    with get_db_cursor() as (cur, conn):
+        cur.execute("SELECT COUNT(*) AS count FROM transactions WHERE seller_id = %s", (seller_id,))
+        total = cur.fetchone()['count']
+
+    def legacy():
+        with get_db_cursor() as (cur, conn):
+            cur.execute(LEGACY_SALES_QUERY, (seller_id,))
+            cur.fetchall()
+
+    def page(query_string):
+        response = client.get(f'/api/transactions/sales?{query_string}', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    # A cursor 100 pages deep
+    cursor = None
+    for _ in range(100):
+        cursor = page(f'limit=24&cursor={cursor}' if cursor else 'limit=24')['pagination']['nextCursor']
+
+    print(f"📜 Sales history of one seller with {total:,} transactions (p50)")
+    print(f"   unbounded query (old)     {time_it(legacy, max(1, args.runs // 5)):9.2f} ms")
+    print(f"   first page                {time_it(lambda: page('limit=24'), args.runs):9.2f} ms")
+    print(f"   page 101                  {time_it(lambda: page(f'limit=24&cursor={cursor}'), args.runs):9.2f} ms")
+    print(f"   30-day window, first page {time_it(lambda: page('limit=24&from=2025-01-01&to=2025-01-30'), args.runs):9.2f} ms")
+
+    def legacy_summary():
+        with get_db_cursor() as (cur, conn):
+            compute_user_totals(cur, seller_id, SELLER)
+
+    def summary(path):
+        response = client.get(f'/api/transactions/sales/{path}', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    source = summary('summary')['freshness']['source']
+    print(f"   summary aggregate (old)   {time_it(legacy_summary, args.runs):9.2f} ms")
+    print(f"   summary ({source:<7})         {time_it(lambda: summary('summary'), args.runs):9.2f} ms")
+    print(f"   90 daily buckets          "
+          f"{time_it(lambda: summary('summary/daily?from=2025-01-01&to=2025-03-31'), args.runs):9.2f} ms")
+
+    def export(fmt):
+        response = client.get(f'/api/transactions/sales/export?format={fmt}', headers=headers, buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return size
+
+    for fmt in ('csv', 'ndjson'):
+        started = time.perf_counter()
+        size = export(fmt)
+        elapsed = time.perf_counter() - started
+        # Second pass under tracemalloc, which slows the export down too much to time
+        tracemalloc.start()
+        export(fmt)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"   export {fmt:<6} {size / 2 ** 20:8.1f} MiB in {elapsed:6.2f}s   "
+              f"peak Python memory {peak / 2 ** 20:6.1f} MiB")
+
+    tracemalloc.start()
+    legacy()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   unbounded fetchall (old)                    peak Python memory {peak / 2 ** 20:6.1f} MiB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+User Context Benchmark
+Database queries and latency per request for the endpoints that resolve the
+authenticated user (GET /api/auth/profile and the AI chat context), with:
+
+- uncached: USER_CONTEXT_TTL=0, one users lookup per request (the old behaviour)
+- cached: the per-worker LRU (user_context.py)
+- claims: role/location read from access-token claims (USER_CONTEXT_CLAIMS)
+
+Requests go through the Flask test client in one process; queries are counted
+on the SQLAlchemy engine, and chat context is built without calling the model.
+
+Usage (needs DATABASE_URL):
+    python benchmarks/bench_user_context.py --requests 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+from sqlalchemy import event
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import user_context
+from app import app
+from models import db
+from auth_tokens import issue_tokens
+from api.ai import build_chat_input
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per endpoint and mode')
+    parser.add_argument('--email', default='bench_context@example.com')
+    return parser.parse_args()
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+def ensure_user(client, email):
+    client.post('/api/auth/register', json={
+        'firstName': 'Bench', 'lastName': 'Context', 'email': email,
+        'password': 'bench-password', 'role': 'consumer', 'location': 'Nairobi, Kenya'
+    })
+    with app.app_context():
+        return user_context.get_user_context(db.session.execute(
+            db.text('SELECT id FROM users WHERE email = :email'), {'email': email}
+        ).scalar_one())
+
+@jwt_required()
+def chat_context_view():
+    # The part of /api/ai/chat that resolves the user, without the model call
+    return build_chat_input(int(get_jwt_identity()), 'How much could solar save me?')
+
+def measure(client, queries, path, headers, requests):
+    before = queries.count
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.get_json()
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e6, (queries.count - before) / requests
+
+def main():
+    args = parse_args()
+    app.add_url_rule('/bench/chat-context', 'bench_chat_context', chat_context_view)
+    client = app.test_client()
+    user = ensure_user(client, args.email)
+    with app.app_context():
+        queries = QueryCounter(db.engine)
+
+    print(f"👤 {args.requests} requests per endpoint")
+    for mode in ('uncached', 'cached', 'claims'):
+        user_context.USER_CONTEXT_TTL = 0 if mode == 'uncached' else 30
+        user_context.USER_CONTEXT_CLAIMS = mode == 'claims'
+        user_context._cache.clear()
+        with app.app_context():
+            headers = {'Authorization': f"Bearer {issue_tokens(user['id'], context=user)['access_token']}"}
+        for label, path in (('profile', '/api/auth/profile'), ('chat ctx', '/bench/chat-context')):
+            micros, per_request = measure(client, queries, path, headers, args.requests)
+            print(f"   {mode:<9} {label:<9} {micros:8.0f} us/request   {per_request:5.2f} queries/request")
+
+    stats = user_context.get_user_context_stats()
+    print(f"   hit ratio over all modes: {stats['hitRatio']:.1%} "
+          f"({stats['cacheHits']} cache, {stats['claimHits']} claims, {stats['databaseLoads']} loads)")
+
+if __name__ == '__main__':
+    main()
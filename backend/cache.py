@@ -0,0 +1,283 @@
+"""
+Response Cache
+TTL + LRU cache for read-heavy public endpoints with namespace invalidation
+
+Backends:
+    memory - per-process LRU (default)
+    redis  - shared across workers/nodes (requires the `redis` package and CACHE_REDIS_URL)
+    none   - caching disabled
+
+Invalidation bumps a per-namespace generation number that is part of every
+key, so clearing a namespace is O(1) on every backend and stale entries just
+age out through TTL/LRU eviction. With the memory backend a generation bump
+only reaches the worker that handled the write; views behind conditional_get
+also key on the resource versions it read (flask.g.resource_versions), which
+every write bumps in the database, so all workers miss after a change.
+"""
+
+import os
+import time
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, make_response, Response
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._counters = {}         # never evicted, so namespace generations cannot reset
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sets = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self.sets += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'sets': self.sets
+            }
+
+class RedisCache:
+    """Shared cache backed by Redis; TTL and eviction are handled by the server"""
+
+    def __init__(self, url, prefix='ecohub:cache:'):
+        import redis  # optional dependency
+        self._client = redis.Redis.from_url(url)
+        # from_url does not connect; fail here so _build_backend can fall back
+        self._client.ping()
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+        with self._lock:
+            self.sets += 1
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def get_counter(self, key):
+        raw = self._client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return int(self._client.incr(self.prefix + key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': 'redis',
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'sets': self.sets
+            }
+        try:
+            info = self._client.info('stats')
+            stats['evictions'] = info.get('evicted_keys', 0)
+            stats['expirations'] = info.get('expired_keys', 0)
+        except Exception:
+            pass
+        return stats
+
+class ResponseCache:
+    """Caches serialized Flask responses keyed by namespace generation, route and query args"""
+
+    def __init__(self, backend=None, default_ttl=30):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _generation(self, namespace):
+        return self.backend.get_counter(f'gen:{namespace}')
+
+    def make_key(self, namespace, path, args, versions=None):
+        """Route + normalized query args (sorted, empty values dropped) + resource versions, if known"""
+        normalized = '&'.join(
+            f'{name}={value}'
+            for name, value in sorted(args.items(multi=True))
+            if value != ''
+        )
+        version_key = ','.join(f'{name}:{versions[name]}' for name in sorted(versions)) if versions else ''
+        return f'resp:{namespace}:{self._generation(namespace)}:{version_key}:{path}?{normalized}'
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl or self.default_ttl)
+
+    def invalidate(self, *namespaces):
+        """Invalidate every cached response in the given namespaces"""
+        if not self.enabled:
+            return
+        for namespace in namespaces:
+            try:
+                self.backend.incr(f'gen:{namespace}')
+                self.invalidations += 1
+            except Exception as e:
+                logger.warning(f"Cache invalidation failed for {namespace}: {e}")
+
+    def stats(self):
+        if not self.enabled:
+            return {'backend': 'none', 'enabled': False}
+        return {'enabled': True, 'invalidations': self.invalidations, **self.backend.stats()}
+
+def _build_backend():
+    backend = os.getenv('CACHE_BACKEND', 'memory').lower()
+    if backend == 'none':
+        return None
+    if backend == 'redis':
+        url = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        try:
+            return RedisCache(url)
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable ({e}); falling back to in-process LRU")
+    return LRUCache(max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '1024')))
+
+response_cache = ResponseCache(
+    backend=_build_backend(),
+    default_ttl=int(os.getenv('CACHE_DEFAULT_TTL', '30'))
+)
+
+def cached_response(namespace, ttl=None):
+    """
+    Cache successful (200) GET responses of a view
+    Writes that change the underlying data must call invalidate(namespace)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            try:
+                # Set by an outer conditional_get; keeps workers from serving a body older than its ETag
+                key = response_cache.make_key(namespace, request.path, request.args,
+                                              g.get('resource_versions'))
+                cached = response_cache.get(key)
+            except Exception as e:
+                logger.warning(f"Cache lookup failed: {e}")
+                return view(*args, **kwargs)
+
+            if cached is not None:
+                body, mimetype = cached
+                response = Response(body, status=200, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            # The key was built with the namespace generation read before the view ran,
+            # so a response computed across a concurrent write is stored under a
+            # generation that invalidate() has already retired
+            response = make_response(view(*args, **kwargs))
+            if is_cacheable_response(response):
+                try:
+                    response_cache.set(key, (response.get_data(), response.mimetype), ttl)
+                except Exception as e:
+                    logger.warning(f"Cache store failed: {e}")
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+def is_cacheable_response(response):
+    """Only complete 200 bodies that are not error envelopes"""
+    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return False
+    if response.is_json:
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict) and payload.get('status') == 'error':
+            return False
+    return True
+
+def invalidate(*namespaces):
+    """Drop cached responses for the given namespaces"""
+    response_cache.invalidate(*namespaces)
+
+def get_cache_stats():
+    """Hit/miss/eviction counters for monitoring"""
+    return response_cache.stats()
@@ -0,0 +1,53 @@
+"""
+AI Chat Jobs
+Shared job store behind ai_jobs.py. Each chat job's latest snapshot (state,
+and the answer once finished) is kept as one row until its TTL runs out, so
+a poll can be answered by any worker, not just the one running the job.
+"""
+
+from psycopg2.extras import Json
+from database.config import get_db_cursor
+
+AI_CHAT_JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS ai_chat_jobs (
+    job_id VARCHAR(64) PRIMARY KEY,
+    user_id INTEGER,
+    snapshot JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_chat_jobs_expires_at ON ai_chat_jobs (expires_at);
+"""
+
+def install_ai_chat_jobs():
+    """Create the ai_chat_jobs table and its index"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(AI_CHAT_JOBS_DDL)
+        conn.commit()
+    return True
+
+def upsert_chat_job(cur, job_id, user_id, snapshot, ttl):
+    """Store a job's snapshot, replacing the previous one; it expires ttl seconds from now"""
+    cur.execute("""
+        INSERT INTO ai_chat_jobs (job_id, user_id, snapshot, expires_at, updated_at)
+        VALUES (%s, %s, %s, now() + make_interval(secs => %s), now())
+        ON CONFLICT (job_id) DO UPDATE
+        SET snapshot = EXCLUDED.snapshot,
+            expires_at = EXCLUDED.expires_at,
+            updated_at = EXCLUDED.updated_at
+    """, (job_id, user_id, Json(snapshot), ttl))
+
+def read_chat_job(cur, job_id):
+    """(user_id, snapshot) of an unexpired job, or None"""
+    cur.execute("""
+        SELECT user_id, snapshot FROM ai_chat_jobs
+        WHERE job_id = %s AND expires_at > now()
+    """, (job_id,))
+    row = cur.fetchone()
+    return (row['user_id'], row['snapshot']) if row else None
+
+def purge_expired_chat_jobs(cur):
+    """Delete expired job rows; returns the number removed"""
+    cur.execute("DELETE FROM ai_chat_jobs WHERE expires_at <= now()")
+    return cur.rowcount
@@ -0,0 +1,81 @@
+"""
+Async Database Pool
+asyncpg connection pool for the async serving mode (asgi.py). Sized from the
+same DB_POOL_* settings as the psycopg2 pool in database/config.py.
+
+The pool belongs to the event loop that opened it: asgi.py opens it on
+lifespan startup and closes it on shutdown, one pool per uvicorn worker.
+Queries use asyncpg's $1, $2 placeholders and return Records, which index by
+column name like the RealDictCursor rows of the sync pool.
+"""
+
+import os
+import asyncio
+import logging
+from database.config import DatabaseConfig
+
+# asyncpg is only needed when serving through asgi.py
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_loop = None
+_pool_lock = None
+
+async def open_async_pool():
+    """Create this worker's pool on the running loop (idempotent)"""
+    global _pool, _pool_loop, _pool_lock
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    if asyncpg is None:
+        raise RuntimeError('asyncpg is not installed; it is required for the async serving mode')
+    if _pool_lock is None or _pool_loop is not loop:
+        _pool_lock = asyncio.Lock()
+        _pool_loop = loop
+        _pool = None
+    async with _pool_lock:
+        if _pool is None:
+            config = DatabaseConfig()
+            _pool = await asyncpg.create_pool(
+                config.DATABASE_URL,
+                min_size=max(config.POOL_SIZE, 0),
+                max_size=max(config.POOL_SIZE + config.MAX_OVERFLOW, config.POOL_SIZE, 1),
+                timeout=config.POOL_TIMEOUT,
+                max_inactive_connection_lifetime=config.POOL_RECYCLE,
+                command_timeout=float(os.getenv('DB_ASYNC_COMMAND_TIMEOUT', '30'))
+            )
+            logger.info(f"asyncpg pool opened (max {_pool.get_max_size()} connections)")
+    return _pool
+
+async def get_async_pool():
+    """The pool for the running loop, opened on first use"""
+    if _pool is not None and _pool_loop is asyncio.get_running_loop():
+        return _pool
+    return await open_async_pool()
+
+async def close_async_pool():
+    """Close the pool gracefully (lifespan shutdown)"""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+def get_async_pool_stats():
+    """Pool statistics for the current worker process"""
+    pool = _pool
+    if pool is None:
+        return {'pid': os.getpid(), 'initialized': False}
+    return {
+        'pid': os.getpid(),
+        'initialized': True,
+        'min_size': pool.get_min_size(),
+        'max_size': pool.get_max_size(),
+        'size': pool.get_size(),
+        'idle': pool.get_idle_size(),
+        'in_use': pool.get_size() - pool.get_idle_size()
+    }
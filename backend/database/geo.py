@@ -0,0 +1,147 @@
+"""
+Geospatial Grid Index
+Listings are indexed by a Z-order (Morton) grid cell computed from their
+latitude/longitude, so "within R km" becomes a handful of btree range scans
+over cells covering the search box, refined by an exact haversine distance
+in the same query. Plain Postgres: no PostGIS or extensions needed.
+
+A cell code interleaves GEO_CELL_BITS bits of quantized longitude and latitude;
+a cell at a coarser level is a contiguous range of full-resolution codes.
+"""
+
+import math
+from database.config import get_db_cursor
+
+EARTH_RADIUS_KM = 6371.0
+
+# Bits per axis (26 bits ~ 0.3 m of latitude); codes fit comfortably in BIGINT
+GEO_CELL_BITS = 26
+
+# Upper bound on range scans generated for one search
+MAX_CELL_RANGES = 16
+
+GEO_INDEX_DDL = f"""
+CREATE OR REPLACE FUNCTION listing_geo_cell(lat DOUBLE PRECISION, lon DOUBLE PRECISION)
+RETURNS BIGINT AS $$
+DECLARE
+    cells CONSTANT BIGINT := {1 << GEO_CELL_BITS};
+    lat_i BIGINT;
+    lon_i BIGINT;
+    code BIGINT := 0;
+BEGIN
+    IF lat IS NULL OR lon IS NULL THEN
+        RETURN NULL;
+    END IF;
+    lat_i := LEAST(GREATEST(FLOOR((lat + 90.0) / 180.0 * cells), 0), cells - 1)::BIGINT;
+    lon_i := LEAST(GREATEST(FLOOR((lon + 180.0) / 360.0 * cells), 0), cells - 1)::BIGINT;
+    FOR i IN 0..{GEO_CELL_BITS - 1} LOOP
+        code := code
+            | (((lat_i >> i) & 1) << (2 * i))
+            | (((lon_i >> i) & 1) << (2 * i + 1));
+    END LOOP;
+    RETURN code;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT PARALLEL SAFE;
+
+CREATE INDEX IF NOT EXISTS idx_listings_active_geo_cell
+    ON listings (listing_geo_cell(latitude, longitude))
+    WHERE status = 'active' AND latitude IS NOT NULL AND longitude IS NOT NULL;
+"""
+
+# Exact great-circle distance for the refinement step; %(lat)s / %(lon)s are the search point
+HAVERSINE_SQL = """
+    (2 * {radius} * ASIN(LEAST(1.0, SQRT(
+        POWER(SIN(RADIANS(latitude - %(lat)s) / 2), 2)
+        + COS(RADIANS(%(lat)s)) * COS(RADIANS(latitude))
+        * POWER(SIN(RADIANS(longitude - %(lon)s) / 2), 2)
+    ))))
+""".format(radius=EARTH_RADIUS_KM)
+
+def install_geo_index():
+    """Create the grid cell function and the partial index on active listings"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(GEO_INDEX_DDL)
+        conn.commit()
+    return True
+
+def _quantize(lat, lon):
+    cells = 1 << GEO_CELL_BITS
+    lat_i = min(max(math.floor((lat + 90.0) / 180.0 * cells), 0), cells - 1)
+    lon_i = min(max(math.floor((lon + 180.0) / 360.0 * cells), 0), cells - 1)
+    return lat_i, lon_i
+
+def _interleave(lat_i, lon_i, bits):
+    code = 0
+    for i in range(bits):
+        code |= ((lat_i >> i) & 1) << (2 * i)
+        code |= ((lon_i >> i) & 1) << (2 * i + 1)
+    return code
+
+def geo_cell(lat, lon):
+    """Full-resolution cell code; matches listing_geo_cell() in the database"""
+    return _interleave(*_quantize(lat, lon), GEO_CELL_BITS)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_boxes(lat, lon, radius_km):
+    """
+    Lat/lon boxes that contain every point within radius_km of (lat, lon)
+    Returns one box, or two when the circle crosses the antimeridian:
+    [(min_lat, max_lat, min_lon, max_lon), ...]
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(lat - dlat, -90.0)
+    max_lat = min(lat + dlat, 90.0)
+
+    # A box touching a pole spans every longitude
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    # Longitude half-width at the circle's widest point
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    if ratio >= 1.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    dlon = math.degrees(math.asin(ratio))
+
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+def covering_cell_ranges(boxes, max_ranges=MAX_CELL_RANGES):
+    """
+    Inclusive (low, high) cell code ranges covering the boxes, using the finest
+    grid level whose cell count stays within max_ranges; adjacent cells merge
+    """
+    for level in range(GEO_CELL_BITS, -1, -1):
+        shift = GEO_CELL_BITS - level
+        spans = []
+        for min_lat, max_lat, min_lon, max_lon in boxes:
+            lat_lo, lon_lo = _quantize(min_lat, min_lon)
+            lat_hi, lon_hi = _quantize(max_lat, max_lon)
+            spans.append((lat_lo >> shift, lat_hi >> shift, lon_lo >> shift, lon_hi >> shift))
+        count = sum((lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) for lat_lo, lat_hi, lon_lo, lon_hi in spans)
+        if count > max_ranges and level > 0:
+            continue
+
+        width = 2 * shift
+        prefixes = sorted({
+            _interleave(lat_i, lon_i, level)
+            for lat_lo, lat_hi, lon_lo, lon_hi in spans
+            for lat_i in range(lat_lo, lat_hi + 1)
+            for lon_i in range(lon_lo, lon_hi + 1)
+        })
+        ranges = []
+        for prefix in prefixes:
+            low, high = prefix << width, ((prefix + 1) << width) - 1
+            if ranges and ranges[-1][1] + 1 == low:
+                ranges[-1] = (ranges[-1][0], high)
+            else:
+                ranges.append((low, high))
+        return ranges
+    return [(0, (1 << (2 * GEO_CELL_BITS)) - 1)]
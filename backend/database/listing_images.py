@@ -0,0 +1,62 @@
+"""
+Listing Images
+One row per processed listing upload (listing_images.py): the original's
+dimensions and size after metadata stripping, and each generated variant.
+Listings keep their image_url; variant URLs are derived from it, so this
+table is only read for dimensions and processing status.
+"""
+
+import psycopg2
+import psycopg2.extras
+from database.config import get_db_cursor
+
+LISTING_IMAGES_DDL = """
+CREATE TABLE IF NOT EXISTS listing_images (
+    listing_id INTEGER PRIMARY KEY REFERENCES listings(id) ON DELETE CASCADE,
+    image_url VARCHAR(500) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    original_bytes INTEGER,
+    variants JSONB NOT NULL DEFAULT '{}'::jsonb,
+    error TEXT,
+    processing_ms INTEGER,
+    processed_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP
+);
+"""
+
+def install_listing_images():
+    """Create the listing_images table"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(LISTING_IMAGES_DDL)
+        conn.commit()
+    return True
+
+def record_listing_image(cur, listing_id, image_url, result):
+    """Store a processing result (see listing_images.process_image); replaces an earlier one"""
+    cur.execute("""
+        INSERT INTO listing_images
+            (listing_id, image_url, status, width, height, original_bytes, variants, error, processing_ms)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (listing_id) DO UPDATE SET
+            image_url = EXCLUDED.image_url, status = EXCLUDED.status,
+            width = EXCLUDED.width, height = EXCLUDED.height,
+            original_bytes = EXCLUDED.original_bytes, variants = EXCLUDED.variants,
+            error = EXCLUDED.error, processing_ms = EXCLUDED.processing_ms,
+            processed_at = LOCALTIMESTAMP
+    """, (
+        listing_id, image_url, result['status'], result.get('width'), result.get('height'),
+        result.get('bytes'), psycopg2.extras.Json(result.get('variants', {})),
+        result.get('error'), result.get('ms')
+    ))
+
+def read_image_dimensions(cur, listing_id):
+    """(width, height) of a listing's processed image, or None (also before the table exists)"""
+    try:
+        cur.execute("SELECT width, height FROM listing_images WHERE listing_id = %s AND status = 'ready'",
+                    (listing_id,))
+    except psycopg2.errors.UndefinedTable:
+        cur.connection.rollback()
+        return None
+    row = cur.fetchone()
+    return (row['width'], row['height']) if row else None
@@ -0,0 +1,238 @@
+"""
+Materialized Dashboard Counters
+Keeps the dashboard totals in a small summary table that triggers on
+users, listings and transactions update incrementally, so reading the
+dashboard is a single indexed lookup instead of several full-table aggregates
+
+Like resource_versions, each counter is split over COUNTER_SLOTS rows picked
+by the writer's backend pid and summed on read, so purchases running in
+parallel do not serialize on the energy_bought_kwh / households_powered rows
+"""
+
+import logging
+from database.config import get_db_cursor
+from database.versions import COUNTER_SLOTS
+
+logger = logging.getLogger(__name__)
+
+# Counter names stored in dashboard_counters
+MEMBERS = 'active_community_members'
+HOUSEHOLDS = 'households_powered'
+ENERGY_BOUGHT = 'energy_bought_kwh'
+# kWh still available on listings; purchases decrement it (see api/dashboard.format_dashboard_metrics)
+ENERGY_LISTED = 'energy_listed_kwh'
+COUNTER_NAMES = (MEMBERS, HOUSEHOLDS, ENERGY_BOUGHT, ENERGY_LISTED)
+
+DASHBOARD_COUNTERS_DDL = """
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    counter_name VARCHAR(64) NOT NULL,
+    slot SMALLINT NOT NULL DEFAULT 0,
+    counter_value NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (counter_name, slot)
+);
+
+-- Tables created before slots existed: one row per counter becomes slot 0
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'dashboard_counters' AND column_name = 'slot') THEN
+        ALTER TABLE dashboard_counters ADD COLUMN slot SMALLINT NOT NULL DEFAULT 0;
+        ALTER TABLE dashboard_counters DROP CONSTRAINT dashboard_counters_pkey;
+        ALTER TABLE dashboard_counters ADD PRIMARY KEY (counter_name, slot);
+    END IF;
+END $$;
+
+-- Distinct buyers, so households_powered can be maintained without COUNT(DISTINCT)
+CREATE TABLE IF NOT EXISTS dashboard_buyers (
+    buyer_id INTEGER PRIMARY KEY
+);
+
+CREATE OR REPLACE FUNCTION bump_dashboard_counter(name TEXT, delta NUMERIC)
+RETURNS VOID AS $$
+BEGIN
+    IF delta IS NULL OR delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO dashboard_counters (counter_name, slot, counter_value, updated_at)
+    VALUES (name, pg_backend_pid() % {slots}, delta, LOCALTIMESTAMP)
+    ON CONFLICT (counter_name, slot) DO UPDATE
+    SET counter_value = dashboard_counters.counter_value + EXCLUDED.counter_value,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_users_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_dashboard_counter('active_community_members', 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_dashboard_counter('active_community_members', -1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_listings_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_kwh NUMERIC := 0;
+    old_kwh NUMERIC := 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_kwh := COALESCE(NEW.available_kwh, NEW.quantity_kwh, 0);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_kwh := COALESCE(OLD.available_kwh, OLD.quantity_kwh, 0);
+    END IF;
+    PERFORM bump_dashboard_counter('energy_listed_kwh', new_kwh - old_kwh);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_transactions_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_kwh NUMERIC := 0;
+    old_kwh NUMERIC := 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_kwh := COALESCE(NEW.kwh_amount, 0);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_kwh := COALESCE(OLD.kwh_amount, 0);
+    END IF;
+    PERFORM bump_dashboard_counter('energy_bought_kwh', new_kwh - old_kwh);
+
+    -- Households: first purchase by a buyer adds one, removing their last purchase subtracts one
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.buyer_id IS NOT NULL
+       AND (TG_OP = 'DELETE' OR NEW.buyer_id IS DISTINCT FROM OLD.buyer_id) THEN
+        IF NOT EXISTS (SELECT 1 FROM transactions WHERE buyer_id = OLD.buyer_id) THEN
+            DELETE FROM dashboard_buyers WHERE buyer_id = OLD.buyer_id;
+            IF FOUND THEN
+                PERFORM bump_dashboard_counter('households_powered', -1);
+            END IF;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.buyer_id IS NOT NULL THEN
+        INSERT INTO dashboard_buyers (buyer_id) VALUES (NEW.buyer_id)
+        ON CONFLICT (buyer_id) DO NOTHING;
+        IF FOUND THEN
+            PERFORM bump_dashboard_counter('households_powered', 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS dashboard_users_counter ON users;
+CREATE TRIGGER dashboard_users_counter
+    AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION dashboard_users_changed();
+
+DROP TRIGGER IF EXISTS dashboard_listings_counter ON listings;
+CREATE TRIGGER dashboard_listings_counter
+    AFTER INSERT OR UPDATE OF available_kwh, quantity_kwh OR DELETE ON listings
+    FOR EACH ROW EXECUTE FUNCTION dashboard_listings_changed();
+
+DROP TRIGGER IF EXISTS dashboard_transactions_counter ON transactions;
+CREATE TRIGGER dashboard_transactions_counter
+    AFTER INSERT OR UPDATE OF kwh_amount, buyer_id OR DELETE ON transactions
+    FOR EACH ROW EXECUTE FUNCTION dashboard_transactions_changed();
+"""
+
+# Every dashboard total in one statement; transactions is scanned once for
+# both the distinct buyer count and the kWh sum
+LIVE_TOTALS_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM users) AS active_community_members,
+        t.households_powered,
+        t.energy_bought_kwh,
+        (SELECT COALESCE(SUM(COALESCE(available_kwh, quantity_kwh, 0)), 0) FROM listings) AS energy_listed_kwh
+    FROM (
+        SELECT COUNT(DISTINCT buyer_id) AS households_powered,
+               COALESCE(SUM(kwh_amount), 0) AS energy_bought_kwh
+        FROM transactions
+    ) t
+"""
+
+def compute_live_totals(cur):
+    """Compute every counter from the raw tables in a single round trip"""
+    cur.execute(LIVE_TOTALS_QUERY)
+    row = cur.fetchone() or {}
+    return {name: float(row.get(name) or 0) for name in COUNTER_NAMES}
+
+def install_dashboard_counters():
+    """Create the counters table and triggers, then seed them from the live tables"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(DASHBOARD_COUNTERS_DDL.format(slots=COUNTER_SLOTS))
+        conn.commit()
+    return rebuild_dashboard_counters()
+
+def rebuild_dashboard_counters():
+    """
+    Recompute every counter from the raw tables (reconciliation)
+    Writers are held off with SHARE locks for the duration so the rebuilt
+    values and the triggers agree afterwards.
+
+    Returns:
+        Dictionary of counter name -> {'previous', 'rebuilt', 'drift'}
+    """
+    with get_db_cursor() as (cur, conn):
+        cur.execute("LOCK TABLE users, listings, transactions IN SHARE MODE")
+
+        cur.execute("""
+            SELECT counter_name, SUM(counter_value) AS counter_value
+            FROM dashboard_counters
+            GROUP BY counter_name
+        """)
+        previous = {row['counter_name']: float(row['counter_value']) for row in cur.fetchall()}
+        # Rebuilt totals go to slot 0
+        cur.execute("DELETE FROM dashboard_counters")
+
+        cur.execute("DELETE FROM dashboard_buyers")
+        cur.execute("""
+            INSERT INTO dashboard_buyers (buyer_id)
+            SELECT DISTINCT buyer_id FROM transactions WHERE buyer_id IS NOT NULL
+        """)
+
+        totals = compute_live_totals(cur)
+
+        report = {}
+        for name in COUNTER_NAMES:
+            rebuilt = totals[name]
+            cur.execute("""
+                INSERT INTO dashboard_counters (counter_name, slot, counter_value, updated_at)
+                VALUES (%s, 0, %s, LOCALTIMESTAMP)
+            """, (name, rebuilt))
+            before = previous.get(name)
+            report[name] = {
+                'previous': before,
+                'rebuilt': rebuilt,
+                'drift': None if before is None else rebuilt - before
+            }
+        conn.commit()
+
+    drifted = [name for name, entry in report.items() if entry['drift']]
+    if drifted:
+        logger.warning(f"Dashboard counters drifted and were corrected: {drifted}")
+    return report
+
+def read_dashboard_counters(cur):
+    """
+    Read all counters in one query (summing their slots)
+    Returns: (values dict, last updated timestamp) or (None, None) if not installed
+    """
+    cur.execute("""
+        SELECT counter_name, SUM(counter_value) AS counter_value, MAX(updated_at) AS updated_at
+        FROM dashboard_counters
+        WHERE counter_name = ANY(%s)
+        GROUP BY counter_name
+    """, (list(COUNTER_NAMES),))
+    rows = cur.fetchall()
+    if len(rows) < len(COUNTER_NAMES):
+        return None, None
+    values = {row['counter_name']: float(row['counter_value']) for row in rows}
+    last_updated = max(row['updated_at'] for row in rows)
+    return values, last_updated
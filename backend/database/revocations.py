@@ -0,0 +1,66 @@
+"""
+Revoked Tokens
+Shared JWT revocation list behind revocation.py. One row per revoked token
+id (jti), kept until the token's own expiry; after that the token is
+rejected as expired anyway, so expired rows are purged.
+"""
+
+from database.config import get_db_cursor
+
+REVOKED_TOKENS_DDL = """
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens (revoked_at);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens (expires_at);
+"""
+
+def install_revoked_tokens():
+    """Create the revoked_tokens table and its indexes"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(REVOKED_TOKENS_DDL)
+        conn.commit()
+    return True
+
+def insert_revocation(cur, jti, expires_at):
+    """
+    Record a revoked token; expires_at is epoch seconds, None for tokens that never expire
+    Returns: False if the token was already revoked
+    """
+    cur.execute("""
+        INSERT INTO revoked_tokens (jti, expires_at)
+        VALUES (%s, COALESCE(to_timestamp(%s), 'infinity'))
+        ON CONFLICT (jti) DO NOTHING
+    """, (jti, expires_at))
+    return cur.rowcount == 1
+
+def is_token_revoked(cur, jti):
+    cur.execute("""
+        SELECT 1 FROM revoked_tokens
+        WHERE jti = %s AND expires_at > now()
+    """, (jti,))
+    return cur.fetchone() is not None
+
+def read_revocations(cur, since=None):
+    """
+    Unexpired revoked jtis, all of them or those revoked at or after `since`
+    Returns: (jtis, database time of the read) to pass back as the next `since`
+    """
+    cur.execute("""
+        SELECT now() AS read_at,
+               ARRAY(
+                   SELECT jti FROM revoked_tokens
+                   WHERE expires_at > now()
+                     AND (%(since)s::timestamptz IS NULL OR revoked_at >= %(since)s::timestamptz)
+               ) AS jtis
+    """, {'since': since})
+    row = cur.fetchone()
+    return row['jtis'], row['read_at']
+
+def purge_expired_revocations(cur):
+    """Delete rows for tokens that have expired; returns the number removed"""
+    cur.execute("DELETE FROM revoked_tokens WHERE expires_at <= now()")
+    return cur.rowcount
@@ -0,0 +1,341 @@
+"""
+Per-User Transaction Rollups
+Running purchase and sales totals per user (kWh, money, count, first/last
+activity) plus daily buckets for charts, kept in step with transactions by
+statement-level triggers. The rows change inside the same database
+transaction as the purchase that caused them, so the summary endpoints can
+read one primary-key row instead of aggregating a user's whole history.
+"""
+
+import logging
+from database.config import get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+# Rollup roles: a user's purchases are rolled up as buyer, their sales as seller
+BUYER = 'buyer'
+SELLER = 'seller'
+ROLES = (BUYER, SELLER)
+
+# Signed per-role rows of a transition table; {sign} is 1 for added rows, -1 for removed ones
+_ROLE_ROWS = """
+    SELECT buyer_id AS user_id, 'buyer' AS role, {sign} * COALESCE(kwh_amount, 0) AS kwh,
+           {sign} * COALESCE(total_price, 0) AS amount, {sign} AS n, created_at
+    FROM {table} WHERE buyer_id IS NOT NULL
+    UNION ALL
+    SELECT seller_id, 'seller', {sign} * COALESCE(kwh_amount, 0),
+           {sign} * COALESCE(total_price, 0), {sign}, created_at
+    FROM {table} WHERE seller_id IS NOT NULL
+"""
+
+# Rows are upserted in (user_id, role[, day]) order so concurrent purchases
+# (and batches touching several sellers) always lock rollup rows in the same order
+_APPLY_DELTAS = """
+    INSERT INTO user_transaction_totals (user_id, role, kwh_total, amount_total, transaction_count,
+                                         first_activity_at, last_activity_at, updated_at)
+    SELECT user_id, role, SUM(kwh), SUM(amount), SUM(n),
+           MIN(created_at) FILTER (WHERE n > 0), MAX(created_at) FILTER (WHERE n > 0), LOCALTIMESTAMP
+    FROM ({deltas}) d
+    GROUP BY user_id, role
+    ORDER BY user_id, role
+    ON CONFLICT (user_id, role) DO UPDATE
+    SET kwh_total = user_transaction_totals.kwh_total + EXCLUDED.kwh_total,
+        amount_total = user_transaction_totals.amount_total + EXCLUDED.amount_total,
+        transaction_count = user_transaction_totals.transaction_count + EXCLUDED.transaction_count,
+        first_activity_at = LEAST(user_transaction_totals.first_activity_at, EXCLUDED.first_activity_at),
+        last_activity_at = GREATEST(user_transaction_totals.last_activity_at, EXCLUDED.last_activity_at),
+        updated_at = EXCLUDED.updated_at;
+
+    INSERT INTO user_transaction_daily (user_id, role, day, kwh_total, amount_total, transaction_count)
+    SELECT user_id, role, created_at::date, SUM(kwh), SUM(amount), SUM(n)
+    FROM ({deltas}) d
+    WHERE created_at IS NOT NULL
+    GROUP BY user_id, role, created_at::date
+    ORDER BY user_id, role, created_at::date
+    ON CONFLICT (user_id, role, day) DO UPDATE
+    SET kwh_total = user_transaction_daily.kwh_total + EXCLUDED.kwh_total,
+        amount_total = user_transaction_daily.amount_total + EXCLUDED.amount_total,
+        transaction_count = user_transaction_daily.transaction_count + EXCLUDED.transaction_count;
+"""
+
+# After rows are removed (DELETE, or the old side of an UPDATE): first/last
+# activity cannot be decremented, so re-read them for the affected users, and
+# drop emptied daily buckets
+_AFTER_REMOVAL = """
+    UPDATE user_transaction_totals u
+    SET first_activity_at = r.first_at,
+        last_activity_at = r.last_at
+    FROM (SELECT DISTINCT user_id, role FROM ({removed}) x) a,
+         LATERAL (
+             SELECT MIN(t.created_at) AS first_at, MAX(t.created_at) AS last_at
+             FROM transactions t
+             WHERE (a.role = 'buyer' AND t.buyer_id = a.user_id)
+                OR (a.role = 'seller' AND t.seller_id = a.user_id)
+         ) r
+    WHERE u.user_id = a.user_id AND u.role = a.role;
+
+    DELETE FROM user_transaction_daily d
+    USING (SELECT DISTINCT user_id, role, created_at::date AS day FROM ({removed}) x) a
+    WHERE d.user_id = a.user_id AND d.role = a.role AND d.day = a.day
+      AND d.transaction_count <= 0;
+"""
+
+_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION {name}()
+RETURNS TRIGGER AS $$
+BEGIN
+    {body}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Transition tables need one trigger per event (and no UPDATE OF column list)
+_TRIGGER = """
+DROP TRIGGER IF EXISTS {name} ON transactions;
+CREATE TRIGGER {name}
+    AFTER {event} ON transactions
+    REFERENCING {tables}
+    FOR EACH STATEMENT EXECUTE FUNCTION {name}();
+"""
+
+def _rollup_triggers_ddl():
+    added = _ROLE_ROWS.format(sign=1, table='new_rows')
+    removed = _ROLE_ROWS.format(sign=-1, table='old_rows')
+    events = [
+        ('user_rollups_inserted', 'INSERT', 'NEW TABLE AS new_rows',
+         _APPLY_DELTAS.format(deltas=added)),
+        ('user_rollups_deleted', 'DELETE', 'OLD TABLE AS old_rows',
+         _APPLY_DELTAS.format(deltas=removed) + _AFTER_REMOVAL.format(removed=removed)),
+        ('user_rollups_updated', 'UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+         _APPLY_DELTAS.format(deltas=f"{removed} UNION ALL {added}") + _AFTER_REMOVAL.format(removed=removed)),
+    ]
+    ddl = []
+    for name, event, tables, body in events:
+        ddl.append(_TRIGGER_FUNCTION.format(name=name, body=body))
+        ddl.append(_TRIGGER.format(name=name, event=event, tables=tables))
+    return ''.join(ddl)
+
+USER_ROLLUPS_DDL = """
+CREATE TABLE IF NOT EXISTS user_transaction_totals (
+    user_id INTEGER NOT NULL,
+    role VARCHAR(8) NOT NULL,
+    kwh_total NUMERIC NOT NULL DEFAULT 0,
+    amount_total NUMERIC NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    first_activity_at TIMESTAMP,
+    last_activity_at TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, role)
+);
+
+CREATE TABLE IF NOT EXISTS user_transaction_daily (
+    user_id INTEGER NOT NULL,
+    role VARCHAR(8) NOT NULL,
+    day DATE NOT NULL,
+    kwh_total NUMERIC NOT NULL DEFAULT 0,
+    amount_total NUMERIC NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, role, day)
+);
+""" + _rollup_triggers_ddl()
+
+# Every user's totals and daily buckets recomputed from the raw transactions
+LIVE_ROLE_ROWS = """
+    SELECT buyer_id AS user_id, 'buyer' AS role, COALESCE(kwh_amount, 0) AS kwh,
+           COALESCE(total_price, 0) AS amount, created_at
+    FROM transactions WHERE buyer_id IS NOT NULL
+    UNION ALL
+    SELECT seller_id, 'seller', COALESCE(kwh_amount, 0), COALESCE(total_price, 0), created_at
+    FROM transactions WHERE seller_id IS NOT NULL
+"""
+
+LIVE_TOTALS_QUERY = f"""
+    SELECT user_id, role, SUM(kwh) AS kwh_total, SUM(amount) AS amount_total,
+           COUNT(*) AS transaction_count,
+           MIN(created_at) AS first_activity_at, MAX(created_at) AS last_activity_at
+    FROM ({LIVE_ROLE_ROWS}) t
+    GROUP BY user_id, role
+"""
+
+LIVE_DAILY_QUERY = f"""
+    SELECT user_id, role, created_at::date AS day, SUM(kwh) AS kwh_total,
+           SUM(amount) AS amount_total, COUNT(*) AS transaction_count
+    FROM ({LIVE_ROLE_ROWS}) t
+    WHERE created_at IS NOT NULL
+    GROUP BY user_id, role, created_at::date
+"""
+
+TOTALS_DRIFT_QUERY = f"""
+    SELECT COALESCE(live.user_id, stored.user_id) AS user_id,
+           COALESCE(live.role, stored.role) AS role,
+           live.kwh_total AS live_kwh, stored.kwh_total AS stored_kwh,
+           live.amount_total AS live_amount, stored.amount_total AS stored_amount,
+           live.transaction_count AS live_count, stored.transaction_count AS stored_count,
+           live.first_activity_at AS live_first, stored.first_activity_at AS stored_first,
+           live.last_activity_at AS live_last, stored.last_activity_at AS stored_last
+    FROM ({LIVE_TOTALS_QUERY}) live
+    FULL OUTER JOIN user_transaction_totals stored
+        ON stored.user_id = live.user_id AND stored.role = live.role
+    WHERE COALESCE(live.kwh_total, 0) IS DISTINCT FROM COALESCE(stored.kwh_total, 0)
+       OR COALESCE(live.amount_total, 0) IS DISTINCT FROM COALESCE(stored.amount_total, 0)
+       OR COALESCE(live.transaction_count, 0) IS DISTINCT FROM COALESCE(stored.transaction_count, 0)
+       OR live.first_activity_at IS DISTINCT FROM stored.first_activity_at
+       OR live.last_activity_at IS DISTINCT FROM stored.last_activity_at
+    ORDER BY 1, 2
+"""
+
+DAILY_DRIFT_QUERY = f"""
+    SELECT COUNT(*) AS drifted_buckets
+    FROM ({LIVE_DAILY_QUERY}) live
+    FULL OUTER JOIN user_transaction_daily stored
+        ON stored.user_id = live.user_id AND stored.role = live.role AND stored.day = live.day
+    WHERE COALESCE(live.kwh_total, 0) IS DISTINCT FROM COALESCE(stored.kwh_total, 0)
+       OR COALESCE(live.amount_total, 0) IS DISTINCT FROM COALESCE(stored.amount_total, 0)
+       OR COALESCE(live.transaction_count, 0) IS DISTINCT FROM COALESCE(stored.transaction_count, 0)
+"""
+
+def install_user_rollups():
+    """Create the rollup tables and triggers, then seed them from transactions"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(USER_ROLLUPS_DDL)
+        conn.commit()
+    return rebuild_user_rollups()
+
+def _drift_entry(row):
+    def number(value):
+        return float(value) if value is not None else 0.0
+    return {
+        'userId': row['user_id'],
+        'role': row['role'],
+        'kwh': {'stored': number(row['stored_kwh']), 'live': number(row['live_kwh'])},
+        'amount': {'stored': number(row['stored_amount']), 'live': number(row['live_amount'])},
+        'count': {'stored': int(row['stored_count'] or 0), 'live': int(row['live_count'] or 0)},
+        'firstActivity': {
+            'stored': row['stored_first'].isoformat() if row['stored_first'] else None,
+            'live': row['live_first'].isoformat() if row['live_first'] else None
+        },
+        'lastActivity': {
+            'stored': row['stored_last'].isoformat() if row['stored_last'] else None,
+            'live': row['live_last'].isoformat() if row['live_last'] else None
+        }
+    }
+
+def find_rollup_drift(cur):
+    """
+    Compare the stored rollups with totals recomputed from transactions
+    Returns: {'drifted': [per user/role entries], 'driftedDailyBuckets': count}
+    """
+    cur.execute(TOTALS_DRIFT_QUERY)
+    drifted = [_drift_entry(row) for row in cur.fetchall()]
+    cur.execute(DAILY_DRIFT_QUERY)
+    daily = int(cur.fetchone()['drifted_buckets'])
+    return {'drifted': drifted, 'driftedDailyBuckets': daily}
+
+def check_user_rollups():
+    """
+    Consistency check (read only)
+    Runs in one REPEATABLE READ snapshot so rollups and transactions are compared
+    as of the same instant even while purchases keep committing
+    """
+    with get_db_cursor() as (cur, conn):
+        conn.rollback()
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        report = find_rollup_drift(cur)
+        conn.rollback()
+    if report['drifted'] or report['driftedDailyBuckets']:
+        logger.warning(
+            f"User rollups drifted: {len(report['drifted'])} totals, "
+            f"{report['driftedDailyBuckets']} daily buckets"
+        )
+    return report
+
+def rebuild_user_rollups():
+    """
+    Recompute every rollup from transactions (reconciliation)
+    Writers are held off with a SHARE lock while the tables are rewritten
+
+    Returns:
+        Drift found before the rebuild plus the number of rows written
+    """
+    with get_db_cursor() as (cur, conn):
+        cur.execute("LOCK TABLE transactions IN SHARE MODE")
+        report = find_rollup_drift(cur)
+
+        cur.execute("DELETE FROM user_transaction_totals")
+        cur.execute(f"""
+            INSERT INTO user_transaction_totals (user_id, role, kwh_total, amount_total, transaction_count,
+                                                 first_activity_at, last_activity_at, updated_at)
+            SELECT user_id, role, kwh_total, amount_total, transaction_count,
+                   first_activity_at, last_activity_at, LOCALTIMESTAMP
+            FROM ({LIVE_TOTALS_QUERY}) live
+        """)
+        report['totalsRows'] = cur.rowcount
+        cur.execute("DELETE FROM user_transaction_daily")
+        cur.execute(f"""
+            INSERT INTO user_transaction_daily (user_id, role, day, kwh_total, amount_total, transaction_count)
+            SELECT user_id, role, day, kwh_total, amount_total, transaction_count
+            FROM ({LIVE_DAILY_QUERY}) live
+        """)
+        report['dailyRows'] = cur.rowcount
+        conn.commit()
+
+    if report['drifted'] or report['driftedDailyBuckets']:
+        logger.warning(
+            f"User rollups drifted and were corrected: {len(report['drifted'])} totals, "
+            f"{report['driftedDailyBuckets']} daily buckets"
+        )
+    return report
+
+def read_user_totals(cur, user_id, role):
+    """
+    One user's running totals for a role by primary key
+    Returns a dict (zeros when the user has no transactions in that role);
+    raises when the rollups are not installed
+    """
+    cur.execute("""
+        SELECT kwh_total, amount_total, transaction_count, first_activity_at, last_activity_at
+        FROM user_transaction_totals
+        WHERE user_id = %s AND role = %s
+    """, (user_id, role))
+    return cur.fetchone() or {
+        'kwh_total': 0, 'amount_total': 0, 'transaction_count': 0,
+        'first_activity_at': None, 'last_activity_at': None
+    }
+
+def compute_user_totals(cur, user_id, role):
+    """The same totals aggregated from the raw transactions (rollups not installed)"""
+    column = 'buyer_id' if role == BUYER else 'seller_id'
+    cur.execute(f"""
+        SELECT COALESCE(SUM(kwh_amount), 0) AS kwh_total,
+               COALESCE(SUM(total_price), 0) AS amount_total,
+               COUNT(*) AS transaction_count,
+               MIN(created_at) AS first_activity_at,
+               MAX(created_at) AS last_activity_at
+        FROM transactions
+        WHERE {column} = %s
+    """, (user_id,))
+    return cur.fetchone()
+
+def read_user_daily(cur, user_id, role, start, end):
+    """Daily buckets for one user and role with start <= day < end, oldest first"""
+    cur.execute("""
+        SELECT day, kwh_total, amount_total, transaction_count
+        FROM user_transaction_daily
+        WHERE user_id = %s AND role = %s AND day >= %s AND day < %s
+        ORDER BY day
+    """, (user_id, role, start, end))
+    return cur.fetchall()
+
+def compute_user_daily(cur, user_id, role, start, end):
+    """The same buckets aggregated from the raw transactions (rollups not installed)"""
+    column = 'buyer_id' if role == BUYER else 'seller_id'
+    cur.execute(f"""
+        SELECT created_at::date AS day, SUM(COALESCE(kwh_amount, 0)) AS kwh_total,
+               SUM(COALESCE(total_price, 0)) AS amount_total, COUNT(*) AS transaction_count
+        FROM transactions
+        WHERE {column} = %s AND created_at >= %s AND created_at < %s
+        GROUP BY created_at::date
+        ORDER BY day
+    """, (user_id, start, end))
+    return cur.fetchall()
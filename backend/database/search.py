@@ -0,0 +1,104 @@
+"""
+Listing Full-Text Search
+A weighted tsvector over title (A), location (B) and description (C) kept in
+listings.search_vector by a row trigger, with a GIN index for @@ matches.
+When the pg_trgm extension is available, a trigram GIN index on location
+adds fuzzy (typo-tolerant) location matching.
+"""
+
+import logging
+from database.config import get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration for both indexing and queries
+SEARCH_CONFIG = 'english'
+
+# Minimum pg_trgm similarity for a fuzzy location match (the threshold of the
+# indexable % operator, set per transaction by enable_fuzzy_location)
+LOCATION_SIMILARITY = 0.3
+
+SEARCH_INDEX_DDL = f"""
+ALTER TABLE listings ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+CREATE OR REPLACE FUNCTION listing_search_vector(title TEXT, location TEXT, description TEXT)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE(title, '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE(location, '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE(description, '')), 'C');
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION listings_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := listing_search_vector(NEW.title, NEW.location, NEW.description);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS listings_search_vector ON listings;
+CREATE TRIGGER listings_search_vector
+    BEFORE INSERT OR UPDATE OF title, location, description ON listings
+    FOR EACH ROW EXECUTE FUNCTION listings_search_vector_update();
+
+CREATE INDEX IF NOT EXISTS idx_listings_search_vector ON listings USING GIN (search_vector);
+"""
+
+# Rows written before the trigger existed
+SEARCH_BACKFILL_SQL = """
+UPDATE listings
+SET search_vector = listing_search_vector(title, location, description)
+WHERE search_vector IS NULL
+"""
+
+TRIGRAM_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS idx_listings_location_trgm ON listings USING GIN (location gin_trgm_ops);
+"""
+
+_trigram_available = None
+
+def install_search_index():
+    """
+    Create the search column, trigger and GIN index, backfill existing rows,
+    and add the trigram location index when pg_trgm can be enabled
+    Returns: {'backfilled': rows, 'trigram': bool}
+    """
+    global _trigram_available
+    with get_db_cursor() as (cur, conn):
+        cur.execute(SEARCH_INDEX_DDL)
+        cur.execute(SEARCH_BACKFILL_SQL)
+        backfilled = cur.rowcount
+        conn.commit()
+
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute(TRIGRAM_INDEX_DDL)
+            conn.commit()
+            trigram = True
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"pg_trgm unavailable, fuzzy location search disabled: {e}")
+            trigram = False
+
+        cur.execute("ANALYZE listings")
+        conn.commit()
+    _trigram_available = trigram
+    return {'backfilled': backfilled, 'trigram': trigram}
+
+def trigram_available(cur):
+    """Whether pg_trgm is installed (checked once per worker)"""
+    global _trigram_available
+    if _trigram_available is None:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        _trigram_available = cur.fetchone() is not None
+    return _trigram_available
+
+def enable_fuzzy_location(cur):
+    """
+    Whether fuzzy location matching is available; if so, sets the % operator's
+    threshold to LOCATION_SIMILARITY for the current transaction
+    """
+    if not trigram_available(cur):
+        return False
+    cur.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(LOCATION_SIMILARITY),))
+    return True
@@ -0,0 +1,89 @@
+"""
+Resource Version Counters
+Statement-level triggers bump a version number whenever users, listings or
+transactions change, giving endpoints a cheap primary-key lookup to build
+validators (ETags) from instead of re-running their full query
+
+Each resource's version is spread over COUNTER_SLOTS rows and a writer bumps
+the slot picked by its backend pid, so concurrent purchases (which touch
+listings and transactions) do not queue on one row lock until commit. The
+version is the sum of the slots; it only ever grows, which is all ETags and
+the listing index need.
+"""
+
+from database.config import get_db_cursor
+
+VERSIONED_TABLES = ('users', 'listings', 'transactions')
+
+# Rows per counter; concurrent writers collide only when their backend pids share a slot
+COUNTER_SLOTS = 16
+
+RESOURCE_VERSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS resource_versions (
+    resource VARCHAR(64) NOT NULL,
+    slot SMALLINT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (resource, slot)
+);
+
+-- Tables created before slots existed: one row per resource becomes slot 0
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'resource_versions' AND column_name = 'slot') THEN
+        ALTER TABLE resource_versions ADD COLUMN slot SMALLINT NOT NULL DEFAULT 0;
+        ALTER TABLE resource_versions DROP CONSTRAINT resource_versions_pkey;
+        ALTER TABLE resource_versions ADD PRIMARY KEY (resource, slot);
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION bump_resource_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO resource_versions (resource, slot, version, updated_at)
+    VALUES (TG_TABLE_NAME, pg_backend_pid() % {slots}, 1, LOCALTIMESTAMP)
+    ON CONFLICT (resource, slot) DO UPDATE
+    SET version = resource_versions.version + 1,
+        updated_at = EXCLUDED.updated_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_DDL = """
+DROP TRIGGER IF EXISTS {table}_resource_version ON {table};
+CREATE TRIGGER {table}_resource_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version();
+"""
+
+def install_resource_versions():
+    """Create the version table and per-table statement triggers"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(RESOURCE_VERSIONS_DDL.format(slots=COUNTER_SLOTS))
+        for table in VERSIONED_TABLES:
+            cur.execute(TRIGGER_DDL.format(table=table))
+            cur.execute("""
+                INSERT INTO resource_versions (resource, slot, version)
+                VALUES (%s, 0, 1)
+                ON CONFLICT (resource, slot) DO NOTHING
+            """, (table,))
+        conn.commit()
+    return True
+
+def read_resource_versions(cur, resources):
+    """
+    Read version numbers for the given tables in one indexed query
+    Returns: {resource: version} or None if any resource is not tracked
+    """
+    cur.execute("""
+        SELECT resource, SUM(version) AS version
+        FROM resource_versions
+        WHERE resource = ANY(%s)
+        GROUP BY resource
+    """, (list(resources),))
+    versions = {row['resource']: int(row['version']) for row in cur.fetchall()}
+    if len(versions) < len(resources):
+        return None
+    return versions
@@ -0,0 +1,144 @@
+"""
+Fake LLM Client
+Local stand-in for the OpenAI client used by AIService in tests, load tests and
+benchmarks. Mimics chat.completions.create() for both regular and streamed
+completions, with configurable latency so slow completions can be simulated.
+AsyncFakeLLMClient does the same for openai.AsyncOpenAI (AsyncAIService),
+waiting with asyncio.sleep instead of blocking the thread.
+
+Enable for the app with AI_FAKE_LLM=1
+    AI_FAKE_LLM_LATENCY     seconds before the first token (default 1.0)
+    AI_FAKE_LLM_TOKEN_DELAY seconds between streamed tokens (default 0.02)
+"""
+
+import os
+import time
+import asyncio
+from types import SimpleNamespace
+
+DEFAULT_REPLY = (
+    "Great question! ☀️ Rooftop solar is one of the fastest ways to cut your bills and emissions. "
+    "A typical 3 kW system can cover most of a household's daytime use 🏠⚡ and avoid around "
+    "1.5 tonnes of CO2 a year 🌍. Browse the EcoPower Hub marketplace to buy surplus clean energy "
+    "from suppliers near you while you plan your installation 🌱"
+)
+
+class _Completions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        client = self._client
+        client.calls += 1
+        reply = client.reply_for(messages or [])
+        if stream:
+            return client.stream_reply(reply, model)
+        time.sleep(client.latency + client.token_delay * len(client.tokenize(reply)))
+        return client.completion(reply, model, messages or [])
+
+class _AsyncCompletions:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, model=None, messages=None, stream=False, **kwargs):
+        client = self._client
+        client.calls += 1
+        reply = client.reply_for(messages or [])
+        if stream:
+            return client.stream_reply_async(reply, model)
+        await asyncio.sleep(client.latency + client.token_delay * len(client.tokenize(reply)))
+        return client.completion(reply, model, messages or [])
+
+class FakeLLMClient:
+    """Drop-in replacement for openai.OpenAI() covering chat completions"""
+
+    completions_class = _Completions
+
+    def __init__(self, latency=1.0, token_delay=0.02, reply=DEFAULT_REPLY):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self.completions_class(self))
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv('AI_FAKE_LLM_LATENCY', '1.0')),
+            token_delay=float(os.getenv('AI_FAKE_LLM_TOKEN_DELAY', '0.02'))
+        )
+
+    def reply_for(self, messages):
+        """Reply text; a callable reply receives the messages"""
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    @staticmethod
+    def tokenize(text):
+        """Whitespace-preserving word chunks, roughly one per model token"""
+        tokens = []
+        current = ''
+        for char in text:
+            current += char
+            if char == ' ':
+                tokens.append(current)
+                current = ''
+        if current:
+            tokens.append(current)
+        return tokens
+
+    @staticmethod
+    def count_prompt_tokens(messages):
+        return sum(len(str(message.get('content', '')).split()) for message in messages)
+
+    def completion(self, reply, model, messages):
+        """Non-streamed completion response"""
+        prompt_tokens = self.count_prompt_tokens(messages)
+        completion_tokens = len(self.tokenize(reply))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                finish_reason='stop',
+                message=SimpleNamespace(role='assistant', content=reply)
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+    def stream_chunks(self, reply, model=None):
+        """Streamed completion chunks, one per token, then the finish chunk"""
+        for token in self.tokenize(reply):
+            yield SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(
+                    index=0,
+                    finish_reason=None,
+                    delta=SimpleNamespace(role='assistant', content=token)
+                )]
+            )
+        yield SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason='stop', delta=SimpleNamespace(role=None, content=None))]
+        )
+
+    def stream_reply(self, reply, model=None):
+        time.sleep(self.latency)
+        for chunk in self.stream_chunks(reply, model):
+            yield chunk
+            if self.token_delay and chunk.choices[0].finish_reason is None:
+                time.sleep(self.token_delay)
+
+class AsyncFakeLLMClient(FakeLLMClient):
+    """Drop-in replacement for openai.AsyncOpenAI() covering chat completions"""
+
+    completions_class = _AsyncCompletions
+
+    async def stream_reply_async(self, reply, model=None):
+        await asyncio.sleep(self.latency)
+        for chunk in self.stream_chunks(reply, model):
+            yield chunk
+            if self.token_delay and chunk.choices[0].finish_reason is None:
+                await asyncio.sleep(self.token_delay)
@@ -0,0 +1,253 @@
+"""
+Listing Image Pipeline
+create_listing saves uploads through save_stripped_upload, which bakes the
+EXIF orientation into the pixels and re-encodes the image without metadata
+(EXIF, GPS, ICC, XMP, text chunks) before its URL is stored, so no public
+copy ever carries the uploader's location. Resizing runs afterwards on a
+per-worker process pool (IMAGE_WORKERS). For each upload it:
+
+- writes WebP variants no wider than VARIANTS (thumb for marketplace cards,
+  medium for detail views), never upscaling
+- records dimensions, sizes and timings in listing_images
+
+Variant URLs are derived from the listing's image_url
+(/uploads/listings/<file> -> /uploads/listings/variants/<file>.<variant>.webp),
+so the listings API returns them without a join. Until a variant exists (or
+when processing failed) its URL serves the original with a short cache
+lifetime; generated variants are cached for a year, since upload names are
+unique. Without Pillow image uploads are refused.
+"""
+
+import os
+import time
+import logging
+import threading
+import psycopg2
+from database.config import get_db_cursor
+from database.listing_images import install_listing_images, record_listing_image
+from cache import invalidate
+from worker_pool import WorkerPool
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency: without it image uploads are refused
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'listings')
+URL_PREFIX = '/uploads/listings/'
+VARIANT_DIR = 'variants'
+
+# Variant name -> maximum width in pixels (cards are 405 CSS px wide)
+VARIANTS = {'thumb': 640, 'medium': 1280}
+
+# Cache-Control max-age for generated variants and for originals served in their place
+VARIANT_MAX_AGE = 365 * 24 * 3600
+FALLBACK_MAX_AGE = 60
+
+# Accepted upload formats -> format they are re-encoded in (Pillow reports
+# multi-picture camera JPEGs as MPO; only the primary image is kept)
+UPLOAD_FORMATS = {'JPEG': 'JPEG', 'MPO': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP'}
+
+class InvalidImage(ValueError):
+    """Upload that is not a decodable JPEG, PNG or WebP image"""
+
+class ImageUploadsUnavailable(RuntimeError):
+    """Pillow is not installed, so uploads cannot be stripped of metadata"""
+
+def variant_filename(filename, variant):
+    return f'{VARIANT_DIR}/{filename}.{variant}.webp'
+
+def variant_url(image_url, variant):
+    """URL of an uploaded image's variant; None for external or inline (data:) image URLs"""
+    if not image_url or not image_url.startswith(URL_PREFIX):
+        return None
+    return URL_PREFIX + variant_filename(image_url[len(URL_PREFIX):], variant)
+
+def resolve_listing_image(filename):
+    """
+    File to serve for /uploads/listings/<filename>
+    Returns: (path relative to UPLOAD_FOLDER, kind, max_age); kind is 'original', a variant name or 'fallback'
+    """
+    if not filename.startswith(VARIANT_DIR + '/'):
+        return filename, 'original', None
+    original, variant, _ = filename[len(VARIANT_DIR) + 1:].rsplit('.', 2)
+    if os.path.exists(os.path.join(UPLOAD_FOLDER, filename)):
+        return filename, variant, VARIANT_MAX_AGE
+    return original, 'fallback', FALLBACK_MAX_AGE
+
+def _webp_ready(image):
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+def save_stripped_upload(stream, path):
+    """
+    Write an uploaded image to path without metadata, orientation applied
+    Runs in the request, before the image's URL is stored
+    Raises: InvalidImage, ImageUploadsUnavailable
+    """
+    if Image is None:
+        raise ImageUploadsUnavailable('Pillow is not installed')
+    # Write next to the target, then swap, so readers never see a partial file
+    partial = f'{path}.tmp'
+    try:
+        with Image.open(stream) as source:
+            image_format = UPLOAD_FORMATS.get(source.format)
+            if image_format is None:
+                raise InvalidImage(f'unsupported image format {source.format}')
+            image = ImageOps.exif_transpose(source)
+            # exif_transpose keeps the (rewritten) EXIF block, and save() falls back to
+            # info for ICC profiles; keep nothing but palette transparency
+            image.info = {key: value for key, value in image.info.items() if key == 'transparency'}
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+                image = image.convert('RGB')
+            save_options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+            image.save(partial, format=image_format, **save_options)
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        if isinstance(e, InvalidImage):
+            raise
+        raise InvalidImage(str(e)) from e
+    os.replace(partial, path)
+
+def process_image(path, quality=80):
+    """
+    Write the variants of a stripped upload (runs in a pool process)
+    Returns: result dict for record_listing_image
+    """
+    started = time.perf_counter()
+    filename = os.path.basename(path)
+    os.makedirs(os.path.join(os.path.dirname(path), VARIANT_DIR), exist_ok=True)
+
+    with Image.open(path) as image:
+        width, height = image.size
+        variants = {}
+        for variant, max_width in VARIANTS.items():
+            resized = _webp_ready(image)
+            if width > max_width:
+                resized = resized.resize((max_width, max(1, round(height * max_width / width))), Image.LANCZOS)
+            target = os.path.join(os.path.dirname(path), variant_filename(filename, variant))
+            resized.save(target, format='WEBP', quality=quality, method=4)
+            variants[variant] = {
+                'width': resized.width,
+                'height': resized.height,
+                'bytes': os.path.getsize(target)
+            }
+
+    return {
+        'status': 'ready',
+        'width': width,
+        'height': height,
+        'bytes': os.path.getsize(path),
+        'variants': variants,
+        'ms': round((time.perf_counter() - started) * 1000)
+    }
+
+class ImagePipeline:
+    """
+    Background variant generation for listing uploads, plus bytes-served counters
+    workers: pool processes per worker (0 disables processing; variants then fall back to originals)
+    nice: niceness of the pool processes (see WorkerPool)
+    """
+
+    def __init__(self, workers=1, quality=80, nice=10):
+        self.workers = workers if Image is not None else 0
+        self.quality = quality
+        self._pool = WorkerPool(self.workers, nice)
+        self._lock = threading.Lock()
+
+        # Counters exposed through stats()
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.processing_seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.served = {}    # kind -> [requests, bytes]
+
+    def submit(self, listing_id, image_url):
+        """Queue variant generation for a newly uploaded image; returns the future, or None"""
+        if self.workers <= 0 or not image_url.startswith(URL_PREFIX):
+            self.skipped += 1
+            return None
+        path = os.path.join(UPLOAD_FOLDER, image_url[len(URL_PREFIX):])
+        try:
+            self.bytes_in += os.path.getsize(path)
+            future = self._pool.get().submit(process_image, path, self.quality)
+        except Exception as e:
+            logger.error(f"Could not queue image processing for listing {listing_id}: {e}")
+            self.skipped += 1
+            return None
+        self.submitted += 1
+        future.add_done_callback(lambda done: self._record(listing_id, image_url, done))
+        return future
+
+    def _record(self, listing_id, image_url, future):
+        try:
+            result = future.result()
+            with self._lock:
+                self.processed += 1
+                self.processing_seconds += result['ms'] / 1000
+                self.bytes_out += sum(v['bytes'] for v in result['variants'].values())
+        except Exception as e:
+            logger.warning(f"Image processing failed for listing {listing_id}: {e}")
+            result = {'status': 'failed', 'error': str(e)[:500]}
+            with self._lock:
+                self.failed += 1
+
+        try:
+            self._store(listing_id, image_url, result)
+        except psycopg2.errors.UndefinedTable:
+            # First upload before 'python migrate.py listing-images' ran
+            install_listing_images()
+            self._store(listing_id, image_url, result)
+        except Exception as e:
+            logger.error(f"Could not record processed image for listing {listing_id}: {e}")
+        # Listing detail responses carry the dimensions
+        invalidate('listings')
+
+    @staticmethod
+    def _store(listing_id, image_url, result):
+        with get_db_cursor() as (cur, conn):
+            record_listing_image(cur, listing_id, image_url, result)
+            conn.commit()
+
+    def record_served(self, kind, nbytes):
+        with self._lock:
+            counts = self.served.setdefault(kind, [0, 0])
+            counts[0] += 1
+            counts[1] += nbytes or 0
+
+    def stats(self):
+        with self._lock:
+            served = {kind: {'requests': n, 'bytes': b} for kind, (n, b) in self.served.items()}
+        return {
+            'available': Image is not None,
+            'workers': self.workers,
+            'variants': VARIANTS,
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'pending': self.submitted - self.processed - self.failed,
+            'processingSeconds': round(self.processing_seconds, 3),
+            'imagesPerSecond': round(self.processed / self.processing_seconds, 2) if self.processing_seconds else None,
+            'bytesIn': self.bytes_in,
+            'bytesOut': self.bytes_out,
+            'served': served
+        }
+
+image_pipeline = ImagePipeline(
+    workers=int(os.getenv('IMAGE_WORKERS', '1')),
+    quality=int(os.getenv('IMAGE_WEBP_QUALITY', '80')),
+    nice=int(os.getenv('IMAGE_WORKER_NICE', '10'))
+)
+
+def get_image_pipeline_stats():
+    """Processing throughput and bytes served for this worker process"""
+    return {'pid': os.getpid(), **image_pipeline.stats()}
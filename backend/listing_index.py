@@ -0,0 +1,383 @@
+"""
+In-Memory Listing Index
+Optional per-worker copy of the listings table that answers the marketplace
+list query (status / energy_type / price range, newest or price order, keyset
+pages) without running SQL.
+
+Each listing is one __slots__ record; every sort order is a compact
+array('q') of listing ids kept sorted by (sort value, id), one array per
+filter bucket (all rows, per status, per energy_type, per status and
+energy_type). Pages are read by bisecting to the cursor (or the edge of the
+price range) and walking the bucket.
+
+Freshness:
+    - create/update/delete in this worker call refresh()/remove() after commit
+    - other workers' writes are picked up by a delta sync (rows with a recent
+      updated_at, plus an id reconciliation when row counts disagree). It runs
+      when the listings resource version seen by conditional_get is newer
+      than the index, or every LISTING_INDEX_SYNC_SECONDS when version
+      tracking is not installed
+
+Configuration:
+    LISTING_INDEX_ENABLED      true/false (default false)
+    LISTING_INDEX_SYNC_SECONDS seconds between time-based delta syncs (default 5)
+"""
+
+import os
+import sys
+import math
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from datetime import datetime, timedelta
+from database.config import get_db_cursor
+from database.versions import read_resource_versions
+
+logger = logging.getLogger(__name__)
+
+# Sort timestamp for rows without created_at; matches LISTING_SORT_KEY in api/listings.py
+EPOCH = datetime(1970, 1, 1)
+
+LISTING_COLUMNS = """
+    id, title, energy_type, available_kwh, price_per_kwh,
+    status, location, description, image_url,
+    created_at, updated_at
+"""
+
+# sort name -> (record attribute, descending)
+SORTS = {
+    'newest': ('sort_ts', True),
+    'price_asc': ('price_per_kwh', False),
+    'price_desc': ('price_per_kwh', True)
+}
+SORT_FIELDS = ('sort_ts', 'price_per_kwh')
+
+# A delta touching more than this share of the index rebuilds the orders wholesale
+BULK_SYNC_RATIO = 0.1
+
+# Rows updated this long before the last sync are re-read, covering commits
+# that became visible after a sync with an older updated_at
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# Full id reconciliation at least this often, even when counts agree
+RECONCILE_SECONDS = 300
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _fetch(conn, query, params=None):
+    """Plain tuple rows; dict rows cost more than the index itself on a full load"""
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+class IndexedListing:
+    __slots__ = ('id', 'title', 'energy_type', 'available_kwh', 'price_per_kwh',
+                 'status', 'location', 'description', 'image_url',
+                 'created_at', 'updated_at', 'sort_ts')
+
+    def __init__(self, row):
+        """row: tuple in LISTING_COLUMNS order"""
+        (self.id, self.title, energy_type, self.available_kwh, price_per_kwh,
+         status, location, self.description, self.image_url,
+         self.created_at, self.updated_at) = row
+        self.energy_type = _intern(energy_type)
+        # Decimal like the NUMERIC column, so responses and price cursors match the SQL path
+        self.price_per_kwh = price_per_kwh if price_per_kwh is not None else Decimal(0)
+        self.status = _intern(status)
+        self.location = _intern(location)
+        self.sort_ts = self.created_at or EPOCH
+
+    def buckets(self):
+        """(status, energy_type) filter buckets this listing belongs to; None matches any"""
+        return ((None, None), (self.status, None), (None, self.energy_type), (self.status, self.energy_type))
+
+
+    def to_row(self, sort_field):
+        """Dict shaped like a listings query row, with the page sort value"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'energy_type': self.energy_type,
+            'available_kwh': self.available_kwh,
+            'price_per_kwh': self.price_per_kwh,
+            'status': self.status,
+            'location': self.location,
+            'description': self.description,
+            'image_url': self.image_url,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'sort_value': getattr(self, sort_field)
+        }
+
+class ListingIndex:
+    """Per-worker listing index with sorted id arrays per filter bucket"""
+
+    def __init__(self, sync_seconds=5.0):
+        self.sync_seconds = sync_seconds
+        self._records = {}
+        self._orders = {field: {} for field in SORT_FIELDS}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+        self._watermark = None
+        self._last_sync = 0.0
+        self._last_reconcile = 0.0
+        self._pid = os.getpid()
+        self.syncs = 0
+        self.queries = 0
+
+    @property
+    def loaded(self):
+        return self._loaded and self._pid == os.getpid()
+
+    def __len__(self):
+        return len(self._records)
+
+    # --- Queries ---
+
+    def query(self, status=None, energy_type=None, min_price=None, max_price=None,
+              sort='newest', cursor_key=None, direction='next', limit=25):
+        """
+        Up to `limit` matching rows in SQL page order: the sort order for 'next'
+        pages, reversed for 'prev' pages (paginate_rows flips those back)
+        cursor_key: (sort value, id) rows must come strictly after
+        """
+        field, descending = SORTS[sort]
+        walk_descending = descending != (direction == 'prev')
+        rows = []
+        with self._lock:
+            self.queries += 1
+            ids = self._orders[field].get((status or None, energy_type or None))
+            if not ids:
+                return rows
+            records = self._records
+            key = self._key(field)
+
+            if walk_descending:
+                position = len(ids) - 1
+                if cursor_key is not None:
+                    position = bisect_left(ids, tuple(cursor_key), key=key) - 1
+                if field == 'price_per_kwh' and max_price is not None:
+                    position = min(position, bisect_right(ids, (max_price, math.inf), key=key) - 1)
+            else:
+                position = 0
+                if cursor_key is not None:
+                    position = bisect_right(ids, tuple(cursor_key), key=key)
+                if field == 'price_per_kwh' and min_price is not None:
+                    position = max(position, bisect_left(ids, (min_price,), key=key))
+            step = -1 if walk_descending else 1
+
+            while 0 <= position < len(ids) and len(rows) < limit:
+                record = records[ids[position]]
+                position += step
+                price = record.price_per_kwh
+                if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                    if field == 'price_per_kwh':
+                        break  # walked past the end of the price range
+                    continue
+                rows.append(record.to_row(field))
+        return rows
+
+    # --- Freshness ---
+
+    def ensure_fresh(self, version_hint=None):
+        """
+        Bootstrap on first use, then delta-sync when the database version
+        (from conditional_get, when available) is newer than the index or
+        the time-based interval has passed
+        """
+        if not self.loaded:
+            self.bootstrap()
+            return
+        if version_hint is not None and self._version is not None:
+            if version_hint <= self._version:
+                return
+        elif time.monotonic() - self._last_sync < self.sync_seconds:
+            return
+        self.sync()
+
+    def bootstrap(self):
+        """Load every listing"""
+        with self._lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            with get_db_cursor() as (cur, conn):
+                version = self._read_version(cur, conn)
+                rows = _fetch(conn, f"SELECT {LISTING_COLUMNS} FROM listings")
+
+            self._records = {row[0]: IndexedListing(row) for row in rows}
+            self._rebuild_orders()
+
+            self._version = version
+            self._watermark = max((r.updated_at for r in self._records.values() if r.updated_at), default=None)
+            self._last_sync = self._last_reconcile = time.monotonic()
+            self._pid = os.getpid()
+            self._loaded = True
+            logger.info(f"Listing index loaded {len(self._records):,} listings in {time.perf_counter() - started:.2f}s")
+
+    def sync(self):
+        """Apply rows changed since the last sync and reconcile ids when counts drift"""
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is syncing; serve what we have
+        try:
+            with get_db_cursor() as (cur, conn):
+                version = self._read_version(cur, conn)
+                # Compare (id, updated_at) first; the overlap window re-reads rows already applied
+                stale_ids = []
+                if self._watermark is not None:
+                    records = self._records
+                    for listing_id, updated_at in _fetch(
+                        conn, "SELECT id, updated_at FROM listings WHERE updated_at >= %s",
+                        (self._watermark - SYNC_OVERLAP,)
+                    ):
+                        current = records.get(listing_id)
+                        if current is None or current.updated_at != updated_at:
+                            stale_ids.append(listing_id)
+                updates = []
+                if stale_ids:
+                    rows = _fetch(conn, f"SELECT {LISTING_COLUMNS} FROM listings WHERE id = ANY(%s)", (stale_ids,))
+                    updates = [IndexedListing(row) for row in rows]
+                if len(updates) > len(self._records) * BULK_SYNC_RATIO:
+                    for record in updates:
+                        self._records[record.id] = record
+                        self._advance_watermark(record)
+                    self._rebuild_orders()
+                else:
+                    for record in updates:
+                        self._upsert(record)
+
+                cur.execute("SELECT COUNT(*) AS count FROM listings")
+                count = cur.fetchone()['count']
+                now = time.monotonic()
+                if count != len(self._records) or now - self._last_reconcile > RECONCILE_SECONDS:
+                    self._reconcile(conn)
+                    self._last_reconcile = now
+
+            self._version = version
+            self._last_sync = time.monotonic()
+            self.syncs += 1
+        except Exception as e:
+            logger.warning(f"Listing index sync failed: {e}")
+        finally:
+            self._lock.release()
+
+    def refresh(self, cur, listing_ids):
+        """Re-read listings after a write in this worker, on the writer's cursor once committed"""
+        if not self.loaded:
+            return
+        try:
+            rows = _fetch(cur.connection, f"SELECT {LISTING_COLUMNS} FROM listings WHERE id = ANY(%s)", (list(listing_ids),))
+            with self._lock:
+                found = set()
+                for row in rows:
+                    record = IndexedListing(row)
+                    self._upsert(record)
+                    found.add(record.id)
+                for listing_id in set(listing_ids) - found:
+                    self._delete(listing_id)
+        except Exception as e:
+            cur.connection.rollback()
+            logger.warning(f"Listing index refresh failed, will catch up on next sync: {e}")
+            self._last_sync = 0.0
+
+    def remove(self, listing_id):
+        """Drop a listing deleted in this worker"""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._delete(listing_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'loaded': self.loaded,
+                'listings': len(self._records),
+                'version': self._version,
+                'syncs': self.syncs,
+                'queries': self.queries,
+                'secondsSinceSync': round(time.monotonic() - self._last_sync, 1) if self._loaded else None
+            }
+
+    # --- Internals (caller holds the lock) ---
+
+    def _read_version(self, cur, conn):
+        try:
+            versions = read_resource_versions(cur, ['listings'])
+        except Exception:
+            conn.rollback()
+            return None
+        return versions['listings'] if versions else None
+
+    def _reconcile(self, conn):
+        db_ids = {row[0] for row in _fetch(conn, "SELECT id FROM listings")}
+        for listing_id in set(self._records) - db_ids:
+            self._delete(listing_id)
+        missing = db_ids - set(self._records)
+        if missing:
+            for row in _fetch(conn, f"SELECT {LISTING_COLUMNS} FROM listings WHERE id = ANY(%s)", (list(missing),)):
+                self._upsert(IndexedListing(row))
+
+    def _rebuild_orders(self):
+        records = self._records.values()
+        self._orders = {}
+        for field in SORT_FIELDS:
+            orders = self._orders[field] = {}
+            for record in sorted(records, key=lambda r: (getattr(r, field), r.id)):
+                for bucket in record.buckets():
+                    ids = orders.get(bucket)
+                    if ids is None:
+                        ids = orders[bucket] = array('q')
+                    ids.append(record.id)
+
+    def _advance_watermark(self, record):
+        if record.updated_at and (self._watermark is None or record.updated_at > self._watermark):
+            self._watermark = record.updated_at
+
+    def _upsert(self, record):
+        self._delete(record.id)
+        self._records[record.id] = record
+        for field in SORT_FIELDS:
+            orders = self._orders[field]
+            key = self._key(field)
+            for bucket in record.buckets():
+                insort(orders.setdefault(bucket, array('q')), record.id, key=key)
+        self._advance_watermark(record)
+
+    def _delete(self, listing_id):
+        record = self._records.get(listing_id)
+        if record is None:
+            return
+        for field in SORT_FIELDS:
+            target = (getattr(record, field), listing_id)
+            orders = self._orders[field]
+            key = self._key(field)
+            for bucket in record.buckets():
+                ids = orders.get(bucket)
+                if not ids:
+                    continue
+                position = bisect_left(ids, target, key=key)
+                if position < len(ids) and ids[position] == listing_id:
+                    del ids[position]
+        del self._records[listing_id]
+
+    def _key(self, field):
+        records = self._records
+        return lambda listing_id: (getattr(records[listing_id], field), listing_id)
+
+def _build_listing_index():
+    if os.getenv('LISTING_INDEX_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    return ListingIndex(sync_seconds=float(os.getenv('LISTING_INDEX_SYNC_SECONDS', '5')))
+
+listing_index = _build_listing_index()
+
+def get_listing_index_stats():
+    if listing_index is None:
+        return {'enabled': False}
+    return listing_index.stats()
@@ -13,7 +13,16 @@ from sqlalchemy import text
 
 # Import the actual Flask app and db from your app package
 from app import app, db
-from models import User, Category, Listing, Transaction  # adjust imports as needed
+from models import User, Category, Listing, Transaction, AIResponseCache  # adjust imports as needed
+from database.metrics import install_dashboard_counters, rebuild_dashboard_counters
+from database.versions import install_resource_versions
+from database.geo import install_geo_index
+from database.search import install_search_index
+from database.rollups import install_user_rollups, rebuild_user_rollups, check_user_rollups
+from database.revocations import install_revoked_tokens
+from database.listing_images import install_listing_images
+from database.ai_jobs import install_ai_chat_jobs
+from purchases import install_purchase_schema
 
 # Initialize Flask app
 # app = create_app()
@@ -78,7 +87,7 @@ def ensure_core_tables():
 
             db.session.commit()
             print("Ensured core tables (listings, dashboard_metrics)")
-            return True
+        return ensure_indexes()
     except Exception as e:
         with app.app_context():
             db.session.rollback()
@@ -86,6 +95,182 @@ def ensure_core_tables():
         return False
 
 
+# --- Performance Indexes ---
+# Idempotent DDL for indexes the API query plans rely on
+PERFORMANCE_INDEXES = [
+    # Keyset pagination for GET /api/listings/ (sort key must match api/listings.py LISTING_SORT_KEY)
+    "CREATE INDEX IF NOT EXISTS idx_listings_created_id ON listings ((COALESCE(created_at, '1970-01-01'::timestamp)) DESC, id DESC);",
+    "CREATE INDEX IF NOT EXISTS idx_listings_status_created_id ON listings (status, (COALESCE(created_at, '1970-01-01'::timestamp)) DESC, id DESC);",
+    # Price sorts on GET /api/listings/?sort=price_asc|price_desc
+    "CREATE INDEX IF NOT EXISTS idx_listings_status_price_id ON listings (status, price_per_kwh, id);",
+    # Delta sync for the in-memory listing index (listing_index.py)
+    "CREATE INDEX IF NOT EXISTS idx_listings_updated_at ON listings (updated_at);",
+    # Keyset-paged purchase and sales history (sort key must match api/transactions.py HISTORY_SORT_KEY);
+    # INCLUDE makes them covering, so a page is an index-only scan plus one listings lookup per row
+    "CREATE INDEX IF NOT EXISTS idx_transactions_buyer_created_id ON transactions (buyer_id, (COALESCE(created_at, '1970-01-01'::timestamp)) DESC, id DESC) INCLUDE (listing_id, kwh_amount, total_price, created_at);",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_seller_created_id ON transactions (seller_id, (COALESCE(created_at, '1970-01-01'::timestamp)) DESC, id DESC) INCLUDE (listing_id, kwh_amount, total_price, created_at);",
+]
+
+
+def ensure_indexes():
+    """Create performance indexes if they do not exist (safe to re-run on a live database)"""
+    try:
+        with app.app_context():
+            for statement in PERFORMANCE_INDEXES:
+                db.session.execute(text(statement))
+            db.session.commit()
+            print(f"Ensured {len(PERFORMANCE_INDEXES)} performance indexes")
+            return True
+    except Exception as e:
+        with app.app_context():
+            db.session.rollback()
+        print(f"Failed ensuring performance indexes: {e}")
+        return False
+
+
+# --- Dashboard Counters ---
+def setup_dashboard_counters(rebuild_only=False):
+    """Install (or just reconcile) the materialized dashboard counters and print any drift"""
+    try:
+        report = rebuild_dashboard_counters() if rebuild_only else install_dashboard_counters()
+        for name, entry in report.items():
+            drift = entry['drift']
+            drift_note = f" (drift {drift:+,.2f})" if drift else ""
+            print(f"  - {name}: {entry['rebuilt']:,.2f}{drift_note}")
+        return True
+    except Exception as e:
+        print(f"Failed to set up dashboard counters: {e}")
+        return False
+
+
+# --- Resource Versions ---
+def setup_resource_versions():
+    """Install the version counters used to build ETags for listings and dashboard responses"""
+    try:
+        install_resource_versions()
+        print("Ensured resource version triggers on users, listings, transactions")
+        return True
+    except Exception as e:
+        print(f"Failed to set up resource versions: {e}")
+        return False
+
+
+def setup_geo_index():
+    """Install the grid cell function and index used by /api/listings/nearby"""
+    try:
+        install_geo_index()
+        print("Ensured geospatial grid index on active listings")
+        return True
+    except Exception as e:
+        print(f"Failed to set up geospatial index: {e}")
+        return False
+
+
+def setup_search_index():
+    """Install the full-text search column, trigger and indexes used by /api/listings/search"""
+    try:
+        report = install_search_index()
+        print(f"Ensured full-text search index on listings ({report['backfilled']:,} rows backfilled)")
+        if not report['trigram']:
+            print("pg_trgm is not available; location search falls back to substring matching")
+        return True
+    except Exception as e:
+        print(f"Failed to set up search index: {e}")
+        return False
+
+
+def setup_purchase_engine():
+    """Add the idempotency key index on transactions and the non-negative quantity check on listings"""
+    try:
+        install_purchase_schema()
+        print("Ensured purchase idempotency keys and listing quantity check")
+        return True
+    except Exception as e:
+        print(f"Failed to set up purchase engine schema: {e}")
+        return False
+
+
+# --- User Rollups ---
+def print_rollup_drift(report):
+    """Print the per-user rollup entries that disagree with the raw transactions"""
+    for entry in report['drifted'][:20]:
+        print(f"  - user {entry['userId']} ({entry['role']}): "
+              f"kWh {entry['kwh']['stored']:,.2f} -> {entry['kwh']['live']:,.2f}, "
+              f"amount {entry['amount']['stored']:,.2f} -> {entry['amount']['live']:,.2f}, "
+              f"count {entry['count']['stored']:,} -> {entry['count']['live']:,}")
+    if len(report['drifted']) > 20:
+        print(f"  ... and {len(report['drifted']) - 20:,} more")
+    print(f"  {len(report['drifted']):,} drifted totals, {report['driftedDailyBuckets']:,} drifted daily buckets")
+
+
+def setup_user_rollups(rebuild_only=False):
+    """Install (or just rebuild) the per-user purchase and sales rollups and print any drift"""
+    try:
+        report = rebuild_user_rollups() if rebuild_only else install_user_rollups()
+        print_rollup_drift(report)
+        print(f"  {report['totalsRows']:,} user totals, {report['dailyRows']:,} daily buckets written")
+        return True
+    except Exception as e:
+        print(f"Failed to set up user rollups: {e}")
+        return False
+
+
+def verify_user_rollups():
+    """Recompute the rollups from transactions and report drift without changing anything"""
+    try:
+        report = check_user_rollups()
+        print_rollup_drift(report)
+        return not report['drifted'] and not report['driftedDailyBuckets']
+    except Exception as e:
+        print(f"Failed to check user rollups: {e}")
+        return False
+
+
+def setup_ai_response_cache():
+    """Create the table that persists cached AI advice and its hit counts"""
+    try:
+        with app.app_context():
+            AIResponseCache.__table__.create(db.engine, checkfirst=True)
+        print("Ensured ai_response_cache table")
+        return True
+    except Exception as e:
+        print(f"Failed to set up AI response cache table: {e}")
+        return False
+
+
+def setup_revoked_tokens():
+    """Create the shared table of revoked (logged-out) JWTs"""
+    try:
+        install_revoked_tokens()
+        print("Ensured revoked_tokens table")
+        return True
+    except Exception as e:
+        print(f"Failed to set up revoked tokens table: {e}")
+        return False
+
+
+def setup_ai_chat_jobs():
+    """Create the shared table of AI chat job snapshots, so any worker can answer a poll"""
+    try:
+        install_ai_chat_jobs()
+        print("Ensured ai_chat_jobs table")
+        return True
+    except Exception as e:
+        print(f"Failed to set up AI chat jobs table: {e}")
+        return False
+
+
+def setup_listing_images():
+    """Create the table of processed listing images (dimensions and variants)"""
+    try:
+        install_listing_images()
+        print("Ensured listing_images table")
+        return True
+    except Exception as e:
+        print(f"Failed to set up listing images table: {e}")
+        return False
+
+
 # --- Migration Logic ---
 def run_migrations():
     """Drop existing tables and recreate them"""
@@ -280,6 +465,91 @@ if __name__ == '__main__':
             print("\nForeign key constraint fixed successfully.")
         else:
             print("\nFailed to fix foreign key constraint.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'dashboard-counters':
+        print("Installing materialized dashboard counters...")
+        if setup_dashboard_counters():
+            print("\nDashboard counters installed.")
+        else:
+            print("\nFailed to install dashboard counters.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'resource-versions':
+        print("Installing resource version triggers...")
+        if setup_resource_versions():
+            print("\nResource versions installed; ETags are now enabled.")
+        else:
+            print("\nFailed to install resource versions.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'geo-index':
+        print("Installing geospatial grid index...")
+        if setup_geo_index():
+            print("\nGeospatial index installed; /api/listings/nearby is ready.")
+        else:
+            print("\nFailed to install geospatial index.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'search-index':
+        print("Installing full-text search index...")
+        if setup_search_index():
+            print("\nSearch index installed; /api/listings/search is ready.")
+        else:
+            print("\nFailed to install search index.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'purchase-engine':
+        print("Installing purchase engine schema...")
+        if setup_purchase_engine():
+            print("\nPurchase engine schema installed; idempotency keys are enabled.")
+        else:
+            print("\nFailed to install purchase engine schema.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'user-rollups':
+        print("Installing per-user transaction rollups...")
+        if setup_user_rollups():
+            print("\nUser rollups installed; summaries are now primary-key reads.")
+        else:
+            print("\nFailed to install user rollups.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'check-rollups':
+        print("Checking per-user rollups against raw transactions...")
+        if verify_user_rollups():
+            print("\nUser rollups are consistent.")
+        else:
+            print("\nUser rollups drifted (run 'rebuild-rollups' to correct them).")
+            sys.exit(1)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-rollups':
+        print("Rebuilding per-user rollups from raw transactions...")
+        if setup_user_rollups(rebuild_only=True):
+            print("\nUser rollups reconciled.")
+        else:
+            print("\nFailed to rebuild user rollups.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'ai-cache':
+        print("Creating AI response cache table...")
+        if setup_ai_response_cache():
+            print("\nAI response cache table is in place.")
+        else:
+            print("\nFailed to create AI response cache table.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'revocations':
+        print("Creating revoked tokens table...")
+        if setup_revoked_tokens():
+            print("\nRevoked tokens table is in place; logouts are shared across workers.")
+        else:
+            print("\nFailed to create revoked tokens table.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'ai-jobs':
+        print("Creating AI chat jobs table...")
+        if setup_ai_chat_jobs():
+            print("\nAI chat jobs table is in place; job polls work on every worker.")
+        else:
+            print("\nFailed to create AI chat jobs table.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'listing-images':
+        print("Creating listing images table...")
+        if setup_listing_images():
+            print("\nListing images table is in place.")
+        else:
+            print("\nFailed to create listing images table.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'rebuild-metrics':
+        print("Rebuilding dashboard counters from raw tables...")
+        if setup_dashboard_counters(rebuild_only=True):
+            print("\nDashboard counters reconciled.")
+        else:
+            print("\nFailed to rebuild dashboard counters.")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'indexes':
+        print("Creating performance indexes...")
+        if ensure_indexes():
+            print("\nPerformance indexes are in place.")
+        else:
+            print("\nFailed to create performance indexes.")
     else:
         print("Setting up database (drop + recreate)...")
         # First run ORM migrations (drops and recreates base schema)
@@ -289,6 +559,15 @@ if __name__ == '__main__':
         # Fix foreign key constraint after tables are created
         if migrations_ok:
             fix_transaction_foreign_key()
+            setup_dashboard_counters()
+            setup_resource_versions()
+            setup_geo_index()
+            setup_search_index()
+            setup_purchase_engine()
+            setup_user_rollups()
+            setup_revoked_tokens()
+            setup_ai_chat_jobs()
+            setup_listing_images()
         if migrations_ok and schema_ok:
             print("\nMigration completed successfully.")
         else:
@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import create_access_token
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import password_hasher
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -27,10 +27,14 @@ class User(db.Model):
     ai_interactions = db.relationship('AIInteraction', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify a password; an outdated stored hash is replaced (commit to keep it)"""
+        matches, new_hash = password_hasher.verify(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+        return matches
 
     def generate_token(self):
         """Generate JWT token for authentication"""
@@ -127,6 +131,34 @@ class AIInteraction(db.Model):
         }
 
 
+class AIResponseCache(db.Model):
+    """Cached advisor answers and how often each was reused"""
+    __tablename__ = 'ai_response_cache'
+    
+    cache_key = db.Column(db.String(40), primary_key=True)
+    location = db.Column(db.String(200), nullable=False, default='')
+    role = db.Column(db.String(20), nullable=False, default='')
+    prompt = db.Column(db.Text, nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    tokens = db.Column(db.Integer, nullable=False, default=0)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'cache_key': self.cache_key,
+            'location': self.location,
+            'role': self.role,
+            'prompt': self.prompt,
+            'response': self.response,
+            'tokens': self.tokens,
+            'hit_count': self.hit_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_hit_at': self.last_hit_at.isoformat() if self.last_hit_at else None
+        }
+
+
 class Transaction(db.Model):
     """Buyer-seller transaction records"""
     __tablename__ = 'transactions'
@@ -140,6 +172,7 @@ class Transaction(db.Model):
     status = db.Column(db.String(20), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
+    idempotency_key = db.Column(db.String(64), nullable=True)  # Unique per buyer, see purchases.py
     
     buyer = db.relationship('User', foreign_keys=[buyer_id], backref='purchases')
     seller = db.relationship('User', foreign_keys=[seller_id], backref='sales')
@@ -0,0 +1,155 @@
+"""
+Password Hashing Pool
+Password hashing and verification are deliberately slow key derivations.
+Run inline, a burst of logins or registrations holds every request thread
+and CPU core and stalls unrelated reads behind them. Here they run on a small
+process pool per worker (PASSWORD_HASH_WORKERS), with at most
+PASSWORD_HASH_MAX_PENDING in flight; beyond that callers get PasswordHasherBusy
+at once and the route answers 503 instead of queueing.
+
+Stored hashes made with an older method (e.g. fewer pbkdf2 iterations) are
+re-derived with PASSWORD_HASH_METHOD on the next successful login, in the
+same pool task as the verification.
+
+PASSWORD_HASH_WORKERS=0 hashes in the request thread, as before (no limit).
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from worker_pool import WorkerPool
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashes are in flight or one did not finish in time"""
+
+def normalize_method(method):
+    """Expand werkzeug shorthands ('pbkdf2', 'scrypt') to the prefix stored in the hash"""
+    name, *args = method.split(':')
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    return method
+
+def needs_rehash(stored_hash, method):
+    return stored_hash.split('$', 1)[0] != method
+
+def _hash(password, method):
+    started = time.perf_counter()
+    return generate_password_hash(password, method), time.perf_counter() - started
+
+def _verify(stored_hash, password, method):
+    """(matches, new hash when the stored one used another method, seconds)"""
+    started = time.perf_counter()
+    matches = check_password_hash(stored_hash, password)
+    new_hash = None
+    if matches and needs_rehash(stored_hash, method):
+        new_hash = generate_password_hash(password, method)
+    return matches, new_hash, time.perf_counter() - started
+
+class PasswordHasher:
+    """
+    Bounded process pool for password hashes, created on first use in each worker process
+    workers: pool processes (0: hash inline in the calling thread)
+    max_pending: hashes queued or running before new ones are refused
+    timeout: seconds a caller waits for its hash before giving up with PasswordHasherBusy
+    nice: niceness of the pool processes (see WorkerPool)
+    """
+
+    def __init__(self, method='pbkdf2', workers=1, max_pending=8, timeout=10.0, nice=10):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # Hashes counted by a parent process never finish in a forked child
+        self._pool = WorkerPool(workers, nice, on_start=self._reset_in_flight)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+        # Counters exposed through stats()
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.busy_seconds = 0.0
+
+    def hash(self, password):
+        """Hash a new password with the configured method"""
+        password_hash, seconds = self._run(_hash, password, self.method)
+        self.hashed += 1
+        self.busy_seconds += seconds
+        return password_hash
+
+    def verify(self, stored_hash, password):
+        """
+        Check a password against its stored hash
+        Returns: (matches, new_hash); new_hash is set when the stored hash should be replaced
+        """
+        matches, new_hash, seconds = self._run(_verify, stored_hash, password, self.method)
+        self.verified += 1
+        self.busy_seconds += seconds
+        if new_hash:
+            self.rehashed += 1
+        return matches, new_hash
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        executor = self._pool.get()
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy(f'{self._in_flight} password hashes already in flight')
+            self._in_flight += 1
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The hash keeps its slot until it finishes, so a stuck pool keeps refusing work
+            self.timeouts += 1
+            raise PasswordHasherBusy(f'password hash did not finish within {self.timeout}s')
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _reset_in_flight(self):
+        with self._lock:
+            self._in_flight = 0
+
+    def stats(self):
+        done = self.hashed + self.verified
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'maxPending': self.max_pending,
+            'inFlight': self._in_flight,
+            'hashed': self.hashed,
+            'verified': self.verified,
+            'rehashed': self.rehashed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'avgHashMs': round(self.busy_seconds / done * 1000, 1) if done else None
+        }
+
+password_hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2'),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', '1')),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '8')),
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', '10')),
+    nice=int(os.getenv('PASSWORD_HASH_NICE', '10'))
+)
+
+def get_password_hasher_stats():
+    """Pool size and hash counters for this worker process"""
+    return {'pid': os.getpid(), **password_hasher.stats()}
@@ -0,0 +1,395 @@
+"""
+Purchase Engine
+Sells listing quantity atomically: a single conditional UPDATE reserves the
+kWh (marking the listing sold out when nothing is left) and the transaction
+row is inserted in the same database transaction. Concurrent buyers queue on
+the listing's row lock for just that statement-to-commit window, and a buyer
+whose UPDATE matches no row gets a clear refusal instead of oversold energy.
+
+Idempotency keys are scoped per buyer: retrying a purchase with the same key
+returns the original transaction instead of charging again, including when
+the retry races the first attempt (the unique index decides the winner).
+
+Batches (multi-listing carts) lock every listing in one id-ordered query,
+reserve with one UPDATE ... FROM VALUES and insert every transaction with
+one multi-row INSERT: either every line is bought or nothing is.
+"""
+
+import math
+import logging
+from collections import defaultdict
+from psycopg2 import errors
+from psycopg2.extras import execute_values
+from database.config import get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = 'active'
+SOLD_OUT = 'sold_out'
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+# Lines per batch purchase; batch line keys are "<key>:<line>"
+MAX_BATCH_LINES = 100
+MAX_BATCH_IDEMPOTENCY_KEY_LENGTH = MAX_IDEMPOTENCY_KEY_LENGTH - len(f':{MAX_BATCH_LINES - 1}')
+
+# Float quantities: remainders this small count as sold out
+KWH_EPSILON = 1e-9
+
+PURCHASE_SCHEMA_DDL = """
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_buyer_idempotency
+    ON transactions (buyer_id, idempotency_key)
+    WHERE idempotency_key IS NOT NULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'listings_available_kwh_nonnegative') THEN
+        ALTER TABLE listings ADD CONSTRAINT listings_available_kwh_nonnegative
+            CHECK (available_kwh >= 0) NOT VALID;
+    END IF;
+END $$;
+"""
+
+# Reserve quantity; matches no row when the listing is gone, inactive or short
+RESERVE_SQL = """
+    UPDATE listings
+    SET available_kwh = CASE WHEN available_kwh - %(kwh)s <= %(epsilon)s THEN 0
+                             ELSE available_kwh - %(kwh)s END,
+        status = CASE WHEN available_kwh - %(kwh)s <= %(epsilon)s THEN %(sold_out)s
+                      ELSE status END,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = %(listing_id)s
+      AND status = %(active)s
+      AND available_kwh >= %(kwh)s - %(epsilon)s
+    RETURNING id, user_id AS seller_id, price_per_kwh, available_kwh, status
+"""
+
+class PurchaseError(Exception):
+    """A purchase the engine refused; status_code is the HTTP status to answer with"""
+    status_code = 400
+
+class ListingNotFound(PurchaseError):
+    status_code = 404
+
+class ListingUnavailable(PurchaseError):
+    """Listing exists but is not for sale (inactive or sold out)"""
+    status_code = 409
+
+class InsufficientQuantity(PurchaseError):
+    status_code = 409
+
+    def __init__(self, message, available_kwh):
+        super().__init__(message)
+        self.available_kwh = available_kwh
+
+class IdempotencyConflict(PurchaseError):
+    """The idempotency key was already used for a different purchase"""
+    status_code = 422
+
+class BatchRejected(PurchaseError):
+    """
+    At least one batch line could not be bought, so none were
+    lines: per-line results; status_code is the most severe line status
+    """
+
+    def __init__(self, message, lines):
+        super().__init__(message)
+        self.lines = lines
+        self.status_code = max(line['statusCode'] for line in lines if line['status'] == 'error')
+
+def install_purchase_schema():
+    """Add the idempotency key column and index, and the non-negative quantity check"""
+    with get_db_cursor() as (cur, conn):
+        cur.execute(PURCHASE_SCHEMA_DDL)
+        conn.commit()
+    return True
+
+def parse_quantity(value):
+    """kWh to buy as a positive finite float; raises PurchaseError"""
+    try:
+        kwh = float(value)
+    except (TypeError, ValueError):
+        raise PurchaseError('kwh must be a number')
+    if not math.isfinite(kwh) or kwh <= 0:
+        raise PurchaseError('kwh must be greater than 0')
+    return kwh
+
+def parse_idempotency_key(value, max_length=MAX_IDEMPOTENCY_KEY_LENGTH):
+    """Optional client idempotency key; raises PurchaseError when malformed"""
+    if value is None or value == '':
+        return None
+    key = str(value).strip()
+    if not key or len(key) > max_length:
+        raise PurchaseError(f'Idempotency key must be 1-{max_length} characters')
+    return key
+
+def parse_batch_lines(value):
+    """
+    Batch lines as [(listing_id, kwh), ...] in request order
+    Raises PurchaseError naming the first malformed line
+    """
+    if not isinstance(value, list) or not value:
+        raise PurchaseError('lines must be a non-empty list of { listingId, kwh }')
+    if len(value) > MAX_BATCH_LINES:
+        raise PurchaseError(f'A batch can contain at most {MAX_BATCH_LINES} lines')
+    lines = []
+    for index, item in enumerate(value):
+        if not isinstance(item, dict):
+            raise PurchaseError(f'Line {index}: expected {{ listingId, kwh }}')
+        try:
+            listing_id = int(item.get('listingId'))
+        except (TypeError, ValueError):
+            raise PurchaseError(f'Line {index}: listingId must be an integer')
+        try:
+            kwh = parse_quantity(item.get('kwh'))
+        except PurchaseError as e:
+            raise PurchaseError(f'Line {index}: {e}')
+        lines.append((listing_id, kwh))
+    return lines
+
+def _refusal(current, kwh):
+    """Why a listing row (or None when missing) cannot supply kwh; None when it can"""
+    if not current:
+        return ListingNotFound('Listing not found')
+    if current['status'] == SOLD_OUT:
+        return ListingUnavailable('Listing is sold out')
+    if current['status'] != ACTIVE:
+        return ListingUnavailable('Listing is not available for purchase')
+    available = float(current['available_kwh'] or 0)
+    if available < kwh - KWH_EPSILON:
+        return InsufficientQuantity(f'Only {available:g} kWh available', available)
+    return None
+
+def reserve(cur, listing_id, kwh):
+    """
+    Atomically take kwh from an active listing
+    Returns the updated listing row; raises ListingNotFound, ListingUnavailable
+    or InsufficientQuantity (the caller rolls back)
+    """
+    cur.execute(RESERVE_SQL, {
+        'listing_id': listing_id,
+        'kwh': kwh,
+        'epsilon': KWH_EPSILON,
+        'active': ACTIVE,
+        'sold_out': SOLD_OUT
+    })
+    listing = cur.fetchone()
+    if listing:
+        return listing
+
+    # Work out why nothing matched, for the error message
+    cur.execute("SELECT status, available_kwh FROM listings WHERE id = %s", (listing_id,))
+    current = cur.fetchone()
+    # No refusal means stock came back between the two statements
+    raise _refusal(current, kwh) or ListingUnavailable('Listing changed during purchase, please retry')
+
+def find_keyed_transactions(cur, buyer_id, idempotency_keys):
+    """Earlier purchases recorded under any of the keys, as {key: row}"""
+    cur.execute("""
+        SELECT t.id, t.buyer_id, t.seller_id, t.listing_id, t.kwh_amount, t.total_price,
+               t.created_at, t.completed_at, t.idempotency_key,
+               l.available_kwh, l.status AS listing_status
+        FROM transactions t
+        LEFT JOIN listings l ON l.id = t.listing_id
+        WHERE t.buyer_id = %s AND t.idempotency_key = ANY(%s)
+    """, (buyer_id, list(idempotency_keys)))
+    return {row['idempotency_key']: row for row in cur.fetchall()}
+
+def find_keyed_transaction(cur, buyer_id, idempotency_key):
+    return find_keyed_transactions(cur, buyer_id, [idempotency_key]).get(idempotency_key)
+
+def _receipt(tx, buyer_id, seller_id, listing_id, kwh, total_price, remaining_kwh, listing_status):
+    return {
+        'id': tx['id'],
+        'buyerId': buyer_id,
+        'sellerId': seller_id,
+        'listingId': listing_id,
+        'kwh': float(kwh),
+        'totalPrice': float(total_price),
+        'createdAt': tx['created_at'].isoformat() if tx['created_at'] else None,
+        'completedAt': tx['completed_at'].isoformat() if tx['completed_at'] else None,
+        'remainingKwh': float(remaining_kwh) if remaining_kwh is not None else None,
+        'listingStatus': listing_status
+    }
+
+def _replay(existing, listing_id, kwh):
+    """Receipt for an already-recorded keyed purchase, if it is the same purchase"""
+    if existing['listing_id'] != int(listing_id) or abs(float(existing['kwh_amount']) - kwh) > KWH_EPSILON:
+        raise IdempotencyConflict('Idempotency key was already used for a different purchase')
+    return _receipt(
+        existing, existing['buyer_id'], existing['seller_id'], existing['listing_id'],
+        existing['kwh_amount'], existing['total_price'],
+        existing['available_kwh'], existing['listing_status']
+    )
+
+def purchase(cur, conn, buyer_id, listing_id, kwh, idempotency_key=None):
+    """
+    Buy kwh from a listing as buyer_id and commit
+    Returns: (receipt dict, replayed) where replayed is True when the
+    idempotency key matched an earlier purchase and nothing new was charged
+    Raises PurchaseError subclasses (after rolling back)
+    """
+    if idempotency_key:
+        existing = find_keyed_transaction(cur, buyer_id, idempotency_key)
+        if existing:
+            conn.rollback()
+            return _replay(existing, listing_id, kwh), True
+
+    try:
+        listing = reserve(cur, listing_id, kwh)
+        total_price = float(listing['price_per_kwh']) * kwh
+
+        columns = "buyer_id, seller_id, listing_id, kwh_amount, total_price, status, created_at, completed_at"
+        values = "%s, %s, %s, %s, %s, 'completed', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP"
+        params = [buyer_id, listing['seller_id'], listing_id, kwh, total_price]
+        if idempotency_key:
+            columns += ", idempotency_key"
+            values += ", %s"
+            params.append(idempotency_key)
+        cur.execute(f"""
+            INSERT INTO transactions ({columns})
+            VALUES ({values})
+            RETURNING id, created_at, completed_at
+        """, params)
+        tx = cur.fetchone()
+        conn.commit()
+    except errors.UniqueViolation:
+        # A concurrent retry with the same key committed first; its reservation stands, ours is undone
+        conn.rollback()
+        existing = find_keyed_transaction(cur, buyer_id, idempotency_key)
+        conn.rollback()
+        if not existing:
+            raise
+        return _replay(existing, listing_id, kwh), True
+    except Exception:
+        conn.rollback()
+        raise
+
+    return _receipt(
+        tx, buyer_id, listing['seller_id'], listing['id'], kwh, total_price,
+        listing['available_kwh'], listing['status']
+    ), False
+
+# Reserve every batch listing at once; rows are already locked and checked
+BATCH_RESERVE_SQL = f"""
+    UPDATE listings l
+    SET available_kwh = CASE WHEN l.available_kwh - v.kwh <= {KWH_EPSILON} THEN 0
+                             ELSE l.available_kwh - v.kwh END,
+        status = CASE WHEN l.available_kwh - v.kwh <= {KWH_EPSILON} THEN '{SOLD_OUT}'
+                      ELSE l.status END,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (VALUES %s) AS v (id, kwh)
+    WHERE l.id = v.id
+    RETURNING l.id, l.available_kwh, l.status
+"""
+
+BATCH_INSERT_SQL = """
+    INSERT INTO transactions (buyer_id, seller_id, listing_id, kwh_amount, total_price, status,
+                              created_at, completed_at, idempotency_key)
+    VALUES %s
+    RETURNING id, created_at, completed_at
+"""
+BATCH_INSERT_TEMPLATE = "(%s, %s, %s, %s, %s, 'completed', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, %s)"
+
+def _batch_keys(idempotency_key, count):
+    return [f'{idempotency_key}:{index}' for index in range(count)]
+
+def _replay_batch(existing, keys, lines):
+    """Receipts for a batch recorded earlier under the same key"""
+    if len(existing) != len(keys):
+        raise IdempotencyConflict('Idempotency key was already used for a different purchase')
+    return [_replay(existing[key], listing_id, kwh) for key, (listing_id, kwh) in zip(keys, lines)]
+
+def _rejected_lines(lines, refusals):
+    """Per-line results for a refused batch"""
+    results = []
+    for index, (listing_id, kwh) in enumerate(lines):
+        line = {'line': index, 'listingId': listing_id, 'kwh': kwh}
+        refusal = refusals.get(listing_id)
+        if refusal is None:
+            line['status'] = 'ok'
+        else:
+            line.update(status='error', message=str(refusal), statusCode=refusal.status_code)
+            if isinstance(refusal, InsufficientQuantity):
+                line['availableKwh'] = refusal.available_kwh
+        results.append(line)
+    return results
+
+def purchase_batch(cur, conn, buyer_id, lines, idempotency_key=None):
+    """
+    Buy every (listing_id, kwh) line as buyer_id in one database transaction
+    and commit; lines for the same listing draw on its stock together
+    Returns: (list of receipts in line order, replayed)
+    Raises BatchRejected with per-line results when any line cannot be
+    bought (nothing is charged), or IdempotencyConflict
+    """
+    keys = _batch_keys(idempotency_key, len(lines)) if idempotency_key else [None] * len(lines)
+    if idempotency_key:
+        existing = find_keyed_transactions(cur, buyer_id, keys)
+        if existing:
+            conn.rollback()
+            return _replay_batch(existing, keys, lines), True
+
+    wanted = defaultdict(float)
+    for listing_id, kwh in lines:
+        wanted[listing_id] += kwh
+
+    try:
+        # Id order keeps concurrent batches from deadlocking on each other's listings
+        cur.execute("""
+            SELECT id, user_id AS seller_id, price_per_kwh, available_kwh, status
+            FROM listings
+            WHERE id = ANY(%s)
+            ORDER BY id
+            FOR UPDATE
+        """, (sorted(wanted),))
+        listings = {row['id']: row for row in cur.fetchall()}
+
+        refusals = {}
+        for listing_id, kwh in wanted.items():
+            refusal = _refusal(listings.get(listing_id), kwh)
+            if refusal:
+                refusals[listing_id] = refusal
+        if refusals:
+            conn.rollback()
+            raise BatchRejected(
+                f'{len(refusals)} of {len(wanted)} listings cannot fill this order; nothing was purchased',
+                _rejected_lines(lines, refusals)
+            )
+
+        reserved = execute_values(
+            cur, BATCH_RESERVE_SQL, list(wanted.items()),
+            template='(%s::integer, %s::double precision)', page_size=len(wanted), fetch=True
+        )
+        remaining = {row['id']: row for row in reserved}
+
+        rows = []
+        for (listing_id, kwh), key in zip(lines, keys):
+            listing = listings[listing_id]
+            rows.append((buyer_id, listing['seller_id'], listing_id, kwh,
+                         float(listing['price_per_kwh']) * kwh, key))
+        inserted = execute_values(
+            cur, BATCH_INSERT_SQL, rows, template=BATCH_INSERT_TEMPLATE, page_size=len(rows), fetch=True
+        )
+        conn.commit()
+    except errors.UniqueViolation:
+        # A concurrent retry of the same batch committed first
+        conn.rollback()
+        existing = find_keyed_transactions(cur, buyer_id, keys)
+        conn.rollback()
+        if not existing:
+            raise
+        return _replay_batch(existing, keys, lines), True
+    except Exception:
+        conn.rollback()
+        raise
+
+    receipts = []
+    for tx, (buyer, seller_id, listing_id, kwh, total_price, _) in zip(inserted, rows):
+        receipts.append(_receipt(
+            tx, buyer, seller_id, listing_id, kwh, total_price,
+            remaining[listing_id]['available_kwh'], remaining[listing_id]['status']
+        ))
+    return receipts, False
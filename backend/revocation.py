@@ -0,0 +1,302 @@
+"""
+JWT Revocation Store
+Logged-out token ids (jti) are written to a shared backend (the
+revoked_tokens table by default) so every worker process and node honours a
+logout, and each entry lives only until the token's own exp.
+
+Every authenticated request asks whether its token is revoked, and almost
+every answer is no. Each worker keeps an in-process Bloom filter of the
+revoked jtis: a miss means "not revoked" without touching the backend; only
+filter hits (revoked tokens and rare false positives) are confirmed against
+it. The filter catches up with revocations made by other workers every
+REVOCATION_SYNC_SECONDS, so a logout elsewhere takes effect within that
+window. It is rebuilt every REVOCATION_REBUILD_SECONDS so expired tokens age
+out of it.
+
+REVOCATION_BACKEND=postgres (shared) or memory (this process only; a
+stand-in for tests, where stores sharing one MemoryRevocationBackend act as
+separate workers).
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from datetime import timedelta
+import psycopg2
+from database.config import get_db_cursor
+from database.revocations import (
+    install_revoked_tokens, insert_revocation, is_token_revoked,
+    read_revocations, purge_expired_revocations
+)
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings
+    Probes come from the process's own str hash, so a filter is only
+    meaningful inside the process that built it
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+    def add(self, key):
+        # Double hashing: probe i is h1 + i * h2 (mod size), from the two halves of the str hash
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) & 0xFFFFFFFF | 1
+        bits, size = self._bits, self.size
+        for _ in range(self.hashes):
+            position = h1 % size
+            bits[position >> 3] |= 1 << (position & 7)
+            h1 += h2
+        self.count += 1
+
+    def __contains__(self, key):
+        # Absent keys usually fail the first or second probe, so test the first one before looping
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) & 0xFFFFFFFF | 1
+        bits, size = self._bits, self.size
+        position = h1 % size
+        if not bits[position >> 3] >> (position & 7) & 1:
+            return False
+        for _ in range(self.hashes - 1):
+            h1 += h2
+            position = h1 % size
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+class MemoryRevocationBackend:
+    """Process-local revocation list with the same interface as the Postgres backend"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._expires = {}      # jti -> exp (epoch seconds)
+        self._log = []          # (revoked_at, jti), in revocation order
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            if self._expires.get(jti, 0) > time.time():
+                return False
+            self._expires[jti] = expires_at if expires_at is not None else math.inf
+            self._log.append((time.time(), jti))
+            return True
+
+    def is_revoked(self, jti):
+        return self._expires.get(jti, 0) > time.time()
+
+    def read(self, since=None):
+        now = time.time()
+        with self._lock:
+            jtis = [
+                jti for revoked_at, jti in self._log
+                if (since is None or revoked_at >= since) and self._expires.get(jti, 0) > now
+            ]
+        return jtis, now
+
+    @staticmethod
+    def rewind(read_at, seconds):
+        return read_at - seconds
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            expired = {jti for jti, expires_at in self._expires.items() if expires_at <= now}
+            for jti in expired:
+                del self._expires[jti]
+            self._log = [(revoked_at, jti) for revoked_at, jti in self._log if jti not in expired]
+        return len(expired)
+
+class PostgresRevocationBackend:
+    """Revocation list in the revoked_tokens table, shared by every worker and node"""
+
+    name = 'postgres'
+
+    def revoke(self, jti, expires_at):
+        try:
+            return self._revoke(jti, expires_at)
+        except psycopg2.errors.UndefinedTable:
+            # First logout before 'python migrate.py revocations' ran
+            install_revoked_tokens()
+            return self._revoke(jti, expires_at)
+
+    @staticmethod
+    def _revoke(jti, expires_at):
+        with get_db_cursor() as (cur, conn):
+            inserted = insert_revocation(cur, jti, expires_at)
+            conn.commit()
+            return inserted
+
+    def is_revoked(self, jti):
+        with get_db_cursor() as (cur, conn):
+            return is_token_revoked(cur, jti)
+
+    def read(self, since=None):
+        try:
+            with get_db_cursor() as (cur, conn):
+                return read_revocations(cur, since)
+        except psycopg2.errors.UndefinedTable:
+            # Nothing has been revoked yet
+            return [], since
+
+    @staticmethod
+    def rewind(read_at, seconds):
+        return read_at - timedelta(seconds=seconds) if read_at is not None else None
+
+    def purge(self):
+        try:
+            with get_db_cursor() as (cur, conn):
+                removed = purge_expired_revocations(cur)
+                conn.commit()
+                return removed
+        except psycopg2.errors.UndefinedTable:
+            return 0
+
+class RevocationStore:
+    """
+    Bloom-filtered view of a revocation backend for one worker process
+    sync_interval: seconds between catch-up reads of revocations made elsewhere (0: every lookup)
+    rebuild_interval: seconds between full reloads, which drop expired tokens from the filter
+    """
+
+    # Catch-up reads start this far before the previous read, so a revocation
+    # committed just after that read is still picked up
+    SYNC_OVERLAP = 5
+
+    def __init__(self, backend, capacity=100000, error_rate=0.001, sync_interval=1.0, rebuild_interval=3600):
+        self.backend = backend
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = None      # backend time of the last read
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+
+        # Counters exposed through stats(); updated without a lock, so approximate under threads
+        self.lookups = 0
+        self.filter_hits = 0
+        self.false_positives = 0
+        self.backend_errors = 0
+        self.syncs = 0
+        self.rebuilds = 0
+
+    def revoke(self, jti, expires_at=None):
+        """
+        Revoke a token until expires_at (its exp claim, epoch seconds)
+        Returns: False if it was already revoked, decided atomically by the backend
+        """
+        inserted = self.backend.revoke(jti, expires_at)
+        with self._lock:
+            self._bloom.add(jti)
+        return inserted
+
+    def is_revoked(self, jti):
+        """True if the token was revoked and has not expired yet"""
+        self.lookups += 1
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        if jti not in self._bloom:
+            return False
+
+        self.filter_hits += 1
+        try:
+            revoked = self.backend.is_revoked(jti)
+        except Exception as e:
+            # Filter hits are almost always real revocations, so fail closed
+            self.backend_errors += 1
+            logger.warning(f"Revocation backend lookup failed, treating token as revoked: {e}")
+            return True
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def sync(self, rebuild=False):
+        """Catch up with the backend, or reload the whole filter when a rebuild is due"""
+        if not self._sync_lock.acquire(blocking=False):
+            # Another thread is syncing; answer from the current filter
+            return
+        try:
+            now = time.monotonic()
+            rebuild = rebuild or now >= self._next_rebuild or self._bloom.count > self._bloom.capacity
+            try:
+                if rebuild:
+                    self.backend.purge()
+                    jtis, read_at = self.backend.read()
+                    bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+                    for jti in jtis:
+                        bloom.add(jti)
+                    with self._lock:
+                        self._bloom = bloom
+                    self._next_rebuild = now + self.rebuild_interval
+                    self.rebuilds += 1
+                else:
+                    since = self.backend.rewind(self._synced_at, self.SYNC_OVERLAP)
+                    jtis, read_at = self.backend.read(since)
+                    with self._lock:
+                        for jti in jtis:
+                            if jti not in self._bloom:
+                                self._bloom.add(jti)
+                self._synced_at = read_at
+                self.syncs += 1
+            except Exception as e:
+                self.backend_errors += 1
+                logger.warning(f"Revocation sync failed, using the current filter: {e}")
+            self._next_sync = now + self.sync_interval
+        finally:
+            self._sync_lock.release()
+
+    def stats(self):
+        bloom = self._bloom
+        return {
+            'backend': self.backend.name,
+            'lookups': self.lookups,
+            'filterHits': self.filter_hits,
+            'falsePositives': self.false_positives,
+            'backendErrors': self.backend_errors,
+            'syncs': self.syncs,
+            'rebuilds': self.rebuilds,
+            'syncIntervalSeconds': self.sync_interval,
+            'filter': {
+                'entries': bloom.count,
+                'capacity': bloom.capacity,
+                'bytes': bloom.nbytes,
+                'hashes': bloom.hashes,
+                'targetErrorRate': bloom.error_rate
+            }
+        }
+
+def _build_backend():
+    backend = os.getenv('REVOCATION_BACKEND', 'postgres').lower()
+    if backend == 'memory':
+        return MemoryRevocationBackend()
+    return PostgresRevocationBackend()
+
+revocation_store = RevocationStore(
+    _build_backend(),
+    capacity=int(os.getenv('REVOCATION_BLOOM_CAPACITY', '100000')),
+    error_rate=float(os.getenv('REVOCATION_BLOOM_ERROR_RATE', '0.001')),
+    sync_interval=float(os.getenv('REVOCATION_SYNC_SECONDS', '1')),
+    rebuild_interval=float(os.getenv('REVOCATION_REBUILD_SECONDS', '3600'))
+)
+
+def get_revocation_stats():
+    """Filter size and lookup counters for this worker process"""
+    return {'pid': os.getpid(), **revocation_store.stats()}
@@ -0,0 +1,170 @@
+"""
+Seller Ranking Engine
+Scores listings for AIService.rank_nearby_sellers in one batched NumPy pass:
+haversine distance plus the weighted price / availability / energy-type
+score, followed by a partial top-k selection instead of a full sort.
+
+Scores and ordering match the original per-listing loop: ai_score is rounded
+to two decimals with Python's rounding, and equal scores keep input order.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+DEFAULT_WEIGHTS = {
+    'price': 0.4,
+    'availability': 0.3,
+    'energy_type': 0.3,
+    'distance': 0.0
+}
+
+ENERGY_TYPE_SCORES = {
+    'solar': 1.0,
+    'wind': 0.9,
+    'hydro': 0.8,
+    'geothermal': 0.9,
+    'biomass': 0.7
+}
+DEFAULT_ENERGY_TYPE_SCORE = 0.5
+
+# Proximity score is 1 / (1 + distance / scale), only used when weights['distance'] > 0
+DISTANCE_SCALE_KM = 10.0
+
+def _column(listings, field):
+    """Float column for a listing field; missing or null values become NaN"""
+    nan = float('nan')
+    return np.fromiter(
+        (nan if value is None else value for value in (listing.get(field) for listing in listings)),
+        dtype=np.float64,
+        count=len(listings)
+    )
+
+def haversine_km(lat, lon, lats, lons):
+    """Distance in km from (lat, lon) to each point of the lats/lons arrays"""
+    lat1 = np.radians(lat)
+    lats2 = np.radians(lats)
+    dlat = lats2 - lat1
+    dlon = np.radians(lons - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lats2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+def price_scores(prices):
+    """Lower price = higher score, linear between 0.10 and 0.50 per kWh"""
+    return np.where(prices <= 0.10, 1.0, np.where(prices >= 0.50, 0.0, 1.0 - ((prices - 0.10) / 0.40)))
+
+def availability_scores(available):
+    return np.select(
+        [available >= 1000, available >= 500, available >= 100],
+        [1.0, 0.8, 0.6],
+        default=0.4
+    )
+
+def energy_type_scores(energy_types, table=ENERGY_TYPE_SCORES):
+    """Score column for energy types, normalizing each distinct spelling once"""
+    seen = {}
+
+    def lookup(energy_type):
+        score = seen.get(energy_type)
+        if score is None:
+            score = seen[energy_type] = table.get(str(energy_type).lower(), DEFAULT_ENERGY_TYPE_SCORE)
+        return score
+
+    return np.fromiter((lookup(t) for t in energy_types), dtype=np.float64, count=len(energy_types))
+
+def round2(values):
+    """
+    Round to 2 decimals exactly like Python's round()
+    np.round works on value * 100 and can disagree right at the .xx5 boundary,
+    so the few values that land there are re-rounded in Python
+    """
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    boundary = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if boundary.size:
+        unique, inverse = np.unique(values[boundary], return_inverse=True)
+        rounded[boundary] = np.array([round(float(value), 2) for value in unique])[inverse]
+    return rounded
+
+class SellerRankingEngine:
+    """Batched scorer for nearby-seller ranking"""
+
+    def __init__(self, weights=None, energy_type_scores=None):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.energy_type_table = energy_type_scores or ENERGY_TYPE_SCORES
+
+    def score(self, user_location, listings):
+        """
+        Score every listing
+        Returns: dict of NumPy arrays (distance_km, ai_score, price_score,
+        availability_score, energy_type_score) aligned with `listings`
+        """
+        return self.score_columns(
+            user_location,
+            _column(listings, 'latitude'),
+            _column(listings, 'longitude'),
+            _column(listings, 'price_per_kwh'),
+            _column(listings, 'available_kwh'),
+            energy_type_scores([listing.get('energy_type') for listing in listings], self.energy_type_table)
+        )
+
+    def score_columns(self, user_location, lats, lons, prices, available, energy):
+        """
+        Score listings already held as aligned float arrays
+        (`energy` is the per-listing energy type score, see energy_type_scores)
+        """
+        if np.isnan(prices).any() or np.isnan(available).any():
+            raise ValueError('every listing needs price_per_kwh and available_kwh to be scored')
+
+        lat, lon = user_location
+        distances = haversine_km(float(lat), float(lon), lats, lons)
+        price = price_scores(prices)
+        availability = availability_scores(available)
+
+        weights = self.weights
+        ai_score = price * weights['price'] + availability * weights['availability'] + energy * weights['energy_type']
+        if weights['distance']:
+            proximity = np.where(np.isnan(distances), 0.0, 1.0 / (1.0 + distances / DISTANCE_SCALE_KM))
+            ai_score = ai_score + proximity * weights['distance']
+
+        return {
+            'distance_km': distances,
+            'ai_score': round2(ai_score),
+            'price_score': price,
+            'availability_score': availability,
+            'energy_type_score': energy
+        }
+
+    def top_indices(self, ai_scores, top_k=None):
+        """
+        Indices of the best `top_k` scores, highest first, ties in input order
+        Uses argpartition so only the selected slice is fully sorted
+        """
+        n = len(ai_scores)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        # Rounded scores are whole hundredths: pack (score, -index) into one int64 key
+        key = np.rint(ai_scores * 100).astype(np.int64) * n + (n - 1 - np.arange(n, dtype=np.int64))
+        if top_k is not None and top_k < n:
+            selected = np.argpartition(-key, top_k - 1)[:top_k] if top_k > 0 else np.empty(0, dtype=np.int64)
+        else:
+            selected = np.arange(n)
+        return selected[np.argsort(-key[selected], kind='stable')]
+
+    def rank(self, user_location, listings, top_k=None):
+        """Ranked listing dicts (best first) with distance and score fields added"""
+        if not listings:
+            return []
+        scores = self.score(user_location, listings)
+        ranked = []
+        for i in self.top_indices(scores['ai_score'], top_k):
+            distance = scores['distance_km'][i]
+            ranked.append({
+                **listings[i],
+                'distance_km': None if np.isnan(distance) else round(float(distance), 2),
+                'ai_score': float(scores['ai_score'][i]),
+                'price_score': float(scores['price_score'][i]),
+                'availability_score': float(scores['availability_score'][i]),
+                'energy_type_score': float(scores['energy_type_score'][i])
+            })
+        return ranked
@@ -0,0 +1,150 @@
+"""
+User Context
+The authenticated user's profile (User.to_dict() shape), resolved at most
+once per request and kept in a small per-worker LRU (USER_CONTEXT_TTL
+seconds, USER_CONTEXT_MAX_ENTRIES users), so repeat requests by the same user
+skip the users lookup. USER_CONTEXT_TTL=0 turns the LRU off.
+
+update_profile refreshes the entry in the worker that handled it; other
+workers may serve the old profile until their entry's TTL runs out, so keep
+the TTL short.
+
+With USER_CONTEXT_CLAIMS=true, access tokens also carry the user's role and
+location as signed claims, and endpoints that only need those (the AI chat
+context) read them from the token with no database access at all. Claims are
+a snapshot from when the token was issued; refresh and update_profile issue
+tokens with the current values. Authorization checks should not rely on them.
+"""
+
+import os
+import threading
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from cache import LRUCache
+from models import db, User
+from database.async_pool import get_async_pool
+from api.serialization import USER
+
+USER_CONTEXT_TTL = float(os.getenv('USER_CONTEXT_TTL', '30'))
+USER_CONTEXT_CLAIMS = os.getenv('USER_CONTEXT_CLAIMS', 'false').lower() == 'true'
+
+ROLE_CLAIM = 'role'
+LOCATION_CLAIM = 'loc'
+
+ASYNC_USER_CONTEXT_QUERY = """
+    SELECT id, first_name, last_name, name, email, role, location, latitude, longitude, created_at, updated_at
+    FROM users WHERE id = $1
+"""
+
+_cache = LRUCache(max_entries=int(os.getenv('USER_CONTEXT_MAX_ENTRIES', '1024')))
+
+class _Counters:
+    """Lookups answered by the request memo and by token claims (the LRU counts its own)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_hits = 0
+        self.claim_hits = 0
+        self.loads = 0
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+_counters = _Counters()
+
+def _request_memo():
+    if not has_request_context():
+        return {}
+    if 'user_contexts' not in g:
+        g.user_contexts = {}
+    return g.user_contexts
+
+_MISS = object()
+
+def _cached(user_id):
+    """The memoised or cached context (None for a missing user seen in this request), else _MISS"""
+    memo = _request_memo()
+    if user_id in memo:
+        _counters.incr('request_hits')
+        return memo[user_id]
+    context = _cache.get(user_id)
+    if context is None:
+        return _MISS
+    memo[user_id] = context
+    return context
+
+def _remember(user_id, context):
+    _request_memo()[user_id] = context
+    if context is not None and USER_CONTEXT_TTL > 0:
+        _cache.set(user_id, context, USER_CONTEXT_TTL)
+
+def get_user_context(user_id=None):
+    """The user's profile dict, or None when the user does not exist (defaults to the JWT identity)"""
+    user_id = int(user_id if user_id is not None else get_jwt_identity())
+    context = _cached(user_id)
+    if context is _MISS:
+        _counters.incr('loads')
+        user = db.session.get(User, user_id)
+        context = user.to_dict() if user else None
+        _remember(user_id, context)
+    return context
+
+async def get_async_user_context(user_id):
+    """get_user_context through the asyncpg pool (async serving mode)"""
+    user_id = int(user_id)
+    context = _cached(user_id)
+    if context is _MISS:
+        _counters.incr('loads')
+        pool = await get_async_pool()
+        row = await pool.fetchrow(ASYNC_USER_CONTEXT_QUERY, user_id)
+        context = USER.text(row) if row else None
+        _remember(user_id, context)
+    return context
+
+def _claims_context():
+    claims = get_jwt()
+    if ROLE_CLAIM in claims:
+        _counters.incr('claim_hits')
+        return {'role': claims[ROLE_CLAIM], 'location': claims.get(LOCATION_CLAIM) or ''}
+    return None
+
+def get_user_role_location(user_id):
+    """{'role', 'location'} for the current request's user, from token claims when present"""
+    context = _claims_context() or get_user_context(user_id)
+    return context and {'role': context['role'], 'location': context['location']}
+
+async def get_async_user_role_location(user_id):
+    context = _claims_context() or await get_async_user_context(user_id)
+    return context and {'role': context['role'], 'location': context['location']}
+
+def user_context_claims(context):
+    """Extra access-token claims for a user's profile dict (empty unless USER_CONTEXT_CLAIMS)"""
+    if not USER_CONTEXT_CLAIMS or not context:
+        return {}
+    return {ROLE_CLAIM: context['role'], LOCATION_CLAIM: context['location'] or ''}
+
+def update_user_context(user):
+    """Replace the cached profile after the user row changed"""
+    context = user.to_dict()
+    _remember(user.id, context)
+    return context
+
+def get_user_context_stats():
+    """Per-worker hit rates: request memo, token claims and the LRU"""
+    lru = _cache.stats()
+    lookups = _counters.request_hits + _counters.claim_hits + lru['hits'] + lru['misses']
+    db_free = _counters.request_hits + _counters.claim_hits + lru['hits']
+    return {
+        'pid': os.getpid(),
+        'ttlSeconds': USER_CONTEXT_TTL,
+        'claimsEnabled': USER_CONTEXT_CLAIMS,
+        'entries': lru['entries'],
+        'maxEntries': lru['max_entries'],
+        'requestHits': _counters.request_hits,
+        'claimHits': _counters.claim_hits,
+        'cacheHits': lru['hits'],
+        'cacheMisses': lru['misses'],
+        'databaseLoads': _counters.loads,
+        'hitRatio': round(db_free / lookups, 4) if lookups else 0.0
+    }
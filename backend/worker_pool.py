@@ -0,0 +1,45 @@
+"""
+Worker Process Pools
+CPU-heavy work (password hashes, listing image variants) runs on small
+process pools so it does not hold request threads. A pool belongs to the
+worker process that created it: one inherited through fork (gunicorn
+--preload) is replaced on first use in the child. Pool processes are
+forked, since spawn would re-import the __main__ module (app.py) in each,
+and run at a raised niceness so request threads win contended cores.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+class WorkerPool:
+    """
+    Process pool created on first use in each worker process
+    workers: pool processes
+    nice: scheduling niceness added to pool processes
+    on_start: called (without arguments) whenever this process creates its pool
+    """
+
+    def __init__(self, workers, nice=10, on_start=None):
+        self.workers = workers
+        self.nice = nice
+        self.on_start = on_start
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The ProcessPoolExecutor of the current process"""
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('fork'),
+                        initializer=os.nice, initargs=(self.nice,)
+                    )
+                    self._pid = pid
+                    if self.on_start:
+                        self.on_start()
+        return self._executor
@@ -1,8 +1,8 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback } from 'react';
 import Image from 'next/image';
-import { fetchListings, createPurchase } from '../../lib/api.js';
+import { fetchListingsPage, createPurchase } from '../../lib/api.js';
 import { useToast } from '../../components/Toast';
 import { useRouter } from 'next/navigation';
 
@@ -16,35 +16,81 @@ export default function MarketplacePage() {
   const [error, setError] = useState(null);
   const [purchasing, setPurchasing] = useState(false);
   const [kwhAmount, setKwhAmount] = useState('');
+  // Idempotency key for the purchase being attempted; reused if the request is retried
+  const purchaseKeyRef = useRef(null);
 
-  // Filter states
+  // Filter states (applied by the server, so every page comes back in order)
   const [selectedEnergyType, setSelectedEnergyType] = useState('');
-  const [sortBy, setSortBy] = useState('price'); // price, distance, newest
+  const [sortBy, setSortBy] = useState('price_asc'); // price_asc, newest
 
-  // Fetch listings from API
+  // Keyset pagination state
+  const [nextCursor, setNextCursor] = useState(null);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const sentinelRef = useRef(null);
+  // Bumped whenever the filters change, so pages requested for older filters are dropped
+  const queryGenerationRef = useRef(0);
+
+  // Fetch the first page of listings from API, again whenever the filters change
   useEffect(() => {
-      async function loadListings() {
+    const generation = ++queryGenerationRef.current;
+    async function loadListings() {
       try {
         setLoading(true);
-        const data = await fetchListings({ status: 'active' });
-        console.log('Marketplace listings loaded:', data);
-        // Debug: Log each listing's imageUrl
-        data.forEach(listing => {
-          console.log(`Listing ${listing.id} - imageUrl:`, listing.imageUrl);
-        });
-        setListings(data);
+        setNextCursor(null);
+        setHasMore(false);
+        const page = await fetchListingsPage({ status: 'active', energyType: selectedEnergyType, sort: sortBy });
+        if (generation !== queryGenerationRef.current) return;
+        console.log('Marketplace listings loaded:', page.listings.length);
+        setListings(page.listings);
+        setNextCursor(page.nextCursor);
+        setHasMore(page.hasMore);
         setError(null);
       } catch (err) {
+        if (generation !== queryGenerationRef.current) return;
         console.error('Error loading listings:', err);
         setError('Failed to load listings');
         setListings([]);
+        setHasMore(false);
       } finally {
-        setLoading(false);
+        if (generation === queryGenerationRef.current) setLoading(false);
       }
     }
     
     loadListings();
-  }, []);
+  }, [selectedEnergyType, sortBy]);
+
+  // Fetch the next page when the user scrolls near the end of the grid
+  const loadMoreListings = useCallback(async () => {
+    if (!hasMore || !nextCursor || loadingMore) return;
+    const generation = queryGenerationRef.current;
+    setLoadingMore(true);
+    try {
+      const page = await fetchListingsPage({ status: 'active', energyType: selectedEnergyType, sort: sortBy }, nextCursor);
+      if (generation !== queryGenerationRef.current) return;
+      setListings(prev => [...prev, ...page.listings]);
+      setNextCursor(page.nextCursor);
+      setHasMore(page.hasMore);
+    } catch (err) {
+      if (generation !== queryGenerationRef.current) return;
+      console.error('Error loading more listings:', err);
+      setHasMore(false);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [hasMore, nextCursor, loadingMore, selectedEnergyType, sortBy]);
+
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !hasMore) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) {
+        loadMoreListings();
+      }
+    }, { rootMargin: '400px' });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [hasMore, loadMoreListings]);
 
   const handleBuyContact = (listing) => {
     const token = localStorage.getItem('access_token');
@@ -61,6 +107,7 @@ export default function MarketplacePage() {
     setSelectedListing(null);
     setKwhAmount('');
     setPurchasing(false);
+    purchaseKeyRef.current = null;
   };
 
   const handlePurchaseSubmit = async (e) => {
@@ -77,47 +124,32 @@ export default function MarketplacePage() {
       return;
     }
 
+    if (!purchaseKeyRef.current) purchaseKeyRef.current = crypto.randomUUID();
     setPurchasing(true);
     try {
-      const transaction = await createPurchase(selectedListing.id, kwh);
+      const transaction = await createPurchase(selectedListing.id, kwh, purchaseKeyRef.current);
       showToast(`Successfully purchased ${kwh} kWh! Your purchase has been recorded.`, 'success');
       handleCloseModal();
       // Optionally refresh listings to show updated quantities
     } catch (error) {
+      // Keep the key only when the request may not have reached the server
+      if (!(error instanceof TypeError)) purchaseKeyRef.current = null;
       showToast(error.message || 'Failed to complete purchase', 'error');
     } finally {
       setPurchasing(false);
     }
   };
 
-  // Filter listings based on search query, energy type, and sort
-  const filteredListings = listings
-    .filter(listing => {
-      // Search query filter
-      if (searchQuery) {
-        const query = searchQuery.toLowerCase();
-        const matchesSearch = (
-          listing.title?.toLowerCase().includes(query) ||
-          listing.energyType?.toLowerCase().includes(query) ||
-          listing.location?.toLowerCase().includes(query)
-        );
-        if (!matchesSearch) return false;
-      }
-      
-      // Energy type filter
-      if (selectedEnergyType && listing.energyType !== selectedEnergyType) {
-        return false;
-      }
-      
-      return true;
-    })
-    .sort((a, b) => {
-      if (sortBy === 'price') {
-        return parseFloat(a.price) - parseFloat(b.price);
-      }
-      // Default to newest first
-      return new Date(b.createdAt) - new Date(a.createdAt);
-    });
+  // Narrow the loaded pages by the search box; energy type and sort order come from the server
+  const filteredListings = listings.filter(listing => {
+    if (!searchQuery) return true;
+    const query = searchQuery.toLowerCase();
+    return (
+      listing.title?.toLowerCase().includes(query) ||
+      listing.energyType?.toLowerCase().includes(query) ||
+      listing.location?.toLowerCase().includes(query)
+    );
+  });
 
   // Helper function to get image based on energy type
   const getImageForEnergyType = (energyType) => {
@@ -220,7 +252,7 @@ export default function MarketplacePage() {
               }}
             >
               <option value="newest">Newest First</option>
-              <option value="price">Lowest Price</option>
+              <option value="price_asc">Lowest Price</option>
             </select>
           </div>
         </div>
@@ -265,8 +297,10 @@ export default function MarketplacePage() {
                     <div className="relative w-full h-[304px]">
                       {listing.imageUrl && listing.imageUrl.trim() !== '' && listing.imageUrl !== 'null' ? (
                         <img
-                          src={listing.imageUrl.startsWith('http') ? listing.imageUrl : `${process.env.NEXT_PUBLIC_API_URL?.replace('/api', '') || 'https://eco-hub-backend.onrender.com'}${listing.imageUrl}`}
+                          src={listing.imageUrl.startsWith('http') ? listing.imageUrl : `${process.env.NEXT_PUBLIC_API_URL?.replace('/api', '') || 'https://eco-hub-backend.onrender.com'}${listing.thumbnailUrl || listing.imageUrl}`}
                           alt="Energy installation"
+                          loading="lazy"
+                          decoding="async"
                           className="w-full h-full object-cover"
                           style={{ borderRadius: '8px 8px 0 0' }}
                           onError={(e) => {
@@ -336,6 +370,14 @@ export default function MarketplacePage() {
                 ))}
               </div>
             )}
+            {/* Infinite scroll sentinel */}
+            {hasMore && (
+              <div ref={sentinelRef} className="flex items-center justify-center pb-16">
+                {loadingMore && (
+                  <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-[#163466]"></div>
+                )}
+              </div>
+            )}
           </>
         )}
       </section>
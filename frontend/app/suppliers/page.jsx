@@ -3,7 +3,7 @@
 import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import Image from 'next/image';
-import { fetchListings, deleteListing as deleteListingAPI } from '../../lib/api.js';
+import { fetchListingsPage, deleteListing as deleteListingAPI } from '../../lib/api.js';
 import { useToast } from '../../components/Toast';
 import ConfirmDialog from '../../components/ConfirmDialog';
 
@@ -15,6 +15,10 @@ export default function SuppliersPage() {
   const [confirmOpen, setConfirmOpen] = useState(false);
   const [pendingDeleteId, setPendingDeleteId] = useState(null);
   const [isSupplier, setIsSupplier] = useState(false);
+  // Keyset pagination state
+  const [nextCursor, setNextCursor] = useState(null);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const userStr = typeof window !== 'undefined' ? localStorage.getItem('user') : null;
@@ -27,18 +31,21 @@ export default function SuppliersPage() {
     }
   }, []);
 
-  // Fetch listings from API
+  // Fetch the first page of listings from API
   useEffect(() => {
     async function loadListings() {
       try {
         setLoading(true);
-        const data = await fetchListings();
-        setListings(data);
+        const page = await fetchListingsPage();
+        setListings(page.listings);
+        setNextCursor(page.nextCursor);
+        setHasMore(page.hasMore);
         setError(null);
       } catch (err) {
         setError('Failed to load listings');
         console.error(err);
         setListings([]);
+        setHasMore(false);
       } finally {
         setLoading(false);
       }
@@ -47,6 +54,23 @@ export default function SuppliersPage() {
     loadListings();
   }, []);
 
+  // Append the next page when "Load more" is clicked
+  const loadMoreListings = async () => {
+    if (!hasMore || !nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchListingsPage({}, nextCursor);
+      setListings(prev => [...prev, ...page.listings]);
+      setNextCursor(page.nextCursor);
+      setHasMore(page.hasMore);
+    } catch (err) {
+      showToast('Failed to load more listings', 'error');
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Open confirm before delete
   const confirmDelete = (id) => {
     setPendingDeleteId(id);
@@ -320,6 +344,23 @@ export default function SuppliersPage() {
                 </div>
               ))}
             </div>
+
+            {hasMore && (
+              <div className="flex justify-center mt-6">
+                <button
+                  onClick={loadMoreListings}
+                  disabled={loadingMore}
+                  className="hover:opacity-90 transition-opacity px-6 py-2 rounded-lg border border-gray-300 disabled:opacity-50"
+                  style={{
+                    fontFamily: 'Lexend Deca, sans-serif',
+                    fontSize: '16px',
+                    color: '#163466',
+                  }}
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </>
         )}
 
@@ -1,11 +1,13 @@
 'use client';
 
 import { useState, useEffect, useRef } from 'react';
+import { readEventStream } from '../lib/api';
 
 export default function AIAdvisorContent() {
   const [messages, setMessages] = useState([]);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const messagesEndRef = useRef(null);
   const [metrics, setMetrics] = useState({
     carbonSaved: 2847,
@@ -66,12 +68,63 @@ export default function AIAdvisorContent() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify({ message: inputMessage })
+        body: JSON.stringify({ message: inputMessage, mode: 'stream' })
       });
 
-      if (response.ok) {
+      const isEventStream = response.headers.get('Content-Type')?.includes('text/event-stream');
+
+      if (response.ok && isEventStream && response.body) {
+        // Render tokens as they arrive instead of waiting for the full answer
+        const aiMessageId = Date.now() + 1;
+        let started = false;
+        await readEventStream(response, (event, data) => {
+          if (event === 'token') {
+            if (!started) {
+              started = true;
+              setIsStreaming(true);
+              setMessages(prev => [...prev, {
+                id: aiMessageId,
+                type: 'ai',
+                content: data.text,
+                emojis: [],
+                timestamp: new Date()
+              }]);
+            } else {
+              setMessages(prev => prev.map(message =>
+                message.id === aiMessageId
+                  ? { ...message, content: message.content + data.text }
+                  : message
+              ));
+            }
+          } else if (event === 'done') {
+            const finalMessage = {
+              id: aiMessageId,
+              type: 'ai',
+              content: data.response || 'I received your message!',
+              emojis: data.emojis || [],
+              timestamp: new Date()
+            };
+            setMessages(prev => started
+              ? prev.map(message => message.id === aiMessageId ? finalMessage : message)
+              : [...prev, finalMessage]);
+          } else if (event === 'error') {
+            // The completion failed midway: keep what arrived, marked as incomplete
+            const failedMessage = {
+              id: aiMessageId,
+              type: 'ai',
+              content: `${data.partial ? `${data.partial}\n\n` : ''}⚠️ ${data.message}`,
+              emojis: [],
+              timestamp: new Date()
+            };
+            setMessages(prev => started
+              ? prev.map(message => message.id === aiMessageId ? failedMessage : message)
+              : [...prev, failedMessage]);
+          }
+        });
+      } else if (response.ok) {
         const data = await response.json();
         const aiMessage = {
           id: Date.now() + 1,
@@ -134,6 +187,7 @@ export default function AIAdvisorContent() {
       setMessages(prev => [...prev, errorMessage]);
     } finally {
       setIsLoading(false);
+      setIsStreaming(false);
     }
   };
 
@@ -227,7 +281,7 @@ export default function AIAdvisorContent() {
               </div>
             </div>
           ))}
-          {isLoading && (
+          {isLoading && !isStreaming && (
             <div className="flex justify-start">
               <div className="bg-gray-100 text-gray-800 px-4 py-2 rounded-lg">
                 <div className="flex items-center space-x-2">
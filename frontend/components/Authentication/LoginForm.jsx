@@ -38,6 +38,7 @@ export default function LoginForm({ onToggle }) {
         // Ensure token is a string and trim any whitespace/quotes
         const token = String(data.access_token || '').trim().replace(/^["']|["']$/g, '');
         localStorage.setItem('access_token', token);
+        localStorage.setItem('refresh_token', data.refresh_token || '');
         localStorage.setItem('user', JSON.stringify(data.user));
         // Dispatch event to update navbar immediately
         window.dispatchEvent(new Event('storage'));
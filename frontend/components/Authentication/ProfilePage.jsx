@@ -3,26 +3,10 @@
 import { useState, useEffect } from 'react';
 import Image from 'next/image';
 import { useToast } from '../Toast';
-import { fetchMyPurchases, fetchMyPurchaseSummary } from '../../lib/api';
+import { fetchTransactionHistoryPage, fetchMyPurchaseSummary } from '../../lib/api';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://eco-hub-backend.onrender.com/api';
 
-async function fetchMySales() {
-  try {
-    const token = localStorage.getItem('access_token');
-    if (!token) return [];
-    const response = await fetch(`${API_BASE_URL}/transactions/sales`, {
-      headers: { 'Authorization': `Bearer ${token}` }
-    });
-    if (!response.ok) return [];
-    const data = await response.json();
-    return data.data || [];
-  } catch (error) {
-    console.error('Error fetching sales:', error);
-    return [];
-  }
-}
-
 async function fetchMySalesSummary() {
   try {
     const token = localStorage.getItem('access_token');
@@ -52,6 +36,11 @@ export default function ProfilePage() {
     location: ''
   });
   const [purchaseHistory, setPurchaseHistory] = useState([]);
+  // Keyset pagination state for the history list
+  const [historyScope, setHistoryScope] = useState('me');
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [historyHasMore, setHistoryHasMore] = useState(false);
+  const [loadingMoreHistory, setLoadingMoreHistory] = useState(false);
   const [metrics, setMetrics] = useState({
     firstSeen: '',
     firstPurchase: '',
@@ -118,22 +107,14 @@ export default function ProfilePage() {
 
       if (isSupplier) {
         // Load sales data for suppliers
-        const sales = await fetchMySales();
-        setPurchaseHistory(
-          (sales || []).map((s) => ({
-            date: s.date ? new Date(s.date).toLocaleDateString('en-KE') : '',
-            location: s.location,
-            capacity: `${s.kwh} KWh @Kes.${(s.totalPrice / (s.kwh || 1)).toFixed(2)}`,
-            totalCost: `Kes. ${Number(s.totalPrice).toLocaleString('en-KE', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`,
-          }))
-        );
+        await loadHistoryPage('sales');
 
         const salesSummary = await fetchMySalesSummary();
         const formattedRevenue = `Kes. ${Number(salesSummary.totalRevenue || 0).toLocaleString('en-KE', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
 
         setMetrics({
           firstSeen: user?.created_at ? formatDate(new Date(user.created_at)) : '',
-          firstPurchase: sales && sales.length > 0 ? new Date(sales[sales.length - 1].date).toLocaleDateString('en-KE') : '',
+          firstPurchase: salesSummary.firstActivity ? new Date(salesSummary.firstActivity).toLocaleDateString('en-KE') : '',
           installedCapacity: `${Number(salesSummary.totalKwh || 0).toLocaleString('en-KE')} KWh`,
           totalRevenue: formattedRevenue,
           totalExpenditure: 'Kes. 0.00',
@@ -141,22 +122,14 @@ export default function ProfilePage() {
         });
       } else {
         // Load purchase data for consumers
-        const purchases = await fetchMyPurchases();
-        setPurchaseHistory(
-          (purchases || []).map((p) => ({
-            date: p.date ? new Date(p.date).toLocaleDateString('en-KE') : '',
-            location: p.location,
-            capacity: `${p.kwh} KWh @Kes.${(p.totalPrice / (p.kwh || 1)).toFixed(2)}`,
-            totalCost: `Kes. ${Number(p.totalPrice).toLocaleString('en-KE', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`,
-          }))
-        );
+        await loadHistoryPage('me');
 
         const summary = await fetchMyPurchaseSummary();
         const formattedExpenditure = `Kes. ${Number(summary.totalExpenditure || 0).toLocaleString('en-KE', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
 
         setMetrics({
           firstSeen: user?.created_at ? formatDate(new Date(user.created_at)) : '',
-          firstPurchase: purchases && purchases.length > 0 ? new Date(purchases[purchases.length - 1].date).toLocaleDateString('en-KE') : '',
+          firstPurchase: summary.firstActivity ? new Date(summary.firstActivity).toLocaleDateString('en-KE') : '',
           installedCapacity: `${Number(summary.totalKwh || 0).toLocaleString('en-KE')} KWh`,
           totalRevenue: 'Kes. 0.00',
           totalExpenditure: formattedExpenditure,
@@ -168,6 +141,31 @@ export default function ProfilePage() {
     }
   };
 
+  // First page replaces the list; later pages (cursor set) are appended
+  const loadHistoryPage = async (scope, cursor = null) => {
+    const page = await fetchTransactionHistoryPage(scope, cursor);
+    const rows = page.transactions.map((t) => ({
+      date: t.date ? new Date(t.date).toLocaleDateString('en-KE') : '',
+      location: t.location,
+      capacity: `${t.kwh} KWh @Kes.${(t.totalPrice / (t.kwh || 1)).toFixed(2)}`,
+      totalCost: `Kes. ${Number(t.totalPrice).toLocaleString('en-KE', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`,
+    }));
+    setPurchaseHistory(prev => (cursor ? [...prev, ...rows] : rows));
+    setHistoryScope(scope);
+    setHistoryCursor(page.nextCursor);
+    setHistoryHasMore(page.hasMore);
+  };
+
+  const loadMoreHistory = async () => {
+    if (!historyHasMore || !historyCursor || loadingMoreHistory) return;
+    setLoadingMoreHistory(true);
+    try {
+      await loadHistoryPage(historyScope, historyCursor);
+    } finally {
+      setLoadingMoreHistory(false);
+    }
+  };
+
   const formatDate = (date) => {
     const months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
     return `${date.getDate()} ${months[date.getMonth()]}, ${date.getFullYear()}`;
@@ -377,6 +375,15 @@ export default function ProfilePage() {
                   {purchaseHistory.length === 0 && (
                     <p className="text-gray-400 text-sm">No purchase history available</p>
                   )}
+                  {historyHasMore && (
+                    <button
+                      onClick={loadMoreHistory}
+                      disabled={loadingMoreHistory}
+                      className="w-full py-2 rounded-lg border border-white text-white hover:bg-white/10 transition-colors disabled:opacity-50"
+                    >
+                      {loadingMoreHistory ? 'Loading...' : 'Load more'}
+                    </button>
+                  )}
                 </div>
               </div>
 
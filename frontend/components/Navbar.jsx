@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from 'react';
 import Link from 'next/link';
+import { ensureFreshAccessToken } from '../lib/api';
 
 export default function Navbar() {
   const [isMenuOpen, setIsMenuOpen] = useState(false);
@@ -19,8 +20,9 @@ export default function Navbar() {
       setIsLoggedIn(!!token || !!user);
     };
 
-    // Check on mount
+    // Check on mount, renewing an expiring access token with the refresh token
     checkLoginState();
+    ensureFreshAccessToken().catch((error) => console.error('Token refresh failed:', error));
 
     // Listen for storage changes (e.g., login from another tab)
     window.addEventListener('storage', checkLoginState);
@@ -37,6 +39,7 @@ export default function Navbar() {
     if (!token) {
       // No token, just clear state and redirect
       localStorage.removeItem("access_token");
+      localStorage.removeItem("refresh_token");
       localStorage.removeItem("user");
       setIsLoggedIn(false);
       window.location.href = "/auth";
@@ -66,6 +69,7 @@ export default function Navbar() {
     } finally {
       // Always clear local storage and update state
       localStorage.removeItem("access_token");
+      localStorage.removeItem("refresh_token");
       localStorage.removeItem("user");
       setIsLoggedIn(false);
       setLoading(false);
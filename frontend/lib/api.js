@@ -1,24 +1,61 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://eco-hub-backend.onrender.com/api';
 
 /**
- * Fetch all energy listings
+ * Fetch one page of energy listings
+ * filters: status, energyType, sort (newest, price_asc, price_desc), limit (page size)
+ * Returns { listings, nextCursor, hasMore }; pass nextCursor back to get the following page
+ */
+export async function fetchListingsPage(filters = {}, cursor = null) {
+  const queryParams = new URLSearchParams();
+  if (filters.status) queryParams.append('status', filters.status);
+  if (filters.energyType) queryParams.append('energy_type', filters.energyType);
+  if (filters.sort) queryParams.append('sort', filters.sort);
+  if (filters.limit) queryParams.append('limit', filters.limit);
+  if (cursor) queryParams.append('cursor', cursor);
+  
+  const url = `${API_BASE_URL}/listings/?${queryParams}`;
+  const response = await fetch(url);
+  
+  if (!response.ok) {
+    throw new Error(`API error: ${response.status}`);
+  }
+  
+  const data = await response.json();
+  const pagination = data.pagination || {};
+  return {
+    listings: data.data || [],
+    nextCursor: pagination.nextCursor || null,
+    hasMore: Boolean(pagination.hasMore)
+  };
+}
+
+/**
+ * Stream energy listings page by page
+ * Usage: for await (const page of streamListings({ status: 'active' })) { ... }
+ */
+export async function* streamListings(filters = {}) {
+  let cursor = null;
+  do {
+    const page = await fetchListingsPage(filters, cursor);
+    yield page.listings;
+    cursor = page.hasMore ? page.nextCursor : null;
+  } while (cursor);
+}
+
+/**
+ * Fetch energy listings, walking pages until filters.limit listings (or every
+ * listing when no limit is given); prefer fetchListingsPage for screens that can page
  */
 export async function fetchListings(filters = {}) {
   try {
-    const queryParams = new URLSearchParams();
-    if (filters.status) queryParams.append('status', filters.status);
-    if (filters.energyType) queryParams.append('energy_type', filters.energyType);
-    if (filters.limit) queryParams.append('limit', filters.limit);
-    
-    const url = `${API_BASE_URL}/listings/?${queryParams}`;
-    const response = await fetch(url);
-    
-    if (!response.ok) {
-      throw new Error(`API error: ${response.status}`);
+    const listings = [];
+    for await (const page of streamListings(filters)) {
+      listings.push(...page);
+      if (filters.limit && listings.length >= filters.limit) {
+        return listings.slice(0, filters.limit);
+      }
     }
-    
-    const data = await response.json();
-    return data.data || [];
+    return listings;
   } catch (error) {
     console.error('Error fetching listings:', error);
     return [];
@@ -236,21 +273,29 @@ export async function fetchPerformancePredictions() {
 }
 
 /**
- * Fetch the logged-in user's purchase history
+ * Fetch one page of the logged-in user's history, newest first
+ * scope: 'me' (purchases) or 'sales'; pass the previous page's nextCursor for the next one
  */
-export async function fetchMyPurchases() {
+export async function fetchTransactionHistoryPage(scope = 'me', cursor = null) {
   try {
     const token = localStorage.getItem('access_token');
     if (!token) throw new Error('Not authenticated');
-    const response = await fetch(`${API_BASE_URL}/transactions/me`, {
+    const queryParams = new URLSearchParams();
+    if (cursor) queryParams.append('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/transactions/${scope}?${queryParams}`, {
       headers: { 'Authorization': `Bearer ${token}` }
     });
-    if (!response.ok) throw new Error('Failed to load purchases');
+    if (!response.ok) throw new Error(`Failed to load ${scope === 'sales' ? 'sales' : 'purchases'}`);
     const data = await response.json();
-    return data.data || [];
+    const pagination = data.pagination || {};
+    return {
+      transactions: data.data || [],
+      nextCursor: pagination.nextCursor || null,
+      hasMore: Boolean(pagination.hasMore)
+    };
   } catch (error) {
-    console.error('Error fetching purchases:', error);
-    return [];
+    console.error('Error fetching transaction history:', error);
+    return { transactions: [], nextCursor: null, hasMore: false };
   }
 }
 
@@ -276,16 +321,19 @@ export async function fetchMyPurchaseSummary() {
 /**
  * Create a purchase transaction
  */
-export async function createPurchase(listingId, kwh) {
+export async function createPurchase(listingId, kwh, idempotencyKey) {
   try {
     const token = localStorage.getItem('access_token');
     if (!token) throw new Error('You must be logged in to purchase energy');
+    const headers = {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${token}`
+    };
+    // Retries with the same key return the original purchase instead of buying twice
+    if (idempotencyKey) headers['Idempotency-Key'] = idempotencyKey;
     const response = await fetch(`${API_BASE_URL}/transactions/`, {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': `Bearer ${token}`
-      },
+      headers,
       body: JSON.stringify({ listingId, kwh })
     });
     if (!response.ok) {
@@ -299,3 +347,128 @@ export async function createPurchase(listingId, kwh) {
     throw error;
   }
 }
+
+/**
+ * Read a text/event-stream response body, calling onEvent(event, data)
+ * for each server-sent event as it arrives
+ */
+export async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block) => {
+    let event = 'message';
+    const dataLines = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+    }
+    if (dataLines.length > 0) onEvent(event, JSON.parse(dataLines.join('\n')));
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+    }
+  }
+  if (buffer.trim()) dispatch(buffer);
+}
+
+// Refresh in flight in this tab; concurrent callers share it
+let refreshInFlight = null;
+
+const REFRESH_LOCK = 'ecohub-token-refresh';
+const REFRESH_LEASE_MS = 10000;
+
+/**
+ * Renew the access token with the stored refresh token when it is about to expire
+ * Refresh tokens are single use and presenting one twice logs the user out
+ * everywhere, so refreshes are serialized within the tab and across tabs, and
+ * each one re-reads the stored tokens in case another tab already renewed them.
+ * Returns the access token to use, or null when the user has to log in again
+ * (the session is only cleared when the server answers 401)
+ */
+export async function ensureFreshAccessToken(minValiditySeconds = 60) {
+  const token = localStorage.getItem('access_token');
+  if (token && !tokenExpiresWithin(token, minValiditySeconds)) return token;
+  if (!localStorage.getItem('refresh_token')) return token;
+
+  if (!refreshInFlight) {
+    refreshInFlight = withRefreshLock(() => refreshAccessToken(minValiditySeconds))
+      .finally(() => { refreshInFlight = null; });
+  }
+  return refreshInFlight;
+}
+
+async function refreshAccessToken(minValiditySeconds) {
+  // Another tab may have renewed the pair while this one waited for the lock
+  const token = localStorage.getItem('access_token');
+  if (token && !tokenExpiresWithin(token, minValiditySeconds)) return token;
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) return token;
+
+  const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+    method: 'POST',
+    headers: { 'Authorization': `Bearer ${refreshToken}` },
+  });
+  if (response.status === 401) {
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    localStorage.removeItem('user');
+    window.dispatchEvent(new Event('storage'));
+    return null;
+  }
+  if (!response.ok) {
+    // Server or network trouble: keep the session and try again on the next call
+    throw new Error(`Token refresh failed with status ${response.status}`);
+  }
+  const data = await response.json();
+  localStorage.setItem('access_token', data.access_token);
+  localStorage.setItem('refresh_token', data.refresh_token);
+  return data.access_token;
+}
+
+/**
+ * Run fn while holding the cross-tab refresh lock
+ * Uses the Web Locks API, or a short localStorage lease where it is missing
+ */
+async function withRefreshLock(fn) {
+  if (typeof navigator !== 'undefined' && navigator.locks) {
+    return navigator.locks.request(REFRESH_LOCK, fn);
+  }
+  const owner = `${Date.now()}:${Math.random()}`;
+  const deadline = Date.now() + REFRESH_LEASE_MS;
+  while (Date.now() < deadline) {
+    const [, expiresAt] = (localStorage.getItem(REFRESH_LOCK) || '').split('|');
+    if (!expiresAt || Number(expiresAt) < Date.now()) {
+      localStorage.setItem(REFRESH_LOCK, `${owner}|${Date.now() + REFRESH_LEASE_MS}`);
+      // Last writer wins; re-read so two tabs that raced both see the same owner
+      await new Promise(resolve => setTimeout(resolve, 50));
+      if ((localStorage.getItem(REFRESH_LOCK) || '').startsWith(`${owner}|`)) {
+        try {
+          return await fn();
+        } finally {
+          localStorage.removeItem(REFRESH_LOCK);
+        }
+      }
+    }
+    await new Promise(resolve => setTimeout(resolve, 100));
+  }
+  // Lease holder vanished without releasing: go ahead, fn re-checks the stored tokens first
+  return fn();
+}
+
+function tokenExpiresWithin(token, seconds) {
+  try {
+    const payload = JSON.parse(atob(token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')));
+    return payload.exp * 1000 - Date.now() < seconds * 1000;
+  } catch (e) {
+    return true;
+  }
+}